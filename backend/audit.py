@@ -55,6 +55,8 @@ class AuditAction:
     TASK_RESUME = "恢复任务"
     TASK_FILE_VIEW = "查看任务文件"
     TASK_FILE_DOWNLOAD = "下载任务文件"
+    TASK_DEPENDENCY = "更新任务依赖"
+    TASK_BULK_UPDATE = "批量操作任务"
     
     # 系统操作
     SYSTEM_CONFIG = "系统配置"
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+任务进程启动耗时对比脚本
+对比两种启动方式运行同一个脚本的端到端耗时：
+1. exec: 每次启动新的Python解释器（冷启动，需要重新导入依赖）
+2. forkserver: 从预导入模块的常驻进程fork子进程（热启动）
+
+用法:
+    python benchmark_forkserver.py --runs 20 --preload pandas,pymongo,db_configs
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from utils.forkserver import ForkServerClient
+from utils.process_runner import run_process
+from utils.task_logger import task_logger
+
+
+def write_script(directory: str, modules: list) -> str:
+    """生成测试脚本：导入与预加载相同的模块后输出一行"""
+    path = os.path.join(directory, "bench_task.py")
+    with open(path, "w", encoding="utf-8") as f:
+        for name in modules:
+            f.write(f"import {name}\n")
+        f.write("import os\nprint('task', os.environ.get('TASK_ID'))\n")
+    return path
+
+
+async def measure(command, env, cwd, log_dir, runs, forkserver=None) -> list:
+    """运行多次并返回每次耗时（毫秒）"""
+    durations = []
+    for i in range(runs):
+        log_stream = task_logger.open_stream(os.path.join(log_dir, f"run_{i}.log"))
+        started = time.perf_counter()
+        result = await run_process(command, env=env, cwd=cwd, log_stream=log_stream,
+                                   timeout=300, forkserver=forkserver)
+        durations.append((time.perf_counter() - started) * 1000)
+        log_stream.close()
+        if result.returncode != 0:
+            print(f"  第{i + 1}次运行失败，退出码: {result.returncode}")
+    return durations
+
+
+def report(title: str, durations: list):
+    durations = sorted(durations)
+    p95 = durations[min(len(durations) - 1, int(len(durations) * 0.95))]
+    print(f"{title:<12} 平均 {statistics.mean(durations):8.1f}ms  "
+          f"中位数 {statistics.median(durations):8.1f}ms  P95 {p95:8.1f}ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="对比冷启动与fork-server热启动耗时")
+    parser.add_argument("--runs", type=int, default=20, help="每种方式的运行次数")
+    parser.add_argument("--preload", default="pandas,pymongo,db_configs", help="预导入（脚本同样导入）的模块")
+    args = parser.parse_args()
+
+    modules = []
+    for name in [m.strip() for m in args.preload.split(",") if m.strip()]:
+        try:
+            __import__(name)
+            modules.append(name)
+        except Exception as e:
+            print(f"跳过无法导入的模块 {name}: {e}")
+
+    backend_dir = os.path.dirname(os.path.abspath(__file__))
+    with tempfile.TemporaryDirectory() as work_dir:
+        script = write_script(work_dir, modules)
+        command = [sys.executable, script]
+        env = os.environ.copy()
+        env.update({"PYTHONPATH": backend_dir, "TASK_ID": "0", "OUTPUT_DIR": work_dir})
+
+        print(f"预加载模块: {modules or '无'}，每种方式运行 {args.runs} 次\n")
+
+        cold = await measure(command, env, work_dir, work_dir, args.runs)
+
+        client = ForkServerClient(os.path.join(work_dir, "forkserver.sock"), modules)
+        started = time.perf_counter()
+        client.ensure_started()
+        warmup_ms = (time.perf_counter() - started) * 1000
+        try:
+            warm = await measure(command, env, work_dir, work_dir, args.runs, forkserver=client)
+        finally:
+            client.shutdown()
+
+    report("exec", cold)
+    report("forkserver", warm)
+    print(f"\nfork-server一次性预热耗时: {warmup_ms:.1f}ms")
+    print(f"平均每次节省: {statistics.mean(cold) - statistics.mean(warm):.1f}ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
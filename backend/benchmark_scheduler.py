@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+调度器秒级触发吞吐测试脚本
+在临时SQLite数据库中创建一批按固定间隔触发的任务，启动完整的调度器（触发、分发、
+执行记录、日志、子进程）运行一段时间，统计实际每分钟执行数和触发延迟：
+1. 触发延迟: 执行开始时间 - 计划触发时间（反映每次触发的处理开销和是否漂移）
+2. 排队等待: 调度器记录的从触发到启动的等待时间
+3. 重叠跳过/错过: 执行慢于触发或处理不过来时的跳过次数
+
+用法:
+    python benchmark_scheduler.py --tasks 200 --interval 5 --duration 60
+    python benchmark_scheduler.py --tasks 200 --interval 5 --spawn-mode forkserver
+"""
+import os
+import sys
+import time
+import logging
+import argparse
+import tempfile
+import statistics
+from datetime import datetime
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="测试调度器秒级触发的吞吐量和延迟")
+    parser.add_argument("--tasks", type=int, default=200, help="任务数")
+    parser.add_argument("--interval", type=int, default=5, help="每个任务的触发间隔（秒）")
+    parser.add_argument("--duration", type=int, default=60, help="运行时长（秒）")
+    parser.add_argument("--executor-mode", default="async", choices=["async", "thread"], help="任务执行器模式")
+    parser.add_argument("--spawn-mode", default="exec", choices=["exec", "forkserver"], help="任务进程启动方式")
+    return parser.parse_args()
+
+
+def percentile(values: list, p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def main():
+    args = parse_args()
+    work_dir = tempfile.mkdtemp(prefix="pyschedule-bench-")
+
+    # 数据库、数据目录和执行器配置在导入后端模块前通过环境变量设置
+    os.environ.update({
+        "DATABASE_URL": f"sqlite:///{os.path.join(work_dir, 'bench.db')}",
+        "DATA_ROOT": os.path.join(work_dir, "data"),
+        "LOGS_ROOT": os.path.join(work_dir, "logs"),
+        "TASK_EXECUTOR_MODE": args.executor_mode,
+        "TASK_SPAWN_MODE": args.spawn_mode,
+        "TASK_MAX_CONCURRENCY_PER_OWNER": str(max(args.tasks, 100)),
+        "FORKSERVER_PRELOAD": "",
+        "FORKSERVER_SOCKET": os.path.join(work_dir, "forkserver.sock"),
+        "LOG_COMPRESSION_ENABLED": "false",
+    })
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    from database import Base, engine, SessionLocal
+    from models import User, Task, TaskExecution, TaskStatus
+    from task_scheduler import task_scheduler
+    logging.getLogger().setLevel(logging.WARNING)
+
+    Base.metadata.create_all(bind=engine)
+    script = os.path.join(work_dir, "bench_task.py")
+    with open(script, "w", encoding="utf-8") as f:
+        f.write("import os\nprint('task', os.environ.get('TASK_ID'))\n")
+
+    db = SessionLocal()
+    user = User(username="bench", email="bench@example.com", hashed_password="-")
+    db.add(user)
+    db.commit()
+    db.add_all([
+        Task(name=f"bench-{i}", script_path=script, cron_expression="", interval_seconds=args.interval,
+             owner_id=user.id, is_active=True)
+        for i in range(args.tasks)
+    ])
+    db.commit()
+
+    expected_per_minute = args.tasks * 60 / args.interval
+    print(f"{args.tasks} 个任务，每 {args.interval} 秒触发一次，预期 {expected_per_minute:.0f} 次/分钟，"
+          f"运行 {args.duration} 秒（{args.executor_mode}/{args.spawn_mode}）\n")
+
+    task_scheduler.start()
+    started = time.time()
+    time.sleep(args.duration)
+    task_scheduler.scheduler.pause()
+    elapsed = time.time() - started
+    metrics = task_scheduler.get_metrics()
+
+    # 等待已触发的执行结束后再关闭
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        stats = task_scheduler.dispatch_queue.stats()
+        if not stats["running"] and not stats["waiting"]:
+            break
+        time.sleep(0.5)
+    task_scheduler.shutdown()
+
+    executions = db.query(TaskExecution).filter(
+        TaskExecution.scheduled_time.isnot(None),
+        TaskExecution.scheduled_time <= datetime.fromtimestamp(started + args.duration)
+    ).all()
+    lags = [
+        (e.start_time - e.scheduled_time).total_seconds() * 1000
+        for e in executions if e.status != TaskStatus.SKIPPED
+    ]
+    finished = sum(1 for e in executions if e.status == TaskStatus.SUCCESS)
+    skipped = sum(1 for e in executions if e.status == TaskStatus.SKIPPED)
+    db.close()
+
+    print(f"触发次数:     {metrics['fired']}（{metrics['fired'] * 60 / elapsed:.0f} 次/分钟）")
+    print(f"执行记录:     {len(executions)}，成功 {finished}，重叠跳过 {skipped}")
+    print(f"实际吞吐:     {len(lags) * 60 / args.duration:.0f} 次/分钟（预期 {expected_per_minute:.0f}）")
+    print(f"错过触发:     跳过 {metrics['missed_skipped']}，合并 {metrics['missed_coalesced']}")
+    if lags:
+        print(f"触发延迟:     平均 {statistics.mean(lags):.1f}ms  中位数 {statistics.median(lags):.1f}ms  "
+              f"P95 {percentile(lags, 0.95):.1f}ms  P99 {percentile(lags, 0.99):.1f}ms  最大 {max(lags):.1f}ms")
+    print(f"排队等待:     {metrics['queue_wait_ms']}")
+    print(f"\n临时目录: {work_dir}")
+
+
+if __name__ == "__main__":
+    main()
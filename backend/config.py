@@ -21,6 +21,43 @@ class Settings(BaseSettings):
     # 日志配置
     LOG_LEVEL: str = "INFO"
     
+    # 任务执行器配置
+    TASK_EXECUTOR_MODE: str = "thread"  # thread: 在调度线程中阻塞执行; async: 单个asyncio事件循环驱动所有子进程
+    TASK_MAX_CONCURRENCY: int = 1000  # async模式下全局最大并发执行数（thread模式为SCHEDULER_DISPATCH_THREADS）
+    TASK_MAX_CONCURRENCY_PER_OWNER: int = 100  # 单个用户最大并发执行数
+    TASK_DEFAULT_TIMEOUT_SECONDS: int = 3600  # 任务未设置超时时的默认执行超时
+    TASK_DEFAULT_MEMORY_LIMIT_MB: int = 0  # 任务未设置内存上限时的默认值，0表示不限制
+    WORKSPACE_SCRIPT_TIMEOUT_SECONDS: int = 300  # 工作区直接执行脚本的超时时间
+    FANOUT_MAX_CHILDREN: int = 1000  # 扇出执行一次最多展开的子执行数
+    
+    # 调度器配置
+    SCHEDULER_DISPATCH_THREADS: int = 10  # 触发处理线程数；thread模式下任务执行线程数与之相同
+    SCHEDULER_MISFIRE_GRACE_SECONDS: int = 60  # 超过该时间未触发视为错过
+    SCHEDULER_CATCHUP_RATE_PER_MINUTE: int = 60  # 补跑策略每分钟最多分发的执行数
+    SCHEDULER_SPREAD_WINDOW_SECONDS: int = 0  # 全局错峰窗口，任务按ID在窗口内固定偏移启动，0表示不错峰
+    
+    # 多副本集群配置（多个后端共享同一个MySQL时开启）
+    SCHEDULER_CLUSTER_MODE: bool = False  # 开启后每次触发通过数据库租约保证只执行一次，执行由各节点从队列领取
+    SCHEDULER_NODE_ID: str = ""  # 节点标识，默认 主机名-进程号
+    CLUSTER_POLL_INTERVAL_SECONDS: float = 2  # 节点领取排队执行的轮询间隔
+    CLUSTER_NODE_TIMEOUT_SECONDS: int = 30  # 超过该时间无心跳视为节点离线
+    CLUSTER_LEASE_RETENTION_DAYS: int = 7  # 触发租约记录保留天数
+    
+    # 任务进程启动方式
+    TASK_SPAWN_MODE: str = "exec"  # exec: 每次启动新解释器; forkserver: 从预热的常驻进程fork子进程
+    FORKSERVER_PRELOAD: str = "pandas,pymongo,db_configs"  # fork-server预导入的模块，逗号分隔
+    FORKSERVER_SOCKET: str = "/tmp/pyschedule-forkserver.sock"  # fork-server的Unix socket路径
+    
+    # 执行链路追踪导出（OTLP/JSON），均为空时只保存到执行记录
+    TRACE_EXPORT_FILE: str = ""  # 导出文件，每批一行ExportTraceServiceRequest
+    TRACE_EXPORT_ENDPOINT: str = ""  # OTLP/HTTP collector地址，如 http://otel-collector:4318/v1/traces
+    TRACE_EXPORT_HEADERS: str = ""  # 导出请求的额外请求头，格式 key=value,key2=value2
+    
+    # 执行日志压缩（按块压缩，读取、搜索、下载时自动解压）
+    LOG_COMPRESSION_ENABLED: bool = True  # 是否在后台压缩执行已结束的日志
+    LOG_COMPRESS_AFTER_MINUTES: int = 60  # 日志最后修改超过该时间才压缩
+    LOG_COMPRESS_INTERVAL_SECONDS: int = 600  # 扫描待压缩日志的间隔
+    
     class Config:
         env_file = ".env"
         case_sensitive = False
@@ -3,7 +3,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 import os
 from database import engine, Base
-from routers import auth, tasks, users, workspace, terminal_ws, audit_logs, audit_cleaner, system, web_terminal_ws, packages
+from routers import auth, tasks, users, workspace, terminal_ws, audit_logs, audit_cleaner, system, web_terminal_ws, packages, scheduler
 from task_scheduler import task_scheduler
 from config import settings
 import logging
@@ -30,8 +30,8 @@ async def lifespan(app: FastAPI):
     os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
     logger.info(f"上传目录已创建: {settings.UPLOAD_DIR}")
     
-    # 加载定时任务
-    task_scheduler.load_tasks_from_db()
+    # 启动调度器并加载定时任务
+    task_scheduler.start()
     logger.info("定时任务已加载")
     
     yield
@@ -89,6 +89,13 @@ app.include_router(script_execution_ws.router)
 # 注册包管理路由
 app.include_router(packages.router)
 
+# 注册调度器监控路由
+app.include_router(scheduler.router)
+
+# 注册执行日志实时跟踪WebSocket路由
+from routers import task_log_ws
+app.include_router(task_log_ws.router)
+
 
 @app.get("/")
 def root():
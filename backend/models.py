@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Enum, Float
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Enum, Float, BigInteger, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from database import Base
 from datetime import datetime
@@ -21,6 +21,21 @@ class TaskStatus(str, enum.Enum):
     SUCCESS = "success"
     FAILED = "failed"
     PAUSED = "paused"
+    QUEUED = "queued"  # 上一次执行未结束，排队等待
+    SKIPPED = "skipped"  # 上一次执行未结束，本次跳过
+
+
+class MisfirePolicy(str, enum.Enum):
+    """错过触发（如停机期间）的处理策略"""
+    SKIP = "skip"  # 跳过错过的触发
+    COALESCE = "coalesce"  # 合并为一次执行
+    CATCHUP = "catchup"  # 按限速逐个补跑
+
+
+class OverlapPolicy(str, enum.Enum):
+    """运行实例数达到上限时再次触发的处理策略"""
+    SKIP = "skip"  # 跳过本次触发
+    QUEUE = "queue"  # 排队，等运行中的实例结束后执行
 
 
 class User(Base):
@@ -33,6 +48,7 @@ class User(Base):
     role = Column(Enum(UserRole), default=UserRole.USER, nullable=False)
     is_active = Column(Boolean, default=True, nullable=False)
     can_manage_packages = Column(Boolean, default=False, nullable=False)  # 包管理权限
+    share_weight = Column(Integer, default=1, nullable=False)  # 任务分发的公平份额权重
     last_activity = Column(DateTime, nullable=True)  # 最后活动时间（用于判断在线状态）
     created_at = Column(DateTime, default=get_current_time, nullable=False)
     updated_at = Column(DateTime, default=get_current_time, onupdate=get_current_time, nullable=False)
@@ -49,9 +65,42 @@ class Task(Base):
     description = Column(Text)
     script_path = Column(String(255), nullable=False)
     script_params = Column(Text, nullable=True)  # 脚本命令行参数
-    cron_expression = Column(String(100), nullable=False)
+    cron_expression = Column(String(100), nullable=False)  # 5段crontab或6段秒级cron（秒 分 时 日 月 周）
+    interval_seconds = Column(Integer)  # 执行间隔（秒），配置后优先于cron表达式
+    misfire_policy = Column(String(20), default=MisfirePolicy.COALESCE.value, nullable=False)  # 错过触发处理策略
+    priority = Column(Integer, default=5, nullable=False)  # 分发优先级（0-9，越大越先启动）
+    jitter_seconds = Column(Integer)  # 错峰窗口（秒），为空时使用全局窗口，0表示不错峰
+    overlap_policy = Column(String(20), default=OverlapPolicy.SKIP.value, nullable=False)  # 重叠执行处理策略
+    max_instances = Column(Integer, default=1, nullable=False)  # 最多同时运行的实例数
+    # 资源限制（为空时使用全局默认值或不限制）
+    timeout_seconds = Column(Integer)  # 执行超时（秒）
+    memory_limit_mb = Column(Integer)  # 地址空间上限（MB）
+    cpu_limit_seconds = Column(Integer)  # CPU时间上限（秒）
+    nice_level = Column(Integer)  # nice值（0-19，越大优先级越低）
+    ionice_class = Column(String(20))  # IO调度类别：best-effort/idle
+    max_open_files = Column(Integer)  # 最大打开文件数
+    # 失败重试
+    retry_max_attempts = Column(Integer, default=1, nullable=False)  # 最大尝试次数（含首次），1表示不重试
+    retry_delay_seconds = Column(Integer, default=60, nullable=False)  # 首次重试间隔（秒）
+    retry_backoff_factor = Column(Float, default=2.0, nullable=False)  # 每次重试间隔的倍数
+    retry_on_exit_codes = Column(String(100))  # 可重试的退出码（逗号分隔），为空时任意失败都重试
+    dependency_fired_at = Column(DateTime)  # 上游全部成功后最近一次触发本任务的时间
+    # 参数化扇出（配置参数后一次触发展开为多个子执行）
+    fanout_params = Column(Text)  # 扇出参数，每行一组
+    fanout_params_file = Column(String(255))  # 扇出参数文件（INPUT_DIR下的相对路径）
+    fanout_concurrency = Column(Integer, default=4, nullable=False)  # 子执行最大并发数
+    # 执行结果缓存：脚本、参数和输入目录与最近一次成功执行相同时跳过执行
+    cache_enabled = Column(Boolean, default=False, nullable=False)
+    cache_link_outputs = Column(Boolean, default=False, nullable=False)  # 命中缓存时将上次的产出文件链接到本次输出目录
+    # 文件到达触发：监听目录中有文件写入完成或移入时触发（与cron触发同时生效）
+    file_trigger_enabled = Column(Boolean, default=False, nullable=False)
+    file_trigger_path = Column(String(255))  # 监听的工作区目录（相对路径），为空时监听INPUT_DIR
+    file_trigger_pattern = Column(String(100))  # 文件名通配符，为空时匹配全部文件
+    file_trigger_debounce_seconds = Column(Integer, default=5, nullable=False)  # 最后一个文件到达后等待的安静时间（秒）
+    file_trigger_batch_seconds = Column(Integer, default=60, nullable=False)  # 第一个文件到达后最长等待时间（秒）
     status = Column(Enum(TaskStatus), default=TaskStatus.PENDING, nullable=False)
     is_active = Column(Boolean, default=True, nullable=False)
+    is_paused = Column(Boolean, default=False, nullable=False)  # 暂停自动触发（定时、文件到达、上游依赖），仍可手动执行
     owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     created_at = Column(DateTime, default=get_current_time, nullable=False)
     updated_at = Column(DateTime, default=get_current_time, onupdate=get_current_time, nullable=False)
@@ -64,22 +113,83 @@ class Task(Base):
 
 class TaskExecution(Base):
     __tablename__ = "task_executions"
+    # 按状态查询运行中/排队中的执行（重启恢复、实例数检查），避免扫描历史记录
+    __table_args__ = (Index("ix_task_executions_status_task", "status", "task_id"),)
     
     id = Column(Integer, primary_key=True, index=True)
     task_id = Column(Integer, ForeignKey("tasks.id"), nullable=False)
     executed_by = Column(Integer, ForeignKey("users.id"))  # 执行用户ID
-    trigger_type = Column(String(20), default="scheduled")  # scheduled/manual
+    trigger_type = Column(String(20), default="scheduled")  # scheduled/manual/catchup/retry/dependency/file
+    scheduled_time = Column(DateTime)  # 计划触发时间（手动执行为空）
+    retry_of_id = Column(Integer, index=True)  # 重试时为首次执行的记录ID
+    upstream_execution_id = Column(Integer)  # 依赖触发时为触发本次执行的上游执行记录ID
+    parent_execution_id = Column(Integer, index=True)  # 扇出子执行所属的父执行记录ID
+    params = Column(Text)  # 扇出子执行的参数
+    summary = Column(Text)  # 扇出父执行的子执行结果汇总（JSON格式）
+    fingerprint = Column(String(64))  # 脚本、参数和输入目录的指纹（开启缓存的任务）
+    trigger_event_at = Column(DateTime)  # 文件触发时本批第一个文件到达的时间
+    trigger_files = Column(Text)  # 文件触发时本批到达的文件名（JSON格式）
+    event_latency_ms = Column(Integer)  # 文件触发延迟：从第一个文件到达到启动（毫秒）
+    trace = Column(Text)  # 执行各阶段耗时（JSON格式，见utils.tracing）
+    attempt = Column(Integer, default=1, nullable=False)  # 第几次尝试（从1开始）
     status = Column(Enum(TaskStatus), nullable=False)
+    status_reason = Column(String(50))  # 状态原因：timeout/memory_limit/cpu_limit/open_files_limit/overlap/lost_on_restart/exit_unknown/fanout/cache_hit
     start_time = Column(DateTime, default=get_current_time, nullable=False)
     end_time = Column(DateTime)
     log_file = Column(String(500))  # 日志文件路径（替代output和error）
     exit_code = Column(Integer)  # 退出码
     output_files = Column(Text)  # 产出文件列表（JSON格式）
+    node_id = Column(String(100))  # 执行节点标识
+    pid = Column(Integer)  # 任务进程ID
+    pgid = Column(Integer)  # 任务进程组ID
+    queue_wait_ms = Column(Integer)  # 从触发到启动的排队等待时间（毫秒）
+    # 资源占用（fork-server模式来自wait4，否则为运行期间采样值）
+    cpu_user_seconds = Column(Float)  # 用户态CPU时间（秒）
+    cpu_system_seconds = Column(Float)  # 内核态CPU时间（秒）
+    max_rss_kb = Column(Integer)  # 峰值常驻内存（KB）
+    io_read_bytes = Column(BigInteger)  # 块设备读取字节数
+    io_write_bytes = Column(BigInteger)  # 块设备写入字节数
+    ctx_switches_voluntary = Column(Integer)  # 自愿上下文切换次数
+    ctx_switches_involuntary = Column(Integer)  # 非自愿上下文切换次数
     
     task = relationship("Task", back_populates="executions")
     executor = relationship("User", foreign_keys=[executed_by])
 
 
+class TaskDependency(Base):
+    """任务依赖表：上游任务执行成功后触发下游任务"""
+    __tablename__ = "task_dependencies"
+    __table_args__ = (UniqueConstraint("task_id", "upstream_task_id", name="uq_task_upstream"),)
+    
+    id = Column(Integer, primary_key=True, index=True)
+    task_id = Column(Integer, ForeignKey("tasks.id", ondelete="CASCADE"), nullable=False, index=True)  # 下游任务
+    upstream_task_id = Column(Integer, ForeignKey("tasks.id", ondelete="CASCADE"), nullable=False, index=True)  # 上游任务
+    created_at = Column(DateTime, default=get_current_time, nullable=False)
+
+
+class TaskFireLease(Base):
+    """触发租约表：多副本部署时保证每个任务的每个触发时间只执行一次"""
+    __tablename__ = "task_fire_leases"
+    __table_args__ = (UniqueConstraint("task_id", "fire_time", name="uq_task_fire_time"),)
+    
+    id = Column(Integer, primary_key=True, index=True)
+    task_id = Column(Integer, nullable=False)
+    fire_time = Column(DateTime, nullable=False)  # 计划触发时间（文件触发为批次中文件最早的修改时间）
+    node_id = Column(String(100), nullable=False)  # 获得租约的节点
+    created_at = Column(DateTime, default=get_current_time, nullable=False, index=True)
+
+
+class SchedulerNode(Base):
+    """调度节点心跳表"""
+    __tablename__ = "scheduler_nodes"
+    
+    node_id = Column(String(100), primary_key=True)
+    hostname = Column(String(255))
+    pid = Column(Integer)
+    started_at = Column(DateTime, default=get_current_time, nullable=False)
+    last_heartbeat = Column(DateTime, default=get_current_time, nullable=False)
+
+
 class AuditLog(Base):
     __tablename__ = "audit_logs"
     
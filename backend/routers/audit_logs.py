@@ -14,6 +14,8 @@ from database import get_db
 from models import AuditLog, AuditLogFile, ScriptExecution, User
 from auth import get_current_user, require_admin
 from utils.file_archiver import FileArchiver
+from utils.execution_log import get_execution_log_path
+from utils import log_reader
 import io
 import csv
 import json
@@ -320,20 +322,20 @@ def get_execution_log(
                 # 宿主机路径: v2/logs/execution/xxx.log
                 log_file_host_path = f"v2/{log_file}"
                 
-                # 读取日志内容
-                log_content = read_execution_log(log_file)
-                if log_content is None:
-                    log_content = "(日志文件不存在或已被删除)"
+                # 行数来自行偏移索引，不读取整个文件
+                file_info["line_count"] = log_reader.count_lines(full_path)
+                
+                if not full and file_size > 50000:  # 如果内容超过50KB
+                    # 只显示最后100行（从文件末尾反向读取）
+                    tail, is_partial = log_reader.read_tail(full_path, 100)
+                    log_content = tail.decode('utf-8', errors='replace')
+                    if is_partial:
+                        log_content = "⚠️ 日志内容较大，仅显示最后100行\n" + "="*80 + "\n\n" + log_content
                 else:
-                    # 计算行数
-                    lines = log_content.split('\n')
-                    file_info["line_count"] = len(lines)
-                    
-                    if not full and len(log_content) > 50000:  # 如果内容超过50KB
-                        # 只显示最后100行
-                        if len(lines) > 100:
-                            log_content = "⚠️ 日志内容较大，仅显示最后100行\n" + "="*80 + "\n\n" + '\n'.join(lines[-100:])
-                            is_partial = True
+                    # 读取日志内容
+                    log_content = read_execution_log(log_file)
+                    if log_content is None:
+                        log_content = "(日志文件不存在或已被删除)"
             else:
                 log_content = "(日志文件不存在或已被删除)"
         else:
@@ -355,6 +357,50 @@ def get_execution_log(
     }
 
 
+@router.get("/{audit_id}/log/page")
+def get_execution_log_page(
+    audit_id: int,
+    from_line: Optional[int] = Query(None, description="起始行号（从1开始）"),
+    to_line: Optional[int] = Query(None, description="结束行号"),
+    offset: Optional[int] = Query(None, description="字节位置游标（上一页返回的next_cursor/prev_cursor），优先于行号"),
+    direction: str = Query("forward", description="翻页方向: forward/backward"),
+    limit: int = Query(500, description="每页最多行数"),
+    grep: Optional[str] = Query(None, description="只返回包含关键字的行（不区分大小写）"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_admin)
+):
+    """
+    分页查看脚本执行日志（按行号或字节位置游标翻页，通过行偏移索引定位）
+    """
+    if direction not in ("forward", "backward"):
+        raise HTTPException(status_code=400, detail="翻页方向只能是 forward 或 backward")
+    
+    audit_log = db.query(AuditLog).filter(AuditLog.id == audit_id).first()
+    if not audit_log:
+        raise HTTPException(status_code=404, detail="审计记录不存在")
+    
+    try:
+        details = json.loads(audit_log.details) if audit_log.details else {}
+    except ValueError:
+        details = {}
+    log_file = details.get("log_file", "")
+    full_path = get_execution_log_path(log_file) if log_file else None
+    if not full_path or not os.path.exists(full_path):
+        raise HTTPException(status_code=404, detail="日志文件不存在或已被删除")
+    
+    try:
+        page = log_reader.read_page(
+            full_path, from_line=from_line, to_line=to_line, offset=offset,
+            backward=direction == "backward", limit=limit, grep=grep or None
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    page["audit_id"] = audit_id
+    page["direction"] = direction
+    return page
+
+
 # ============== 文件管理 ==============
 
 @router.get("/files/{file_id}/download")
@@ -0,0 +1,254 @@
+"""
+调度器监控API
+"""
+import time
+from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func, case
+from sqlalchemy.orm import Session
+from database import get_db
+from models import User, Task, TaskExecution, TaskStatus
+from schemas import ScheduleSimulationRequest
+from auth import require_admin, get_current_user
+from config import settings
+from task_scheduler import task_scheduler
+from utils import scheduler_cluster, schedule_forecast, schedule_triggers
+from utils.log_compressor import log_compressor
+
+router = APIRouter(prefix="/api/scheduler", tags=["调度器"])
+
+
+@router.get("/metrics")
+def get_scheduler_metrics(current_user: User = Depends(require_admin)):
+    """获取调度器运行指标（触发次数、错过处理、补跑吞吐量、执行器状态）"""
+    return task_scheduler.get_metrics()
+
+
+@router.get("/nodes")
+def list_scheduler_nodes(current_user: User = Depends(require_admin)):
+    """获取集群中的调度节点及其存活状态"""
+    return {
+        "cluster_mode": settings.SCHEDULER_CLUSTER_MODE,
+        "current_node": task_scheduler.node_id,
+        "nodes": scheduler_cluster.list_nodes(settings.CLUSTER_NODE_TIMEOUT_SECONDS)
+    }
+
+
+@router.get("/log-storage")
+def get_log_storage(current_user: User = Depends(require_admin)):
+    """任务日志的存储占用：未压缩/已压缩的文件数和字节数，以及压缩节省的空间"""
+    report = log_compressor.storage_report()
+    report["compression_enabled"] = settings.LOG_COMPRESSION_ENABLED
+    report["compressor"] = log_compressor.stats
+    return report
+
+
+@router.get("/top-consumers")
+def get_top_consumers(
+    days: int = Query(7, ge=1, le=365, description="统计最近N天"),
+    order_by: str = Query("cpu", description="排序指标: cpu/memory/io"),
+    limit: int = Query(20, ge=1, le=200, description="返回数量"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_admin)
+):
+    """按任务汇总最近N天的资源占用，用于调整定时任务的执行时段"""
+    if order_by not in ("cpu", "memory", "io"):
+        raise HTTPException(status_code=400, detail="排序指标只能是 cpu、memory 或 io")
+    
+    since = datetime.now() - timedelta(days=days)
+    cpu_total = func.sum(
+        func.coalesce(TaskExecution.cpu_user_seconds, 0) + func.coalesce(TaskExecution.cpu_system_seconds, 0)
+    )
+    io_read = func.sum(func.coalesce(TaskExecution.io_read_bytes, 0))
+    io_write = func.sum(func.coalesce(TaskExecution.io_write_bytes, 0))
+    peak_rss = func.max(TaskExecution.max_rss_kb)
+    sort_column = {"cpu": cpu_total, "memory": peak_rss, "io": io_read + io_write}[order_by]
+    
+    rows = db.query(
+        TaskExecution.task_id,
+        Task.name,
+        Task.owner_id,
+        func.count(TaskExecution.id).label("executions"),
+        cpu_total.label("cpu_seconds"),
+        peak_rss.label("peak_rss_kb"),
+        func.avg(TaskExecution.max_rss_kb).label("avg_rss_kb"),
+        io_read.label("io_read_bytes"),
+        io_write.label("io_write_bytes"),
+    ).join(
+        Task, Task.id == TaskExecution.task_id
+    ).filter(
+        TaskExecution.start_time >= since,
+        TaskExecution.end_time.isnot(None)
+    ).group_by(
+        TaskExecution.task_id, Task.name, Task.owner_id
+    ).order_by(
+        sort_column.desc()
+    ).limit(limit).all()
+    
+    return {
+        "days": days,
+        "order_by": order_by,
+        "items": [{
+            "task_id": row.task_id,
+            "task_name": row.name,
+            "owner_id": row.owner_id,
+            "executions": row.executions,
+            "cpu_seconds": round(float(row.cpu_seconds or 0), 3),
+            "avg_cpu_seconds": round(float(row.cpu_seconds or 0) / row.executions, 3),
+            "peak_rss_kb": row.peak_rss_kb,
+            "avg_rss_kb": int(row.avg_rss_kb) if row.avg_rss_kb is not None else None,
+            "io_read_bytes": int(row.io_read_bytes or 0),
+            "io_write_bytes": int(row.io_write_bytes or 0),
+        } for row in rows]
+    }
+
+
+@router.get("/retry-stats")
+def get_retry_stats(
+    days: int = Query(7, ge=1, le=365, description="统计最近N天"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_admin)
+):
+    """按任务统计最近N天的失败重试效果：首次失败次数、重试次数、被重试挽救的执行数"""
+    since = datetime.now() - timedelta(days=days)
+    
+    failures = dict(db.query(
+        TaskExecution.task_id, func.count(TaskExecution.id)
+    ).filter(
+        TaskExecution.start_time >= since,
+        TaskExecution.retry_of_id.is_(None),
+        TaskExecution.status == TaskStatus.FAILED
+    ).group_by(TaskExecution.task_id).all())
+    
+    # 同一首次执行的多次重试中有一次成功即视为挽救
+    rescued = func.count(func.distinct(case(
+        (TaskExecution.status == TaskStatus.SUCCESS, TaskExecution.retry_of_id)
+    )))
+    rows = db.query(
+        TaskExecution.task_id,
+        Task.name,
+        func.count(TaskExecution.id).label("retry_attempts"),
+        func.count(func.distinct(TaskExecution.retry_of_id)).label("retried"),
+        rescued.label("rescued"),
+    ).join(
+        Task, Task.id == TaskExecution.task_id
+    ).filter(
+        TaskExecution.start_time >= since,
+        TaskExecution.retry_of_id.isnot(None)
+    ).group_by(TaskExecution.task_id, Task.name).all()
+    
+    items = [{
+        "task_id": row.task_id,
+        "task_name": row.name,
+        "first_attempt_failures": failures.get(row.task_id, 0),
+        "retried": row.retried,
+        "retry_attempts": row.retry_attempts,
+        "rescued": row.rescued,
+        "rescue_rate": round(row.rescued / row.retried, 4) if row.retried else None,
+    } for row in rows]
+    
+    total_retried = sum(item["retried"] for item in items)
+    total_rescued = sum(item["rescued"] for item in items)
+    return {
+        "days": days,
+        "retried": total_retried,
+        "rescued": total_rescued,
+        "rescue_rate": round(total_rescued / total_retried, 4) if total_retried else None,
+        "items": sorted(items, key=lambda item: item["retried"], reverse=True)
+    }
+
+
+@router.post("/simulate")
+def simulate_schedule(
+    simulation: ScheduleSimulationRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """预测时间窗口内每分钟的并发执行数和CPU需求
+    
+    按全部活跃任务的cron表达式或执行间隔计算触发时间，执行时长和CPU核数取各任务最近执行的中位数；
+    传入待添加任务的调度配置时，同时返回其各次触发时刻已有的负载
+    """
+    started = time.perf_counter()
+    start = (simulation.start or datetime.now()).replace(second=0, microsecond=0)
+    minutes = simulation.hours * 60
+    
+    candidate = None
+    if simulation.cron_expression or simulation.interval_seconds:
+        try:
+            schedule_triggers.build_trigger(simulation.cron_expression, simulation.interval_seconds)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"调度配置无效: {str(e)}")
+        candidate = schedule_forecast.ForecastTask(
+            task_id=None,
+            cron_expression=simulation.cron_expression,
+            interval_seconds=simulation.interval_seconds,
+            offset_seconds=0,
+            duration_seconds=simulation.duration_seconds,
+            cpu_cores=simulation.cpu_cores,
+            max_instances=simulation.max_instances,
+        )
+    
+    profiles = schedule_forecast.load_task_profiles(db)
+    tasks = db.query(
+        Task.id, Task.cron_expression, Task.interval_seconds, Task.jitter_seconds, Task.max_instances
+    ).filter(Task.is_active == True, Task.script_path != "").all()
+    
+    forecast_tasks, no_history = [], 0
+    for task in tasks:
+        duration, cores = profiles.get(task.id, (None, None))
+        if duration is None:
+            no_history += 1
+        forecast_tasks.append(schedule_forecast.ForecastTask(
+            task_id=task.id,
+            cron_expression=task.cron_expression,
+            interval_seconds=task.interval_seconds,
+            offset_seconds=schedule_triggers.offset_seconds(
+                task.id, task.cron_expression, task.interval_seconds, task.jitter_seconds
+            ),
+            duration_seconds=duration or schedule_forecast.DEFAULT_DURATION_SECONDS,
+            cpu_cores=cores if cores is not None else schedule_forecast.DEFAULT_CPU_CORES,
+            max_instances=task.max_instances or 1,
+        ))
+    
+    result = schedule_forecast.forecast(forecast_tasks, start, minutes)
+    order = result["concurrency"].argsort()[::-1][:simulation.top]
+    
+    def minute_stats(i) -> dict:
+        return {
+            "time": start + timedelta(minutes=int(i)),
+            "fires": int(result["fires"][i]),
+            "concurrency": round(float(result["concurrency"][i]), 3),
+            "peak_concurrency": int(result["peak_concurrency"][i]),
+            "cpu_cores": round(float(result["cpu_cores"][i]), 3),
+        }
+    
+    response = {
+        "start": start,
+        "end": start + timedelta(minutes=minutes),
+        "tasks": len(forecast_tasks) - len(result["invalid_task_ids"]),
+        "tasks_without_history": no_history,
+        "invalid_task_ids": result["invalid_task_ids"],
+        "series": {
+            "fires": result["fires"].tolist(),
+            "concurrency": result["concurrency"].round(3).tolist(),
+            "peak_concurrency": result["peak_concurrency"].tolist(),
+            "cpu_cores": result["cpu_cores"].round(3).tolist(),
+        },
+        "peaks": [minute_stats(i) for i in order if result["concurrency"][i] > 0],
+    }
+    
+    if candidate:
+        # 待添加任务触发的分钟里已有的负载
+        fire_minutes = schedule_forecast.forecast([candidate], start, minutes)["fires"].nonzero()[0]
+        busiest = fire_minutes[result["concurrency"][fire_minutes].argsort()[::-1][:simulation.top]]
+        response["candidate"] = {
+            "fires": len(fire_minutes),
+            "max_concurrency_at_fire": int(result["peak_concurrency"][fire_minutes].max(initial=0)),
+            "avg_concurrency_at_fire": round(float(result["concurrency"][fire_minutes].mean()), 3) if len(fire_minutes) else 0,
+            "max_cpu_cores_at_fire": round(float(result["cpu_cores"][fire_minutes].max(initial=0)), 3),
+            "busiest_fires": [minute_stats(i) for i in busiest],
+        }
+    
+    response["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    return response
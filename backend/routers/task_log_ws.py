@@ -0,0 +1,93 @@
+"""
+执行日志实时跟踪WebSocket
+推送运行中执行新写入的日志，断线重连时带上次收到的next_offset只补发缺失部分
+"""
+import asyncio
+import logging
+
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends
+from sqlalchemy.orm import Session
+
+from database import get_db
+from models import Task, TaskExecution
+from auth import get_current_user_ws
+from utils.log_follower import log_follower, execution_running
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api")
+
+
+async def _wait_disconnect(websocket: WebSocket):
+    """等待客户端断开（客户端发来的其他消息忽略）"""
+    while True:
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            return
+
+
+@router.websocket("/ws/tasks/{task_id}/executions/{execution_id}/log")
+async def follow_execution_log(
+    websocket: WebSocket,
+    task_id: int,
+    execution_id: int,
+    db: Session = Depends(get_db)
+):
+    """实时跟踪执行日志（查询参数：token认证，offset开始位置）"""
+    await websocket.accept()
+    
+    async def reject(message: str):
+        try:
+            await websocket.send_json({"type": "error", "message": message})
+        except Exception:
+            pass
+        await websocket.close(code=1008)
+    
+    current_user = await get_current_user_ws(websocket, db)
+    if not current_user:
+        await reject("Token无效或已过期，请重新登录")
+        return
+    
+    task = db.query(Task).filter(Task.id == task_id).first()
+    if not task:
+        await reject("任务不存在")
+        return
+    if task.owner_id != current_user.id and current_user.role != "admin":
+        await reject("无权限查看此任务")
+        return
+    
+    execution = db.query(TaskExecution).filter(
+        TaskExecution.id == execution_id,
+        TaskExecution.task_id == task_id
+    ).first()
+    if not execution or not execution.log_file:
+        await reject("执行记录或日志文件不存在")
+        return
+    
+    offset = websocket.query_params.get("offset", "0")
+    if not offset.isdigit():
+        await reject("开始位置应为非负整数")
+        return
+    log_file = execution.log_file
+    db.close()
+    
+    async def pump():
+        async for message in log_follower.follow(log_file, int(offset), execution_running(execution_id)):
+            await websocket.send_json(message)
+    
+    pump_task = asyncio.create_task(pump())
+    disconnect_task = asyncio.create_task(_wait_disconnect(websocket))
+    try:
+        done, _ = await asyncio.wait({pump_task, disconnect_task}, return_when=asyncio.FIRST_COMPLETED)
+        if pump_task in done:
+            pump_task.result()
+            await websocket.close()
+    except FileNotFoundError:
+        await reject("日志文件不存在")
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.error(f"跟踪执行日志失败: execution={execution_id}, {e}")
+    finally:
+        pump_task.cancel()
+        disconnect_task.cancel()
@@ -1,20 +1,28 @@
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Request
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from database import get_db
-from models import Task, TaskExecution, User, TaskStatus
-from schemas import TaskCreate, TaskUpdate, TaskResponse, TaskExecutionResponse
+from models import Task, TaskExecution, User, TaskStatus, TaskDependency
+from schemas import (
+    TaskCreate, TaskUpdate, TaskResponse, TaskExecutionResponse, TaskDependencyUpdate, TaskDependencyResponse,
+    BulkTaskAction, BulkTaskRequest
+)
 from auth import get_current_user, require_admin
 from audit import create_audit_log, AuditAction, ResourceType
 from task_scheduler import task_scheduler
 from config import settings
 from utils.ip_utils import get_real_ip
 from utils.task_logger import task_logger
-from utils.paths import get_execution_output_file
+from utils.log_follower import log_follower, execution_running
+from utils.paths import get_execution_output_file, WORKSPACE_DIR
+from utils.workspace_permissions import WorkspacePermissions
+from utils import task_dependencies, schedule_triggers, tracing, log_reader, log_storage
+import io
 import os
 import shutil
 import json
+import time
 import logging
 from datetime import datetime
 
@@ -22,6 +30,42 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/tasks", tags=["任务管理"])
 
 
+def _check_schedule(cron_expression: Optional[str], interval_seconds: Optional[int]):
+    """检查cron表达式或执行间隔能否构建触发器"""
+    try:
+        schedule_triggers.build_trigger(cron_expression, interval_seconds)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"调度配置无效: {str(e)}")
+
+
+def _check_file_trigger_path(path: Optional[str], current_user: User):
+    """文件到达触发的监听目录必须是当前用户可访问的工作区目录"""
+    if not path:
+        return
+    full_path, _ = WorkspacePermissions(WORKSPACE_DIR).get_accessible_path(current_user, path.strip("/"))
+    if not os.path.isdir(full_path):
+        raise HTTPException(status_code=400, detail=f"监听目录不存在: {path}")
+
+
+def _visible_tasks(db: Session, current_user: User, owner_id: Optional[int] = None, search: Optional[str] = None):
+    """当前用户可操作的任务查询（管理员可按创建者筛选），支持按名称、描述或cron表达式搜索"""
+    if current_user.role == "admin":
+        query = db.query(Task)
+        if owner_id is not None:
+            query = query.filter(Task.owner_id == owner_id)
+    else:
+        query = db.query(Task).filter(Task.owner_id == current_user.id)
+    
+    if search:
+        search_pattern = f"%{search}%"
+        query = query.filter(
+            (Task.name.like(search_pattern)) |
+            (Task.description.like(search_pattern)) |
+            (Task.cron_expression.like(search_pattern))
+        )
+    return query
+
+
 @router.post("", response_model=TaskResponse, status_code=status.HTTP_201_CREATED)
 def create_task(
     task: TaskCreate,
@@ -30,6 +74,9 @@ def create_task(
     current_user: User = Depends(get_current_user)
 ):
     """创建任务"""
+    _check_schedule(task.cron_expression, task.interval_seconds)
+    _check_file_trigger_path(task.file_trigger_path, current_user)
+    
     # 创建任务记录（脚本稍后上传）
     db_task = Task(
         name=task.name,
@@ -37,6 +84,32 @@ def create_task(
         script_path="",  # 稍后更新
         script_params=task.script_params,  # 保存脚本参数
         cron_expression=task.cron_expression,
+        interval_seconds=task.interval_seconds,
+        misfire_policy=task.misfire_policy.value,
+        priority=task.priority,
+        jitter_seconds=task.jitter_seconds,
+        overlap_policy=task.overlap_policy.value,
+        max_instances=task.max_instances,
+        timeout_seconds=task.timeout_seconds,
+        memory_limit_mb=task.memory_limit_mb,
+        cpu_limit_seconds=task.cpu_limit_seconds,
+        nice_level=task.nice_level,
+        ionice_class=task.ionice_class,
+        max_open_files=task.max_open_files,
+        retry_max_attempts=task.retry_max_attempts,
+        retry_delay_seconds=task.retry_delay_seconds,
+        retry_backoff_factor=task.retry_backoff_factor,
+        retry_on_exit_codes=task.retry_on_exit_codes,
+        fanout_params=task.fanout_params,
+        fanout_params_file=task.fanout_params_file,
+        fanout_concurrency=task.fanout_concurrency,
+        cache_enabled=task.cache_enabled,
+        cache_link_outputs=task.cache_link_outputs,
+        file_trigger_enabled=task.file_trigger_enabled,
+        file_trigger_path=task.file_trigger_path,
+        file_trigger_pattern=task.file_trigger_pattern,
+        file_trigger_debounce_seconds=task.file_trigger_debounce_seconds,
+        file_trigger_batch_seconds=task.file_trigger_batch_seconds,
         is_active=False,  # 创建时默认禁用，上传脚本后再根据用户选择决定是否启用
         owner_id=current_user.id
     )
@@ -51,7 +124,7 @@ def create_task(
         action=AuditAction.TASK_CREATE,
         resource_type=ResourceType.TASK,
         resource_id=db_task.id,
-        details={"name": task.name, "cron": task.cron_expression},
+        details={"name": task.name, "cron": task.cron_expression, "interval_seconds": task.interval_seconds},
         ip_address=get_real_ip(request)
     )
     
@@ -98,7 +171,7 @@ async def upload_script(
     # 如果启用，添加到调度器并计算下次执行时间
     if task.is_active:
         try:
-            next_run = task_scheduler.add_task(task.id, task.cron_expression)
+            next_run = task_scheduler.schedule_task(task)
             if next_run:
                 task.next_run_at = next_run
                 db.commit()
@@ -130,26 +203,7 @@ def list_tasks(
     current_user: User = Depends(get_current_user)
 ):
     """获取任务列表（支持搜索和按创建者筛选）"""
-    # 基础查询
-    if current_user.role == "admin":
-        query = db.query(Task)
-    else:
-        query = db.query(Task).filter(Task.owner_id == current_user.id)
-    
-    # 创建者过滤（仅管理员可用）
-    if owner_id is not None and current_user.role == "admin":
-        query = query.filter(Task.owner_id == owner_id)
-    
-    # 搜索过滤
-    if search:
-        search_pattern = f"%{search}%"
-        query = query.filter(
-            (Task.name.like(search_pattern)) |
-            (Task.description.like(search_pattern)) |
-            (Task.cron_expression.like(search_pattern))
-        )
-    
-    tasks = query.offset(skip).limit(limit).all()
+    tasks = _visible_tasks(db, current_user, owner_id, search).offset(skip).limit(limit).all()
     
     # 添加创建者用户名
     result = []
@@ -162,6 +216,92 @@ def list_tasks(
     return result
 
 
+@router.post("/bulk/{action}")
+def bulk_update_tasks(
+    action: BulkTaskAction,
+    bulk: BulkTaskRequest,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """批量暂停、恢复、启用、禁用任务或修改调度配置
+    
+    所有任务的修改在一个事务中提交，提交后批量同步调度器作业，只记录一条汇总的审计日志
+    """
+    filters = bulk.dict(include={"search", "owner_id", "is_active", "is_paused"}, exclude_none=True)
+    if bulk.task_ids is None and not filters:
+        raise HTTPException(status_code=400, detail="需要指定任务ID或筛选条件")
+    
+    if action == BulkTaskAction.PAUSE:
+        changes = {"is_paused": True}
+    elif action == BulkTaskAction.RESUME:
+        changes = {"is_paused": False}
+    elif action == BulkTaskAction.ENABLE:
+        changes = {"is_active": True}
+    elif action == BulkTaskAction.DISABLE:
+        changes = {"is_active": False}
+    else:
+        changes = bulk.dict(include={"cron_expression", "interval_seconds", "jitter_seconds"}, exclude_unset=True)
+        if not changes:
+            raise HTTPException(status_code=400, detail="需要提供cron表达式、执行间隔或错峰窗口")
+        if "cron_expression" in changes:
+            changes["cron_expression"] = changes["cron_expression"] or ""
+    
+    query = _visible_tasks(db, current_user, bulk.owner_id, bulk.search)
+    if bulk.task_ids is not None:
+        query = query.filter(Task.id.in_(bulk.task_ids))
+    if bulk.is_active is not None:
+        query = query.filter(Task.is_active == bulk.is_active)
+    if bulk.is_paused is not None:
+        query = query.filter(Task.is_paused == bulk.is_paused)
+    tasks = query.order_by(Task.id).with_for_update().all()
+    
+    if bulk.task_ids is not None and not filters:
+        missing = sorted(set(bulk.task_ids) - {task.id for task in tasks})
+        if missing:
+            raise HTTPException(status_code=404, detail=f"任务不存在或无权限操作: {missing}")
+    
+    if action == BulkTaskAction.RESCHEDULE:
+        # 按合并后的调度配置去重检查
+        for cron_expression, interval_seconds in {
+            (changes.get("cron_expression", task.cron_expression), changes.get("interval_seconds", task.interval_seconds))
+            for task in tasks
+        }:
+            _check_schedule(cron_expression, interval_seconds)
+    
+    changed = [task for task in tasks if any(getattr(task, field) != value for field, value in changes.items())]
+    for task in changed:
+        for field, value in changes.items():
+            setattr(task, field, value)
+    
+    # 审计日志与任务修改在同一个事务中提交
+    create_audit_log(
+        db=db,
+        user=current_user,
+        action=AuditAction.TASK_BULK_UPDATE,
+        resource_type=ResourceType.TASK,
+        details={
+            "action": action.value,
+            "filters": filters,
+            "task_ids": bulk.task_ids,
+            "changes": changes,
+            "matched": len(tasks),
+            "updated_task_ids": [task.id for task in changed],
+        },
+        ip_address=get_real_ip(request)
+    )
+    
+    next_runs, errors = task_scheduler.sync_tasks(changed)
+    return {
+        "action": action.value,
+        "matched": len(tasks),
+        "updated": len(changed),
+        "updated_task_ids": [task.id for task in changed],
+        "next_run_times": {task_id: next_run for task_id, next_run in next_runs.items() if next_run},
+        "scheduler_errors": errors,
+    }
+
+
 @router.get("/{task_id}", response_model=TaskResponse)
 def get_task(
     task_id: int,
@@ -204,6 +344,13 @@ def update_task(
     
     # 更新字段
     update_data = task_update.dict(exclude_unset=True)
+    if "cron_expression" in update_data or "interval_seconds" in update_data:
+        _check_schedule(
+            update_data.get("cron_expression", task.cron_expression),
+            update_data.get("interval_seconds", task.interval_seconds)
+        )
+    if update_data.get("file_trigger_path"):
+        _check_file_trigger_path(update_data["file_trigger_path"], current_user)
     for field, value in update_data.items():
         setattr(task, field, value)
     
@@ -213,7 +360,7 @@ def update_task(
     # 更新调度器
     if task.is_active and task.script_path:
         try:
-            task_scheduler.add_task(task.id, task.cron_expression)
+            task_scheduler.schedule_task(task)
         except Exception as e:
             raise HTTPException(status_code=400, detail=f"更新调度器失败: {str(e)}")
     else:
@@ -267,11 +414,87 @@ def delete_task(
         ip_address=get_real_ip(request)
     )
     
-    # 删除任务
+    # 删除任务及其依赖关系
+    task_dependencies.remove_task(db, task.id)
     db.delete(task)
     db.commit()
 
 
+def _dependency_response(db: Session, task_id: int) -> dict:
+    upstream = db.query(Task).join(
+        TaskDependency, TaskDependency.upstream_task_id == Task.id
+    ).filter(TaskDependency.task_id == task_id).order_by(Task.id).all()
+    downstream = db.query(Task).join(
+        TaskDependency, TaskDependency.task_id == Task.id
+    ).filter(TaskDependency.upstream_task_id == task_id).order_by(Task.id).all()
+    return {"task_id": task_id, "upstream": upstream, "downstream": downstream}
+
+
+@router.get("/{task_id}/dependencies", response_model=TaskDependencyResponse)
+def get_task_dependencies(
+    task_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """获取任务的上游和下游任务"""
+    task = db.query(Task).filter(Task.id == task_id).first()
+    if not task:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    
+    if task.owner_id != current_user.id and current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="无权限查看此任务")
+    
+    return _dependency_response(db, task_id)
+
+
+@router.put("/{task_id}/dependencies", response_model=TaskDependencyResponse)
+def update_task_dependencies(
+    task_id: int,
+    dependency_update: TaskDependencyUpdate,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """设置任务的上游任务：所有上游任务执行成功后立即触发本任务"""
+    task = db.query(Task).filter(Task.id == task_id).first()
+    if not task:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    
+    if task.owner_id != current_user.id and current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="无权限操作此任务")
+    
+    upstream_ids = set(dependency_update.upstream_task_ids)
+    if task_id in upstream_ids:
+        raise HTTPException(status_code=400, detail="任务不能依赖自身")
+    
+    upstream_tasks = db.query(Task).filter(Task.id.in_(upstream_ids)).all() if upstream_ids else []
+    missing = upstream_ids - {upstream.id for upstream in upstream_tasks}
+    if missing:
+        raise HTTPException(status_code=404, detail=f"上游任务不存在: {', '.join(map(str, sorted(missing)))}")
+    if current_user.role != "admin" and any(upstream.owner_id != current_user.id for upstream in upstream_tasks):
+        raise HTTPException(status_code=403, detail="只能依赖自己的任务")
+    
+    cycle = task_dependencies.find_cycle(task_dependencies.load_upstreams(db), task_id, upstream_ids)
+    if cycle:
+        raise HTTPException(status_code=400, detail=f"依赖关系存在循环: {' -> '.join(map(str, cycle))}")
+    
+    task_dependencies.set_upstreams(db, task_id, upstream_ids)
+    db.commit()
+    
+    # 记录审计日志
+    create_audit_log(
+        db=db,
+        user=current_user,
+        action=AuditAction.TASK_DEPENDENCY,
+        resource_type=ResourceType.TASK,
+        resource_id=task.id,
+        details={"upstream_task_ids": sorted(upstream_ids)},
+        ip_address=get_real_ip(request)
+    )
+    
+    return _dependency_response(db, task_id)
+
+
 @router.post("/{task_id}/execute", status_code=status.HTTP_202_ACCEPTED)
 def execute_task(
     task_id: int,
@@ -313,10 +536,14 @@ def get_task_executions(
     task_id: int,
     skip: int = 0,
     limit: int = 50,
+    parent_execution_id: Optional[int] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """获取任务执行记录"""
+    """获取任务执行记录
+    
+    默认只返回顶层执行（扇出子执行归属父执行），传入parent_execution_id时返回该父执行的子执行
+    """
     task = db.query(Task).filter(Task.id == task_id).first()
     if not task:
         raise HTTPException(status_code=404, detail="任务不存在")
@@ -326,7 +553,9 @@ def get_task_executions(
         raise HTTPException(status_code=403, detail="无权限查看此任务")
     
     executions = db.query(TaskExecution).filter(
-        TaskExecution.task_id == task_id
+        TaskExecution.task_id == task_id,
+        TaskExecution.parent_execution_id == parent_execution_id
+        if parent_execution_id is not None else TaskExecution.parent_execution_id.is_(None)
     ).order_by(TaskExecution.start_time.desc()).offset(skip).limit(limit).all()
     
     return executions
@@ -336,10 +565,11 @@ def get_task_executions(
 def search_execution_logs(
     task_id: int,
     keyword: str,
+    limit: int = 100,  # 最多返回的执行数
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """根据关键字搜索任务执行日志"""
+    """根据关键字搜索任务执行日志（全文索引，不区分大小写的子串匹配）"""
     task = db.query(Task).filter(Task.id == task_id).first()
     if not task:
         raise HTTPException(status_code=404, detail="任务不存在")
@@ -348,52 +578,79 @@ def search_execution_logs(
     if task.owner_id != current_user.id and current_user.role != "admin":
         raise HTTPException(status_code=403, detail="无权限查看此任务")
     
-    # 获取所有执行记录
-    executions = db.query(TaskExecution).filter(
-        TaskExecution.task_id == task_id,
-        TaskExecution.log_file.isnot(None)
-    ).order_by(TaskExecution.start_time.desc()).all()
+    keyword = keyword.strip()
+    if not keyword:
+        raise HTTPException(status_code=400, detail="搜索关键字不能为空")
+    
+    started = time.perf_counter()
+    executions = {
+        execution.id: execution for execution in db.query(TaskExecution).filter(
+            TaskExecution.task_id == task_id,
+            TaskExecution.log_file.isnot(None)
+        )
+    }
+    log_files = {
+        execution_id: execution.log_file for execution_id, execution in executions.items()
+        if log_storage.exists(execution.log_file)
+    }
+    
+    if task_logger.search_index.enabled:
+        # 全文索引：尚未索引完的执行（由后台继续索引）直接扫描文件，结果合并后按执行ID倒序
+        results, has_more, unindexed = task_logger.search_index.search(task_id, keyword, log_files, limit=limit)
+        if unindexed:
+            scanned, scan_more = _scan_execution_logs(keyword, unindexed, limit)
+            results = sorted(results + scanned, key=lambda result: result["execution_id"], reverse=True)
+            has_more = has_more or scan_more or len(results) > limit
+            results = results[:limit]
+    else:
+        results, has_more = _scan_execution_logs(keyword, log_files, limit)
     
-    # 搜索日志文件（优化：流式读取，避免大文件卡顿）
     matched_executions = []
-    for execution in executions:
-        if execution.log_file and os.path.exists(execution.log_file):
-            try:
-                # 检查文件大小，超过10MB跳过
-                file_size = os.path.getsize(execution.log_file)
-                if file_size > 10 * 1024 * 1024:  # 10MB
-                    continue
-                
-                # 流式读取，只保存匹配的行
-                matched_lines = []
-                with open(execution.log_file, 'r', encoding='utf-8') as f:
-                    for line in f:
-                        if keyword.lower() in line.lower():
-                            matched_lines.append(line.strip())
-                            if len(matched_lines) >= 3:  # 最多保存3行
-                                break
-                
-                if matched_lines:
-                    matched_executions.append({
-                        "id": execution.id,
-                        "task_id": execution.task_id,
-                        "trigger_type": execution.trigger_type,
-                        "status": execution.status,
-                        "start_time": execution.start_time,
-                        "end_time": execution.end_time,
-                        "exit_code": execution.exit_code,
-                        "matched_lines": matched_lines
-                    })
-            except Exception as e:
-                continue
+    for result in results:
+        execution = executions[result["execution_id"]]
+        matched_executions.append({
+            "id": execution.id,
+            "task_id": execution.task_id,
+            "trigger_type": execution.trigger_type,
+            "status": execution.status,
+            "start_time": execution.start_time,
+            "end_time": execution.end_time,
+            "exit_code": execution.exit_code,
+            "matched_lines": [match["text"] for match in result["matches"]],
+            "matches": result["matches"],
+        })
     
     return {
         "keyword": keyword,
         "total": len(matched_executions),
-        "executions": matched_executions
+        "has_more": has_more,  # 超过limit个执行匹配，只返回了最新的limit个
+        "executions": matched_executions,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
     }
 
 
+def _scan_execution_logs(keyword: str, log_files: dict, limit: int, lines_per_execution: int = 3):
+    """逐个文件流式扫描（按执行ID倒序），找到超过limit个匹配的执行后停止，返回 (结果, 是否还有更多)"""
+    keyword_lower = keyword.lower()
+    results = []
+    for execution_id in sorted(log_files, reverse=True):
+        matches = []
+        try:
+            with io.TextIOWrapper(log_storage.open_log(log_files[execution_id]), encoding='utf-8', errors='replace') as f:
+                for line_no, line in enumerate(f, 1):
+                    if keyword_lower in line.lower():
+                        matches.append({"line": line_no, "text": line.strip()})
+                        if len(matches) >= lines_per_execution:
+                            break
+        except OSError:
+            continue
+        if matches:
+            results.append({"execution_id": execution_id, "matches": matches})
+            if len(results) > limit:
+                return results[:limit], True
+    return results, False
+
+
 @router.get("/{task_id}/script")
 def get_task_script(
     task_id: int,
@@ -475,7 +732,7 @@ def save_task_script(
             except:
                 pass  # 如果任务不存在，忽略错误
             
-            next_run = task_scheduler.add_task(task.id, task.cron_expression)
+            next_run = task_scheduler.schedule_task(task)
             if next_run:
                 task.next_run_at = next_run
                 db.commit()
@@ -571,7 +828,7 @@ def get_execution_log(
         raise HTTPException(status_code=404, detail="执行记录不存在")
     
     # 读取日志文件
-    if not execution.log_file or not os.path.exists(execution.log_file):
+    if not execution.log_file or not log_storage.exists(execution.log_file):
         return {
             "log": "日志文件不存在",
             "log_file": execution.log_file,
@@ -608,6 +865,206 @@ def get_execution_log(
     }
 
 
+@router.get("/{task_id}/executions/{execution_id}/log/page")
+def get_execution_log_page(
+    task_id: int,
+    execution_id: int,
+    from_line: Optional[int] = None,  # 起始行号（从1开始）
+    to_line: Optional[int] = None,  # 结束行号
+    offset: Optional[int] = None,  # 字节位置游标（上一页返回的next_cursor/prev_cursor），优先于行号
+    direction: str = "forward",  # forward: 从游标向后翻页; backward: 从游标向前翻页
+    limit: int = 500,  # 每页最多行数
+    grep: Optional[str] = None,  # 只返回包含关键字的行（不区分大小写）
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """分页查看执行日志
+    
+    按行号或字节位置游标向前/向后翻页，通过行偏移索引定位，翻到大日志的任何位置与第一页开销相同；
+    不传游标时向后翻页从第1行开始，向前翻页从文件末尾开始
+    """
+    if direction not in ("forward", "backward"):
+        raise HTTPException(status_code=400, detail="翻页方向只能是 forward 或 backward")
+    
+    task = db.query(Task).filter(Task.id == task_id).first()
+    if not task:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    
+    if task.owner_id != current_user.id and current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="无权限查看此任务")
+    
+    execution = db.query(TaskExecution).filter(
+        TaskExecution.id == execution_id,
+        TaskExecution.task_id == task_id
+    ).first()
+    
+    if not execution:
+        raise HTTPException(status_code=404, detail="执行记录不存在")
+    
+    if not execution.log_file or not log_storage.exists(execution.log_file):
+        raise HTTPException(status_code=404, detail="日志文件不存在")
+    
+    try:
+        page = log_reader.read_page(
+            execution.log_file, from_line=from_line, to_line=to_line, offset=offset,
+            backward=direction == "backward", limit=limit, grep=grep or None
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    page["direction"] = direction
+    return page
+
+
+@router.get("/{task_id}/executions/{execution_id}/log/download")
+def download_execution_log(
+    task_id: int,
+    execution_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """下载完整执行日志（已压缩的日志边读边解压）"""
+    task = db.query(Task).filter(Task.id == task_id).first()
+    if not task:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    
+    if task.owner_id != current_user.id and current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="无权限查看此任务")
+    
+    execution = db.query(TaskExecution).filter(
+        TaskExecution.id == execution_id,
+        TaskExecution.task_id == task_id
+    ).first()
+    
+    if not execution:
+        raise HTTPException(status_code=404, detail="执行记录不存在")
+    
+    if not execution.log_file or not log_storage.exists(execution.log_file):
+        raise HTTPException(status_code=404, detail="日志文件不存在")
+    
+    log_file = log_storage.open_log(execution.log_file)
+    size = log_storage.size_of(log_file)
+    
+    def chunks():
+        with log_file:
+            for chunk in iter(lambda: log_file.read(log_storage.BLOCK_SIZE), b""):
+                yield chunk
+    
+    return StreamingResponse(
+        chunks(),
+        media_type="text/plain; charset=utf-8",
+        headers={
+            "Content-Disposition": f'attachment; filename="{os.path.basename(execution.log_file)}"',
+            "Content-Length": str(size),
+        }
+    )
+
+
+@router.get("/{task_id}/executions/{execution_id}/log/follow")
+def follow_execution_log(
+    task_id: int,
+    execution_id: int,
+    request: Request,
+    offset: int = 0,  # 开始位置（字节），断线重连时传上次收到的next_offset
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """实时跟踪执行日志（Server-Sent Events）
+    
+    推送offset之后新写入的日志，执行结束时发送end事件；每条事件的id为下一次的开始位置，
+    重连时请求头Last-Event-ID优先于offset参数
+    """
+    task = db.query(Task).filter(Task.id == task_id).first()
+    if not task:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    
+    if task.owner_id != current_user.id and current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="无权限查看此任务")
+    
+    execution = db.query(TaskExecution).filter(
+        TaskExecution.id == execution_id,
+        TaskExecution.task_id == task_id
+    ).first()
+    
+    if not execution:
+        raise HTTPException(status_code=404, detail="执行记录不存在")
+    
+    if not execution.log_file or not log_storage.exists(execution.log_file):
+        raise HTTPException(status_code=404, detail="日志文件不存在")
+    
+    last_event_id = request.headers.get("last-event-id")
+    if last_event_id and last_event_id.isdigit():
+        offset = int(last_event_id)
+    if offset < 0:
+        raise HTTPException(status_code=400, detail="开始位置不能为负数")
+    
+    async def events():
+        messages = log_follower.follow(execution.log_file, offset, execution_running(execution_id))
+        async for message in messages:
+            event_id = message.get("next_offset", message["offset"])
+            yield f"id: {event_id}\nevent: {message['type']}\ndata: {json.dumps(message, ensure_ascii=False)}\n\n"
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/{task_id}/executions/{execution_id}/trace")
+def get_execution_trace(
+    task_id: int,
+    execution_id: int,
+    format: str = "phases",  # phases: 各阶段耗时; otlp: OpenTelemetry OTLP/JSON
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """获取执行各阶段的耗时，区分排队、平台开销和脚本运行时间"""
+    if format not in ("phases", "otlp"):
+        raise HTTPException(status_code=400, detail="格式只能是 phases 或 otlp")
+    
+    task = db.query(Task).filter(Task.id == task_id).first()
+    if not task:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    
+    if task.owner_id != current_user.id and current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="无权限查看此任务")
+    
+    execution = db.query(TaskExecution).filter(
+        TaskExecution.id == execution_id,
+        TaskExecution.task_id == task_id
+    ).first()
+    if not execution:
+        raise HTTPException(status_code=404, detail="执行记录不存在")
+    if not execution.trace:
+        raise HTTPException(status_code=404, detail="该执行没有链路记录")
+    
+    trace = json.loads(execution.trace)
+    if format == "otlp":
+        return tracing.to_otlp([trace], execution.node_id)
+    
+    phases = [{
+        "name": span["name"],
+        "offset_ms": round((span["start_ns"] - trace["start_ns"]) / 1e6, 3),
+        "duration_ms": round((span["end_ns"] - span["start_ns"]) / 1e6, 3),
+        "attributes": span.get("attributes") or {},
+    } for span in sorted(trace["spans"], key=lambda span: span["start_ns"])]
+    total_ms = round((trace["end_ns"] - trace["start_ns"]) / 1e6, 3)
+    queue_ms = sum(phase["duration_ms"] for phase in phases if phase["name"] == "queue")
+    script_ms = sum(phase["duration_ms"] for phase in phases if phase["name"] == "run")
+    return {
+        "trace_id": trace["trace_id"],
+        "execution_id": execution.id,
+        "error": trace.get("error"),
+        "total_ms": total_ms,
+        "queue_ms": round(queue_ms, 3),
+        "script_ms": round(script_ms, 3),
+        # 除排队和脚本运行外的阶段合计（建记录、建目录、写日志、启动进程、扫描产出等）
+        "platform_ms": round(sum(phase["duration_ms"] for phase in phases) - queue_ms - script_ms, 3),
+        "phases": phases,
+    }
+
+
 @router.get("/{task_id}/next-run")
 def get_next_run_time(
     task_id: int,
@@ -632,6 +1089,7 @@ def get_next_run_time(
             "countdown_seconds": None
         }
     
+    # 下次执行时间已包含错峰偏移
     next_run = job.next_run_time
     if next_run:
         # 计算倒计时（秒）
@@ -640,7 +1098,8 @@ def get_next_run_time(
         
         return {
             "next_run_time": next_run.isoformat(),
-            "countdown_seconds": max(0, int(countdown))
+            "countdown_seconds": max(0, int(countdown)),
+            "jitter_offset_seconds": getattr(job.trigger, "offset_seconds", 0)
         }
     
     return {
@@ -152,10 +152,11 @@ def update_user(
     if "password" in update_data:
         update_data["hashed_password"] = get_password_hash(update_data.pop("password"))
     
-    # 仅管理员可以修改角色和包管理权限
+    # 仅管理员可以修改角色、包管理权限和调度权重
     if current_user.role != "admin":
         update_data.pop("role", None)
         update_data.pop("can_manage_packages", None)
+        update_data.pop("share_weight", None)
     
     for field, value in update_data.items():
         setattr(user, field, value)
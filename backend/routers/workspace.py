@@ -5,6 +5,7 @@ from typing import List
 from pydantic import BaseModel
 import os
 import shutil
+import signal
 import subprocess
 import asyncio
 from datetime import datetime
@@ -18,6 +19,7 @@ from utils.workspace_permissions import WorkspacePermissions
 from utils.content_differ import content_differ
 from utils.request_utils import get_client_ip
 from utils.ip_utils import get_real_ip
+from utils.resource_limits import ResourceLimits
 import logging
 
 logger = logging.getLogger(__name__)
@@ -261,14 +263,26 @@ def _execute_script_in_background(audit_log_id: int, full_path: str, file_path:
         env = os.environ.copy()
         env['PYTHONPATH'] = f"/app:{env.get('PYTHONPATH', '')}"
         
-        result = subprocess.run(
-            ["python", full_path],
-            capture_output=True,
+        limits = ResourceLimits(
+            timeout_seconds=settings.WORKSPACE_SCRIPT_TIMEOUT_SECONDS,
+            memory_limit_mb=settings.TASK_DEFAULT_MEMORY_LIMIT_MB or None
+        )
+        process = subprocess.Popen(
+            limits.wrap_command(["python", full_path]),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
             text=True,
-            timeout=300,  # 5分钟超时
             cwd=os.path.dirname(full_path),
-            env=env
+            env=env,
+            start_new_session=True  # 独立进程组，超时时连同脚本派生的进程一起结束
         )
+        try:
+            stdout, stderr = process.communicate(timeout=limits.timeout_seconds)
+        except subprocess.TimeoutExpired:
+            os.killpg(process.pid, signal.SIGKILL)
+            process.communicate()
+            raise
+        result = subprocess.CompletedProcess(process.args, process.returncode, stdout, stderr)
         
         status = "success" if result.returncode == 0 else "failed"
         end_time = datetime.now()
@@ -310,7 +324,7 @@ def _execute_script_in_background(audit_log_id: int, full_path: str, file_path:
             db_audit_log.status = "failed"
             db_audit_log.execution_duration = duration
             details = json.loads(db_audit_log.details) if db_audit_log.details else {}
-            details["error"] = "执行超时"
+            details["error"] = f"执行超时（超过{settings.WORKSPACE_SCRIPT_TIMEOUT_SECONDS}秒）"
             db_audit_log.details = json.dumps(details, ensure_ascii=False)
             db.commit()
             
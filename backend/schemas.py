@@ -1,7 +1,8 @@
 from pydantic import BaseModel, EmailStr, Field
 from typing import Optional, List
 from datetime import datetime
-from models import UserRole, TaskStatus
+from enum import Enum
+from models import UserRole, TaskStatus, MisfirePolicy, OverlapPolicy
 
 
 # 用户相关Schema
@@ -22,6 +23,7 @@ class UserUpdate(BaseModel):
     role: Optional[UserRole] = None
     is_active: Optional[bool] = None
     can_manage_packages: Optional[bool] = None
+    share_weight: Optional[int] = Field(None, ge=1, le=100)  # 任务分发的公平份额权重（仅管理员可修改）
 
 
 class UserResponse(UserBase):
@@ -29,6 +31,7 @@ class UserResponse(UserBase):
     role: UserRole
     is_active: bool
     can_manage_packages: bool = False
+    share_weight: int = 1  # 任务分发的公平份额权重
     last_activity: Optional[datetime] = None
     created_at: datetime
     is_online: bool = False  # 是否在线（前端计算或后端设置）
@@ -53,11 +56,45 @@ class LoginRequest(BaseModel):
 
 
 # 任务相关Schema
+EXIT_CODES_PATTERN = r"^\s*-?\d+(\s*,\s*-?\d+)*\s*$"  # 逗号分隔的退出码
+
+
 class TaskBase(BaseModel):
     name: str = Field(..., min_length=1, max_length=100)
     description: Optional[str] = None
-    cron_expression: str
+    cron_expression: str = Field("", max_length=100, description="5段crontab或6段秒级cron（秒 分 时 日 月 周），配置执行间隔时可为空")
+    interval_seconds: Optional[int] = Field(None, ge=1, le=86400, description="执行间隔（秒），配置后优先于cron表达式")
     script_params: Optional[str] = None  # 脚本命令行参数
+    misfire_policy: MisfirePolicy = MisfirePolicy.COALESCE  # 错过触发处理策略
+    priority: int = Field(5, ge=0, le=9, description="分发优先级，越大越先启动")
+    jitter_seconds: Optional[int] = Field(None, ge=0, le=3600, description="错峰窗口（秒），为空时使用全局窗口")
+    overlap_policy: OverlapPolicy = OverlapPolicy.SKIP  # 运行实例达到上限时的处理策略
+    max_instances: int = Field(1, ge=1, le=100, description="最多同时运行的实例数")
+    # 资源限制（为空时使用全局默认值或不限制）
+    timeout_seconds: Optional[int] = Field(None, ge=1, description="执行超时（秒）")
+    memory_limit_mb: Optional[int] = Field(None, ge=16, description="地址空间上限（MB）")
+    cpu_limit_seconds: Optional[int] = Field(None, ge=1, description="CPU时间上限（秒）")
+    nice_level: Optional[int] = Field(None, ge=0, le=19, description="nice值")
+    ionice_class: Optional[str] = Field(None, pattern="^(best-effort|idle)$", description="IO调度类别")
+    max_open_files: Optional[int] = Field(None, ge=16, description="最大打开文件数")
+    # 失败重试
+    retry_max_attempts: int = Field(1, ge=1, le=10, description="最大尝试次数（含首次），1表示不重试")
+    retry_delay_seconds: int = Field(60, ge=1, le=86400, description="首次重试间隔（秒）")
+    retry_backoff_factor: float = Field(2.0, ge=1, le=10, description="每次重试间隔的倍数")
+    retry_on_exit_codes: Optional[str] = Field(None, pattern=EXIT_CODES_PATTERN, description="可重试的退出码，逗号分隔，为空时任意失败都重试")
+    # 参数化扇出
+    fanout_params: Optional[str] = Field(None, description="扇出参数，每行一组，配置后一次触发展开为多个子执行")
+    fanout_params_file: Optional[str] = Field(None, max_length=255, description="扇出参数文件（INPUT_DIR下的相对路径，.json为数组，其他每行一组）")
+    fanout_concurrency: int = Field(4, ge=1, le=100, description="子执行最大并发数")
+    # 执行结果缓存
+    cache_enabled: bool = Field(False, description="脚本、参数和输入目录与最近一次成功执行相同时跳过执行")
+    cache_link_outputs: bool = Field(False, description="命中缓存时将上次的产出文件链接到本次输出目录")
+    # 文件到达触发
+    file_trigger_enabled: bool = Field(False, description="监听目录中有文件写入完成或移入时触发执行")
+    file_trigger_path: Optional[str] = Field(None, max_length=255, description="监听的工作区目录（相对路径），为空时监听INPUT_DIR")
+    file_trigger_pattern: Optional[str] = Field(None, max_length=100, description="文件名通配符，为空时匹配全部文件")
+    file_trigger_debounce_seconds: int = Field(5, ge=0, le=3600, description="最后一个文件到达后等待的安静时间（秒）")
+    file_trigger_batch_seconds: int = Field(60, ge=0, le=86400, description="第一个文件到达后最长等待时间（秒）")
 
 
 class TaskCreate(TaskBase):
@@ -67,9 +104,38 @@ class TaskCreate(TaskBase):
 class TaskUpdate(BaseModel):
     name: Optional[str] = Field(None, min_length=1, max_length=100)
     description: Optional[str] = None
-    cron_expression: Optional[str] = None
+    cron_expression: Optional[str] = Field(None, max_length=100)
+    interval_seconds: Optional[int] = Field(None, ge=1, le=86400)
     script_params: Optional[str] = None  # 脚本命令行参数
+    misfire_policy: Optional[MisfirePolicy] = None
+    priority: Optional[int] = Field(None, ge=0, le=9)
+    jitter_seconds: Optional[int] = Field(None, ge=0, le=3600)
+    overlap_policy: Optional[OverlapPolicy] = None
+    max_instances: Optional[int] = Field(None, ge=1, le=100)
+    timeout_seconds: Optional[int] = Field(None, ge=1)
+    memory_limit_mb: Optional[int] = Field(None, ge=16)
+    cpu_limit_seconds: Optional[int] = Field(None, ge=1)
+    nice_level: Optional[int] = Field(None, ge=0, le=19)
+    ionice_class: Optional[str] = Field(None, pattern="^(best-effort|idle)$")
+    max_open_files: Optional[int] = Field(None, ge=16)
+    retry_max_attempts: Optional[int] = Field(None, ge=1, le=10)
+    retry_delay_seconds: Optional[int] = Field(None, ge=1, le=86400)
+    retry_backoff_factor: Optional[float] = Field(None, ge=1, le=10)
+    retry_on_exit_codes: Optional[str] = Field(None, pattern=EXIT_CODES_PATTERN)
+    fanout_params: Optional[str] = None
+    fanout_params_file: Optional[str] = Field(None, max_length=255)
+    fanout_concurrency: Optional[int] = Field(None, ge=1, le=100)
+    cache_enabled: Optional[bool] = None
+    cache_link_outputs: Optional[bool] = None
+    file_trigger_enabled: Optional[bool] = None
+    file_trigger_path: Optional[str] = Field(None, max_length=255)
+    file_trigger_pattern: Optional[str] = Field(None, max_length=100)
+    file_trigger_debounce_seconds: Optional[int] = Field(None, ge=0, le=3600)
+    file_trigger_batch_seconds: Optional[int] = Field(None, ge=0, le=86400)
     is_active: Optional[bool] = None
+    
+    class Config:
+        use_enum_values = True  # 枚举以字符串值写入模型
 
 
 class TaskResponse(TaskBase):
@@ -77,6 +143,7 @@ class TaskResponse(TaskBase):
     script_path: str
     status: TaskStatus
     is_active: bool
+    is_paused: bool = False
     owner_id: int
     owner_username: Optional[str] = None  # 创建者用户名
     created_at: datetime
@@ -88,18 +155,94 @@ class TaskResponse(TaskBase):
         from_attributes = True
 
 
+# 批量任务操作Schema
+class BulkTaskAction(str, Enum):
+    PAUSE = "pause"  # 暂停自动触发
+    RESUME = "resume"  # 恢复自动触发
+    ENABLE = "enable"  # 启用
+    DISABLE = "disable"  # 禁用
+    RESCHEDULE = "reschedule"  # 修改调度配置
+
+
+class BulkTaskRequest(BaseModel):
+    # 按ID指定任务，或按条件筛选（两者同时提供时取交集）
+    task_ids: Optional[List[int]] = Field(None, max_length=1000)
+    search: Optional[str] = Field(None, description="按名称、描述或cron表达式模糊匹配")
+    owner_id: Optional[int] = Field(None, description="按创建者筛选（仅管理员）")
+    is_active: Optional[bool] = None
+    is_paused: Optional[bool] = None
+    # reschedule使用的调度配置，未提供的字段保持不变
+    cron_expression: Optional[str] = Field(None, max_length=100)
+    interval_seconds: Optional[int] = Field(None, ge=1, le=86400)
+    jitter_seconds: Optional[int] = Field(None, ge=0, le=3600)
+
+
+# 任务依赖Schema
+class TaskDependencyUpdate(BaseModel):
+    upstream_task_ids: List[int] = Field(default_factory=list, description="上游任务ID，全部成功后触发本任务")
+
+
+class TaskBrief(BaseModel):
+    id: int
+    name: str
+    is_active: bool
+    
+    class Config:
+        from_attributes = True
+
+
+class TaskDependencyResponse(BaseModel):
+    task_id: int
+    upstream: List[TaskBrief]  # 上游任务
+    downstream: List[TaskBrief]  # 下游任务
+
+
+# 调度负载预测Schema
+class ScheduleSimulationRequest(BaseModel):
+    start: Optional[datetime] = Field(None, description="窗口开始时间，默认当前时间")
+    hours: int = Field(24, ge=1, le=168, description="窗口长度（小时），最长7天")
+    top: int = Field(10, ge=1, le=100, description="返回并发最高的分钟数")
+    # 待添加的任务（可选），返回其触发时刻已有的负载
+    cron_expression: Optional[str] = Field(None, max_length=100, description="待添加任务的cron表达式")
+    interval_seconds: Optional[int] = Field(None, ge=1, le=86400, description="待添加任务的执行间隔（秒）")
+    duration_seconds: float = Field(60, gt=0, description="待添加任务的预计执行时长（秒）")
+    cpu_cores: float = Field(1.0, ge=0, description="待添加任务执行期间平均占用的CPU核数")
+    max_instances: int = Field(1, ge=1, le=100)
+
+
 # 任务执行记录Schema
 class TaskExecutionResponse(BaseModel):
     id: int
     task_id: int
     executed_by: Optional[int] = None  # 执行用户ID
     trigger_type: str = "scheduled"  # 触发方式
+    scheduled_time: Optional[datetime] = None  # 计划触发时间
+    retry_of_id: Optional[int] = None  # 重试时为首次执行的记录ID
+    attempt: int = 1  # 第几次尝试
+    upstream_execution_id: Optional[int] = None  # 依赖触发时为触发本次执行的上游执行记录ID
+    parent_execution_id: Optional[int] = None  # 扇出子执行所属的父执行记录ID
+    params: Optional[str] = None  # 扇出子执行的参数
+    summary: Optional[str] = None  # 扇出父执行的子执行结果汇总（JSON字符串）
+    fingerprint: Optional[str] = None  # 脚本、参数和输入目录的指纹
+    trigger_event_at: Optional[datetime] = None  # 文件触发时本批第一个文件到达的时间
+    trigger_files: Optional[str] = None  # 文件触发时本批到达的文件名（JSON字符串）
+    event_latency_ms: Optional[int] = None  # 文件触发延迟：从第一个文件到达到启动（毫秒）
     status: TaskStatus
+    status_reason: Optional[str] = None  # 状态原因（超出资源限制、重叠跳过/排队）
     start_time: datetime
     end_time: Optional[datetime] = None
     log_file: Optional[str] = None  # 日志文件路径
     exit_code: Optional[int] = None  # 退出码
     output_files: Optional[str] = None  # 产出文件列表（JSON字符串）
+    node_id: Optional[str] = None  # 执行节点
+    queue_wait_ms: Optional[int] = None  # 从触发到启动的排队等待时间（毫秒）
+    cpu_user_seconds: Optional[float] = None  # 用户态CPU时间（秒）
+    cpu_system_seconds: Optional[float] = None  # 内核态CPU时间（秒）
+    max_rss_kb: Optional[int] = None  # 峰值常驻内存（KB）
+    io_read_bytes: Optional[int] = None  # 块设备读取字节数
+    io_write_bytes: Optional[int] = None  # 块设备写入字节数
+    ctx_switches_voluntary: Optional[int] = None  # 自愿上下文切换次数
+    ctx_switches_involuntary: Optional[int] = None  # 非自愿上下文切换次数
     # 保留旧字段兼容性（已弃用，使用log_file）
     output: Optional[str] = None
     error: Optional[str] = None
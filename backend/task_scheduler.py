@@ -1,32 +1,256 @@
 import os
 import sys
-import subprocess
+import shlex
+import asyncio
+import functools
 import json
-from datetime import datetime
+import time
+import queue
+import threading
+from collections import deque, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import psutil
 from apscheduler.schedulers.background import BackgroundScheduler
-from apscheduler.triggers.cron import CronTrigger
+from apscheduler.executors.base import BaseExecutor
+from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+from apscheduler.events import JobExecutionEvent, EVENT_JOB_EXECUTED
 from sqlalchemy.orm import Session
-from database import SessionLocal
-from models import Task, TaskExecution, TaskStatus
+from database import SessionLocal, engine
+from models import Task, TaskExecution, TaskStatus, MisfirePolicy, User
+from config import settings
 from utils.task_logger import task_logger
+from utils.task_executor import AsyncTaskExecutor
+from utils.dispatch_queue import DispatchQueue
+from utils.process_runner import run_process
+from utils.forkserver import ForkServerClient
+from utils.resource_limits import ResourceLimits, REASON_TIMEOUT
+from utils.trigger_offset import OffsetTrigger
+from utils import schedule_triggers
+from utils import scheduler_cluster, overlap_guard, execution_recovery, retry_policy, task_dependencies, fanout, execution_cache, output_spool
+from utils import inotify
+from utils.tracing import Trace, trace_exporter
+from utils.log_compressor import log_compressor
+from utils.file_trigger import FileTriggerWatcher, FileTriggerConfig
 from utils.paths import (
     get_task_data_dir, get_task_input_dir, get_execution_output_dir,
-    get_task_log_dir, get_execution_log_file, ensure_dir
+    get_task_log_dir, get_execution_log_file, get_workspace_dir, ensure_dir
 )
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 最近补跑记录保留数量（用于计算补跑吞吐量）
+CATCHUP_HISTORY_SIZE = 10000
+
+# 最近排队等待时间保留数量（用于计算等待时间分位数）
+QUEUE_WAIT_HISTORY_SIZE = 1000
+
+# 重新接管的进程的存活检查间隔（秒）
+ADOPTED_POLL_INTERVAL = 2
+
+
+def fire_task(task_id: int, run_times: list = None):
+    """调度器触发入口
+    
+    使用模块级函数而非绑定方法，持久化作业存储才能按引用序列化
+    """
+    task_scheduler.on_fire(task_id, run_times)
+
+
+def fire_retry(task_id: int, retry_of_id: int, attempt: int, run_times: list = None):
+    """失败重试的一次性作业入口"""
+    task_scheduler.execute_task(
+        task_id, trigger_type="retry", scheduled_time=run_times[-1] if run_times else None,
+        retry_of_id=retry_of_id, attempt=attempt
+    )
+
+
+class TaskFireExecutor(BaseExecutor):
+    """APScheduler执行器：将作业连同全部计划触发时间交给分发线程池
+    
+    默认执行器只把计划时间用于错过判断，这里把它交给TaskScheduler按任务的错过策略处理
+    """
+    
+    def __init__(self, pool: ThreadPoolExecutor):
+        super().__init__()
+        self._pool = pool
+    
+    def _do_submit_job(self, job, run_times):
+        def callback(future):
+            exc = future.exception()
+            if exc:
+                self._run_job_error(job.id, exc, exc.__traceback__)
+            else:
+                events = [
+                    JobExecutionEvent(EVENT_JOB_EXECUTED, job.id, job._jobstore_alias, run_time)
+                    for run_time in run_times
+                ]
+                self._run_job_success(job.id, events)
+        
+        future = self._pool.submit(job.func, *job.args, run_times=run_times, **job.kwargs)
+        future.add_done_callback(callback)
+
 
 class TaskScheduler:
     def __init__(self):
-        self.scheduler = BackgroundScheduler()
-        self.scheduler.start()
-        logger.info("任务调度器已启动")
+        # 触发处理线程池：处理触发事件和补跑分发
+        self.dispatch_pool = ThreadPoolExecutor(
+            max_workers=settings.SCHEDULER_DISPATCH_THREADS,
+            thread_name_prefix="task-dispatch"
+        )
+        # 作业持久化到业务数据库，重启后保留每个作业的下次触发时间
+        self.scheduler = BackgroundScheduler(
+            jobstores={'default': SQLAlchemyJobStore(engine=engine, tablename='apscheduler_jobs')},
+            executors={'default': TaskFireExecutor(self.dispatch_pool)},
+            job_defaults={'coalesce': False, 'misfire_grace_time': None}
+        )
+        
+        # 补跑队列：按限速逐个分发错过的触发
+        self._catchup_queue = queue.Queue()
+        self._catchup_thread = None
+        self._catchup_history = deque(maxlen=CATCHUP_HISTORY_SIZE)
+        self._metrics_lock = threading.Lock()
+        self.metrics = {
+            "fired": 0,
+            "missed_skipped": 0,
+            "missed_coalesced": 0,
+            "catchup_enqueued": 0,
+            "catchup_dispatched": 0,
+            "lease_lost": 0,
+            "claimed": 0,
+            "overlap_skipped": 0,
+            "overlap_queued": 0,
+            "paused_queued": 0,
+            "retries_scheduled": 0,
+            "dependency_triggered": 0,
+            "fanout_children": 0,
+            "cache_hits": 0,
+            "file_triggered": 0,
+            "recovered_adopted": 0,
+            "recovered_lost": 0,
+            "startup_ms": None,
+        }
+        
+        # 集群模式：触发写入数据库队列，由各节点的领取线程执行
+        self.node_id = settings.SCHEDULER_NODE_ID or scheduler_cluster.default_node_id()
+        self.cluster_mode = settings.SCHEDULER_CLUSTER_MODE
+        self._cluster_thread = None
+        self._worker_wakeup = threading.Event()
+        self._stopping = threading.Event()
+        
+        # async模式：由单个事件循环驱动所有任务子进程；thread模式：在执行线程池中逐个阻塞执行
+        self.executor = None
+        self.execution_pool = None
+        if settings.TASK_EXECUTOR_MODE == "async":
+            self.executor = AsyncTaskExecutor()
+            self.executor.start()
+            capacity = settings.TASK_MAX_CONCURRENCY
+        else:
+            self.execution_pool = ThreadPoolExecutor(
+                max_workers=settings.SCHEDULER_DISPATCH_THREADS,
+                thread_name_prefix="task-exec"
+            )
+            capacity = settings.SCHEDULER_DISPATCH_THREADS
+        
+        # 分发队列：触发后按优先级和用户公平份额排队，有空闲名额时启动
+        self.dispatch_queue = DispatchQueue(capacity, settings.TASK_MAX_CONCURRENCY_PER_OWNER)
+        self._dispatcher_thread = None
+        self._queue_waits = deque(maxlen=QUEUE_WAIT_HISTORY_SIZE)
+        self._event_latencies = deque(maxlen=QUEUE_WAIT_HISTORY_SIZE)
+        # 执行链路各阶段的耗时：阶段名 -> 最近执行的耗时（毫秒）
+        self._phase_durations = defaultdict(lambda: deque(maxlen=QUEUE_WAIT_HISTORY_SIZE))
+        
+        # 文件到达触发：监听任务的输入目录或工作区目录（仅Linux）
+        self.file_watcher = FileTriggerWatcher(self._on_files_arrived) if inotify.is_supported() else None
+        
+        # 后端重启后重新接管的执行：execution_id -> 接管信息
+        self._adopted = {}
+        self._adopted_lock = threading.Lock()
+        self._adopted_thread = None
+        
+        # forkserver模式：由预导入常用模块的常驻进程fork出任务子进程
+        self.forkserver = None
+        if settings.TASK_SPAWN_MODE == "forkserver":
+            self.forkserver = ForkServerClient(
+                socket_path=settings.FORKSERVER_SOCKET,
+                preload=[name.strip() for name in settings.FORKSERVER_PRELOAD.split(',') if name.strip()]
+            )
+    
+    def start(self):
+        """启动调度器
+        
+        先以暂停状态启动以读取持久化作业，与数据库中的活跃任务对齐后再恢复触发；
+        停机期间错过的触发时间会在恢复后按各任务的错过策略处理
+        """
+        started = time.perf_counter()
+        # 先处理上次运行遗留的执行记录，新的触发才能按真实的运行实例数判断重叠
+        try:
+            self.recover_executions(startup=True)
+        except Exception as e:
+            logger.error(f"恢复遗留的执行记录失败: {str(e)}")
+        
+        if self.file_watcher:
+            self.file_watcher.start()
+        trace_exporter.start(self.node_id)
+        if settings.LOG_COMPRESSION_ENABLED:
+            log_compressor.start()
+        self.scheduler.start(paused=True)
+        self.load_tasks_from_db()
+        self.scheduler.resume()
+        
+        self._catchup_thread = threading.Thread(target=self._catchup_loop, name="task-catchup", daemon=True)
+        self._catchup_thread.start()
+        
+        self._dispatcher_thread = threading.Thread(target=self._dispatch_loop, name="task-dispatcher", daemon=True)
+        self._dispatcher_thread.start()
+        
+        if self.cluster_mode:
+            self._cluster_thread = threading.Thread(target=self._cluster_loop, name="task-cluster", daemon=True)
+            self._cluster_thread.start()
+            logger.info(f"集群模式已开启，节点: {self.node_id}")
+        
+        if self.forkserver:
+            # 后台预热，预导入模块耗时较长，不阻塞启动
+            threading.Thread(target=self._warm_forkserver, name="task-forkserver", daemon=True).start()
+        
+        self.metrics["startup_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        logger.info(f"任务调度器已启动，耗时 {self.metrics['startup_ms']}ms")
+    
+    def _warm_forkserver(self):
+        try:
+            self.forkserver.ensure_started()
+        except Exception as e:
+            logger.error(f"fork-server预热失败: {str(e)}")
+    
+    def _build_trigger(self, task_id: int, cron_expression: str, jitter_seconds: int = None,
+                       interval_seconds: int = None):
+        """构建触发器：cron或间隔触发时间加上按任务ID计算的固定错峰偏移
+        
+        Args:
+            task_id: 任务ID
+            cron_expression: 5段或6段（秒级）cron表达式
+            jitter_seconds: 任务的错峰窗口（秒），为空时使用全局窗口，0表示不错峰
+            interval_seconds: 执行间隔（秒），配置后优先于cron表达式
+        """
+        trigger = schedule_triggers.build_trigger(cron_expression, interval_seconds)
+        offset = schedule_triggers.offset_seconds(task_id, cron_expression, interval_seconds, jitter_seconds)
+        return OffsetTrigger(trigger, offset) if offset else trigger
+    
+    def schedule_task(self, task: Task):
+        """按任务配置添加或更新调度作业和文件到达监听，返回下次执行时间"""
+        self._sync_file_trigger(task)
+        next_run = self.add_task(
+            task.id, task.cron_expression, task.jitter_seconds, task.interval_seconds, paused=task.is_paused
+        )
+        if task.is_active and not task.is_paused:
+            self._release_paused([task.id])
+        return next_run
     
-    def add_task(self, task_id: int, cron_expression: str):
-        """添加定时任务，返回下次执行时间"""
+    def add_task(self, task_id: int, cron_expression: str, jitter_seconds: int = None, interval_seconds: int = None,
+                 paused: bool = False):
+        """添加定时任务，返回下次执行时间（已包含错峰偏移，暂停的任务为None）"""
         try:
             job_id = f"task_{task_id}"
             # 移除已存在的任务
@@ -35,11 +259,12 @@ class TaskScheduler:
             
             # 添加新任务
             job = self.scheduler.add_job(
-                func=self.execute_task,
-                trigger=CronTrigger.from_crontab(cron_expression),
+                func=fire_task,
+                trigger=self._build_trigger(task_id, cron_expression, jitter_seconds, interval_seconds),
                 id=job_id,
                 args=[task_id],
-                replace_existing=True
+                replace_existing=True,
+                **({"next_run_time": None} if paused else {})
             )
             logger.info(f"任务 {task_id} 已添加到调度器，下次执行: {job.next_run_time}")
             
@@ -51,6 +276,8 @@ class TaskScheduler:
     
     def remove_task(self, task_id: int):
         """移除定时任务"""
+        if self.file_watcher:
+            self.file_watcher.unwatch(task_id)
         try:
             job_id = f"task_{task_id}"
             if self.scheduler.get_job(job_id):
@@ -59,32 +286,830 @@ class TaskScheduler:
         except Exception as e:
             logger.error(f"移除任务 {task_id} 失败: {str(e)}")
     
-    def execute_task(self, task_id: int, executed_by: int = None, trigger_type: str = "scheduled"):
+    def sync_tasks(self, tasks: list):
+        """批量同步任务的调度作业和文件到达监听（批量操作提交后调用）
+        
+        只列出一次现有作业：触发配置未变化的作业仅切换暂停状态，保留原有的下次触发时间，
+        其余作业直接替换或移除，不再逐个查询
+        
+        Returns:
+            (任务ID -> 下次执行时间, 同步失败的任务ID -> 错误信息)
+        """
+        jobs = {job.id: job for job in self.scheduler.get_jobs()}
+        next_runs, errors = {}, {}
+        for task in tasks:
+            job_id = f"task_{task.id}"
+            job = jobs.get(job_id)
+            try:
+                self._sync_file_trigger(task)
+                if not (task.is_active and task.script_path):
+                    if job:
+                        self.scheduler.remove_job(job_id)
+                    next_runs[task.id] = None
+                    continue
+                
+                trigger = self._build_trigger(task.id, task.cron_expression, task.jitter_seconds, task.interval_seconds)
+                if job and str(job.trigger) == str(trigger):
+                    if task.is_paused and job.next_run_time is not None:
+                        job = self.scheduler.pause_job(job_id)
+                    elif not task.is_paused and job.next_run_time is None:
+                        job = self.scheduler.resume_job(job_id)
+                else:
+                    job = self.scheduler.add_job(
+                        func=fire_task,
+                        trigger=trigger,
+                        id=job_id,
+                        args=[task.id],
+                        replace_existing=True,
+                        **({"next_run_time": None} if task.is_paused else {})
+                    )
+                next_runs[task.id] = job.next_run_time if job else None
+            except Exception as e:
+                logger.error(f"同步任务 {task.id} 的调度作业失败: {str(e)}")
+                errors[task.id] = str(e)
+        logger.info(f"已同步 {len(tasks)} 个任务的调度作业（失败 {len(errors)} 个）")
+        self._release_paused([task.id for task in tasks if task.is_active and not task.is_paused])
+        return next_runs, errors
+    
+    def _release_paused(self, task_ids: list):
+        """任务恢复后启动暂停期间保持排队的执行（暂停期间排队的执行都不会被放行，一次查询找出有排队执行的任务）"""
+        if not task_ids:
+            return
+        db = SessionLocal()
+        try:
+            held = [row.task_id for row in db.query(TaskExecution.task_id).filter(
+                TaskExecution.task_id.in_(task_ids),
+                TaskExecution.status == TaskStatus.QUEUED,
+                TaskExecution.parent_execution_id.is_(None)
+            ).distinct()]
+        finally:
+            db.close()
+        for task_id in held:
+            try:
+                self._release_queued(task_id)
+            except Exception as e:
+                logger.error(f"启动任务 {task_id} 排队的执行失败: {str(e)}")
+    
+    @staticmethod
+    def _file_trigger_config(task) -> FileTriggerConfig:
+        """任务的文件到达监听配置：未指定监听路径时监听任务的输入目录"""
+        if task.file_trigger_path:
+            path = get_workspace_dir(task.file_trigger_path)
+        else:
+            path = ensure_dir(get_task_input_dir(task.id))
+        return FileTriggerConfig(
+            path=path,
+            pattern=task.file_trigger_pattern or "*",
+            debounce_seconds=task.file_trigger_debounce_seconds or 0,
+            batch_seconds=task.file_trigger_batch_seconds or 0,
+        )
+    
+    def _sync_file_trigger(self, task):
+        """按任务配置添加、更新或取消文件到达监听"""
+        if not self.file_watcher:
+            if task.file_trigger_enabled:
+                logger.warning(f"当前系统不支持inotify，任务 {task.id} 的文件到达触发不会生效")
+            return
+        if task.file_trigger_enabled and task.is_active and not task.is_paused and task.script_path:
+            self.file_watcher.watch(task.id, self._file_trigger_config(task))
+        else:
+            self.file_watcher.unwatch(task.id)
+    
+    def _on_files_arrived(self, task_id: int, files: list, first_event_at: datetime, batch_key: datetime = None):
+        """文件到达批次结束：触发一次执行
+        
+        集群模式下每个节点都监听同一目录，以批次键（文件最早的修改时间）获取触发租约，同一批文件只入队一次
+        """
+        if self.cluster_mode and batch_key is None:
+            logger.info(f"任务 {task_id} 本批到达的文件已不存在（可能已由其他节点处理），不触发")
+            return
+        self._count("file_triggered")
+        logger.info(f"任务 {task_id} 的监听目录到达 {len(files)} 个文件，触发执行")
+        self.execute_task(task_id, trigger_type="file", trigger_event_at=first_event_at, trigger_files=files,
+                          lease_time=batch_key)
+    
+    def on_fire(self, task_id: int, run_times: list = None):
+        """处理一次调度触发，按任务的错过策略决定执行哪些计划时间
+        
+        Args:
+            task_id: 任务ID
+            run_times: 本次触发对应的全部计划时间（停机恢复后可能包含多个错过的时间）
+        """
+        now = datetime.now().astimezone()
+        run_times = run_times or [now]
+        grace = timedelta(seconds=settings.SCHEDULER_MISFIRE_GRACE_SECONDS)
+        due = [run_time for run_time in run_times if now - run_time <= grace]
+        missed = [run_time for run_time in run_times if now - run_time > grace]
+        
+        self._count("fired", len(run_times))
+        
+        if missed:
+            policy = self._get_misfire_policy(task_id)
+            if policy == MisfirePolicy.CATCHUP:
+                for run_time in missed:
+                    self._catchup_queue.put((task_id, run_time))
+                self._count("catchup_enqueued", len(missed))
+                logger.info(f"任务 {task_id} 错过 {len(missed)} 次触发，已加入补跑队列")
+            elif policy == MisfirePolicy.COALESCE:
+                if not due:
+                    due = [missed[-1]]
+                self._count("missed_coalesced", len(missed))
+                logger.info(f"任务 {task_id} 错过 {len(missed)} 次触发，合并为一次执行")
+            else:
+                self._count("missed_skipped", len(missed))
+                logger.warning(f"任务 {task_id} 错过 {len(missed)} 次触发，已跳过")
+        
+        for run_time in due:
+            self.execute_task(task_id, trigger_type="scheduled", scheduled_time=run_time)
+    
+    def _get_misfire_policy(self, task_id: int) -> str:
+        """任务的错过策略；秒级触发的任务停机后错过的次数过多，补跑按合并处理"""
+        db = SessionLocal()
+        try:
+            task = db.query(Task).filter(Task.id == task_id).first()
+            if not task:
+                return MisfirePolicy.SKIP.value
+            if task.misfire_policy == MisfirePolicy.CATCHUP.value and schedule_triggers.is_sub_minute(task):
+                return MisfirePolicy.COALESCE.value
+            return task.misfire_policy
+        finally:
+            db.close()
+    
+    def _catchup_loop(self):
+        """按SCHEDULER_CATCHUP_RATE_PER_MINUTE限速分发补跑"""
+        interval = 60.0 / max(settings.SCHEDULER_CATCHUP_RATE_PER_MINUTE, 1)
+        next_slot = time.monotonic()
+        while True:
+            item = self._catchup_queue.get()
+            if item is None:
+                break
+            
+            delay = next_slot - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            next_slot = max(next_slot, time.monotonic()) + interval
+            
+            task_id, run_time = item
+            self.dispatch_pool.submit(
+                self.execute_task, task_id, trigger_type="catchup", scheduled_time=run_time
+            )
+            self._count("catchup_dispatched")
+            self._catchup_history.append(time.monotonic())
+    
+    def _count(self, name: str, value: int = 1):
+        with self._metrics_lock:
+            self.metrics[name] += value
+    
+    def get_metrics(self) -> dict:
+        """获取调度器运行指标"""
+        now = time.monotonic()
+        recent_catchups = sum(1 for t in self._catchup_history if now - t <= 60)
+        metrics = dict(self.metrics)
+        metrics.update({
+            "jobs": len(self.scheduler.get_jobs()) if self.scheduler.running else 0,
+            "catchup_backlog": self._catchup_queue.qsize(),
+            "catchup_rate_per_minute": recent_catchups,
+            "catchup_rate_limit_per_minute": settings.SCHEDULER_CATCHUP_RATE_PER_MINUTE,
+            "executor_mode": settings.TASK_EXECUTOR_MODE,
+            "spawn_mode": settings.TASK_SPAWN_MODE,
+            "node_id": self.node_id,
+            "cluster_mode": self.cluster_mode,
+            "dispatch_queue": self.dispatch_queue.stats(),
+            "queue_wait_ms": self._percentiles(self._queue_waits),
+            "event_latency_ms": self._percentiles(self._event_latencies),
+            "phase_ms": {name: self._percentiles(history) for name, history in list(self._phase_durations.items())},
+            "trace_export": trace_exporter.stats if trace_exporter.enabled else None,
+        })
+        if self.file_watcher:
+            metrics["file_trigger"] = self.file_watcher.stats()
+        if self.executor:
+            metrics["executor"] = self.executor.stats()
+        if settings.LOG_COMPRESSION_ENABLED:
+            metrics["log_compression"] = log_compressor.stats
+        return metrics
+    
+    @staticmethod
+    def _percentiles(history) -> dict:
+        """最近执行的耗时分位数（排队等待时间：从触发到启动；文件触发延迟：从文件到达到启动；执行各阶段耗时）"""
+        waits = sorted(history)
+        if not waits:
+            return {"count": 0, "p50": None, "p95": None, "p99": None, "max": None}
+        
+        def percentile(p):
+            return waits[min(len(waits) - 1, int(len(waits) * p))]
+        
+        return {
+            "count": len(waits),
+            "p50": percentile(0.50),
+            "p95": percentile(0.95),
+            "p99": percentile(0.99),
+            "max": waits[-1],
+        }
+    
+    def execute_task(self, task_id: int, executed_by: int = None, trigger_type: str = "scheduled",
+                     scheduled_time: datetime = None, retry_of_id: int = None, attempt: int = 1,
+                     upstream_execution_id: int = None, trigger_event_at: datetime = None,
+                     trigger_files: list = None, lease_time: datetime = None):
         """执行任务
         
         Args:
             task_id: 任务ID
             executed_by: 执行用户ID（手动执行时传入）
-            trigger_type: 触发方式 scheduled/manual
+            trigger_type: 触发方式 scheduled/manual/catchup/retry/dependency/file
+            scheduled_time: 计划触发时间（调度触发和重试时传入）
+            retry_of_id: 重试时为首次执行的记录ID
+            attempt: 第几次尝试
+            upstream_execution_id: 依赖触发时为触发本次执行的上游执行记录ID
+            trigger_event_at: 文件触发时为本批第一个文件到达的时间
+            trigger_files: 文件触发时为本批到达的文件名
+            lease_time: 集群模式下没有计划时间的触发用于去重的租约时间（文件触发为批次键）
         """
+        request = {
+            'task_id': task_id,
+            'executed_by': executed_by,
+            'trigger_type': trigger_type,
+            'scheduled_time': _to_local_naive(scheduled_time),
+            'retry_of_id': retry_of_id,
+            'attempt': attempt,
+            'upstream_execution_id': upstream_execution_id,
+            'trigger_event_at': trigger_event_at,
+            'trigger_files': json.dumps(trigger_files, ensure_ascii=False) if trigger_files else None,
+            'lease_time': lease_time,
+        }
+        # 触发时间：用于统计排队等待时间
+        request['fired_at'] = request['scheduled_time'] or datetime.now()
+        
+        # 集群模式：获取触发租约后写入数据库队列，由任一节点领取执行
+        if self.cluster_mode:
+            if scheduler_cluster.enqueue_execution(request, self.node_id) is None:
+                self._count("lease_lost")
+            else:
+                self._worker_wakeup.set()
+            return
+        
+        self._enqueue(request)
+    
+    def _enqueue(self, request: dict):
+        """将执行请求放入本节点的分发队列"""
+        owner_id, priority, weight = self._load_dispatch_meta(request['task_id'])
+        request['owner_id'] = owner_id
+        self.dispatch_queue.put(request, owner_id, priority=priority, weight=weight)
+    
+    def _load_dispatch_meta(self, task_id: int):
+        """获取任务的所有者、优先级和所有者的公平份额权重"""
         db = SessionLocal()
         try:
-            task = db.query(Task).filter(Task.id == task_id).first()
-            if not task or not task.is_active:
-                logger.warning(f"任务 {task_id} 不存在或已禁用")
+            row = db.query(Task.owner_id, Task.priority, User.share_weight).join(
+                User, User.id == Task.owner_id
+            ).filter(Task.id == task_id).first()
+            if not row:
+                # 任务已删除，仍然分发，由_start_execution放弃执行
+                return None, 0, 1
+            return row.owner_id, row.priority or 0, row.share_weight or 1
+        finally:
+            db.close()
+    
+    def _dispatch_loop(self):
+        """分发循环：有空闲名额时按优先级和公平份额取出下一个执行并启动"""
+        while not self._stopping.is_set():
+            selected = self.dispatch_queue.get(timeout=1)
+            if selected is None:
+                continue
+            owner_id, request = selected
+            try:
+                future = self._spawn(request)
+            except Exception as e:
+                logger.error(f"启动任务 {request['task_id']} 失败: {str(e)}")
+                self._on_execution_done(owner_id)
+                continue
+            future.add_done_callback(lambda f, owner_id=owner_id: self._on_execution_done(owner_id))
+    
+    def _spawn(self, request: dict):
+        """在本节点执行
+        
+        Returns:
+            执行Future
+        """
+        # async模式：提交到事件循环后立即返回
+        if self.executor:
+            return self.executor.submit(self._run_execution(request))
+        
+        # thread模式：在执行线程中用独立事件循环执行，直到任务结束
+        return self.execution_pool.submit(self._run_in_thread, request)
+    
+    def _run_in_thread(self, request: dict):
+        asyncio.run(self._run_execution(request))
+    
+    def _on_execution_done(self, owner_id):
+        self.dispatch_queue.task_done(owner_id)
+        if self.cluster_mode:
+            self._worker_wakeup.set()
+    
+    def _cluster_loop(self):
+        """集群节点循环：心跳、领取排队的执行、定期唤醒调度器重新读取共享作业存储"""
+        last_purge = 0
+        last_recover = time.monotonic()
+        while not self._stopping.is_set():
+            try:
+                scheduler_cluster.heartbeat(self.node_id)
+                self._claim_executions()
+                self.scheduler.wakeup()
+                
+                # 接管离线节点遗留的执行记录，同步其他节点修改的文件到达监听
+                if time.monotonic() - last_recover > settings.CLUSTER_NODE_TIMEOUT_SECONDS:
+                    self.recover_executions()
+                    self._load_file_triggers()
+                    last_recover = time.monotonic()
+                
+                if time.monotonic() - last_purge > 3600:
+                    scheduler_cluster.purge_expired_leases(settings.CLUSTER_LEASE_RETENTION_DAYS)
+                    last_purge = time.monotonic()
+            except Exception as e:
+                logger.error(f"集群节点循环异常: {str(e)}")
+            
+            self._worker_wakeup.wait(settings.CLUSTER_POLL_INTERVAL_SECONDS)
+            self._worker_wakeup.clear()
+    
+    def _claim_executions(self):
+        """按本节点空闲容量领取排队的执行"""
+        stats = self.dispatch_queue.stats()
+        free = stats["capacity"] - stats["running"] - stats["waiting"]
+        for request in scheduler_cluster.claim_pending_executions(self.node_id, free):
+            self._count("claimed")
+            self._enqueue(request)
+    
+    async def _run_execution(self, request: dict):
+        """执行一次任务：创建执行记录、运行脚本并流式写入日志、更新执行结果
+        
+        数据库操作放到线程池，避免阻塞事件循环
+        """
+        loop = asyncio.get_running_loop()
+        
+        ctx = await loop.run_in_executor(None, self._start_execution, request)
+        if not ctx:
+            return
+        
+        trace = ctx['trace']
+        log_stream = None
+        spawn_started = spawned_at = None
+        
+        def on_spawn(pid):
+            nonlocal spawned_at
+            spawned_at = time.time_ns()
+            trace.add("spawn", spawn_started, spawned_at, pid=pid, forkserver=bool(self.forkserver))
+            loop.run_in_executor(None, self._record_pid, ctx['execution_id'], pid)
+        
+        try:
+            with trace.span("open_log"):
+                task_logger.write_log(ctx['log_file'], "\n执行输出（stdout/stderr按到达顺序交错）:\n" + "="*80 + "\n")
+                log_stream = task_logger.open_stream(ctx['log_file'])
+            spawn_started = time.time_ns()
+            result = await run_process(
+                ctx['command'],
+                env=ctx['env'],  # 传入环境变量
+                cwd=ctx['output_dir'],  # ⭐ 设置工作目录为输出目录，脚本可以直接在当前目录创建文件
+                log_stream=log_stream,
+                timeout=ctx['limits'].timeout_seconds,
+                forkserver=self.forkserver,
+                limits=ctx['limits'],
+                on_spawn=on_spawn
+            )
+            log_stream.close()
+            # 从进程启动到退出且输出读取完毕
+            trace.add("run", spawned_at or spawn_started, exit_code=result.returncode, limit_reason=result.limit_reason)
+            
+            if result.limit_reason:
+                complete = functools.partial(
+                    self._complete_execution, ctx, result.returncode,
+                    error=f"任务{ctx['limits'].describe(result.limit_reason)}，已终止整个进程组",
+                    reason=result.limit_reason, usage=result.usage
+                )
+            else:
+                complete = functools.partial(self._complete_execution, ctx, result.returncode, usage=result.usage)
+        except Exception as e:
+            if log_stream:
+                log_stream.close()
+            if spawn_started:
+                trace.add("spawn" if spawned_at is None else "run", spawned_at or spawn_started, error=str(e))
+            complete = functools.partial(self._complete_execution, ctx, error=f"执行异常:\n{str(e)}")
+        
+        await loop.run_in_executor(None, complete)
+    
+    def _record_pid(self, execution_id: int, pid: int):
+        """记录任务进程ID，用于重启后判断进程是否仍在运行"""
+        db = SessionLocal()
+        try:
+            db.query(TaskExecution).filter(TaskExecution.id == execution_id).update(
+                {"pid": pid, "pgid": pid}, synchronize_session=False
+            )
+            db.commit()
+        except Exception as e:
+            logger.error(f"记录执行 {execution_id} 的进程ID失败: {str(e)}")
+            db.rollback()
+        finally:
+            db.close()
+    
+    def recover_executions(self, startup: bool = False):
+        """恢复遗留为RUNNING的执行记录
+        
+        后端重启或集群节点离线后，执行记录会停留在RUNNING：本机上进程仍在运行的重新接管，
+        从输出暂存文件继续采集输出并等待其结束；其余标记为失败（lost_on_restart），并结束本机上失去主进程的遗留进程组；
+        扇出父执行没有进程，继续启动其排队的子执行或汇总结果
+        
+        Args:
+            startup: 是否为本节点启动时的恢复，此时本节点标识下的执行也属于上次运行
+        """
+        alive_nodes = set() if startup else {self.node_id}
+        if self.cluster_mode:
+            alive_nodes |= {
+                node["node_id"] for node in scheduler_cluster.list_nodes(settings.CLUSTER_NODE_TIMEOUT_SECONDS)
+                if node["alive"] and node["node_id"] != self.node_id
+            }
+        
+        db = SessionLocal()
+        try:
+            # 按(status, task_id)索引查询，不扫描历史记录
+            rows = db.query(
+                TaskExecution.id, TaskExecution.task_id, TaskExecution.node_id, TaskExecution.pid,
+                TaskExecution.pgid, TaskExecution.start_time, TaskExecution.log_file,
+                TaskExecution.parent_execution_id
+            ).filter(TaskExecution.status == TaskStatus.RUNNING).all()
+            
+            fanout_parents = {
+                parent_id for (parent_id,) in db.query(TaskExecution.parent_execution_id).filter(
+                    TaskExecution.parent_execution_id.in_([row.id for row in rows])
+                ).distinct()
+            } if rows else set()
+            if startup and not self.cluster_mode:
+                # 已放入内存分发队列但未启动的子执行随上次运行丢失，改回排队
+                db.query(TaskExecution).filter(
+                    TaskExecution.status == TaskStatus.PENDING,
+                    TaskExecution.parent_execution_id.isnot(None)
+                ).update({"status": TaskStatus.QUEUED}, synchronize_session=False)
+                db.commit()
+            
+            affected_tasks = set()
+            advance_parents = set()
+            for row in rows:
+                if row.node_id in alive_nodes or row.id in self._adopted:
+                    continue
+                if row.id in fanout_parents:
+                    advance_parents.add(row.id)
+                    continue
+                if row.parent_execution_id:
+                    advance_parents.add(row.parent_execution_id)
+                else:
+                    affected_tasks.add(row.task_id)
+                
+                # 非集群模式下只有一个后端，遗留的执行都由本机启动
+                local = not self.cluster_mode or execution_recovery.is_local_node(row.node_id, self.node_id)
+                if local and execution_recovery.process_matches(row.pid, row.pgid, row.start_time):
+                    if output_spool.exists(row.log_file):
+                        self._adopt_execution(db, row)
+                        continue
+                    # 旧版本启动的进程输出连接在已随旧后端关闭的管道上，无法继续采集，结束后标记为失败
+                    execution_recovery.kill_group(row.pgid or row.pid)
+                elif local and row.pgid and not psutil.pid_exists(row.pid) and execution_recovery.group_alive(row.pgid):
+                    # 主进程已退出但进程组仍在（PID未被复用），是该执行遗留的子进程
+                    execution_recovery.kill_group(row.pgid)
+                self._mark_lost(db, row)
+            
+            if startup:
+                # 上次运行时排队的执行
+                queued_tasks = db.query(TaskExecution.task_id).filter(
+                    TaskExecution.status == TaskStatus.QUEUED,
+                    TaskExecution.parent_execution_id.is_(None)
+                ).distinct().all()
+                affected_tasks |= {row.task_id for row in queued_tasks}
+        finally:
+            db.close()
+        
+        for parent_id in advance_parents:
+            try:
+                self._advance_fanout(parent_id)
+            except Exception as e:
+                logger.error(f"继续扇出执行 {parent_id} 失败: {str(e)}")
+        
+        for task_id in affected_tasks:
+            try:
+                self._release_queued(task_id)
+            except Exception as e:
+                logger.error(f"启动任务 {task_id} 排队的执行失败: {str(e)}")
+    
+    def _mark_lost(self, db, row):
+        """进程已不存在：将执行记录标记为失败"""
+        end_time = datetime.now()
+        updated = db.query(TaskExecution).filter(
+            TaskExecution.id == row.id,
+            TaskExecution.status == TaskStatus.RUNNING
+        ).update({
+            "status": TaskStatus.FAILED,
+            "status_reason": execution_recovery.REASON_LOST,
+            "end_time": end_time,
+        }, synchronize_session=False)
+        if not updated:
+            db.rollback()
+            return
+        
+        # 任务没有其他运行中的执行时，任务状态同步为失败
+        running = db.query(TaskExecution.id).filter(
+            TaskExecution.task_id == row.task_id,
+            TaskExecution.status == TaskStatus.RUNNING
+        ).first()
+        if not running:
+            db.query(Task).filter(Task.id == row.task_id, Task.status == TaskStatus.RUNNING).update(
+                {"status": TaskStatus.FAILED}, synchronize_session=False
+            )
+        db.commit()
+        
+        self._count("recovered_lost")
+        logger.warning(f"执行 {row.id}（任务 {row.task_id}）的进程已不存在，标记为失败")
+        if output_spool.exists(row.log_file):
+            # 进程结束前写入暂存文件但尚未写入日志的输出
+            try:
+                spool = output_spool.SpoolReader(row.log_file, task_logger.open_stream(row.log_file))
+                spool.pump()
+                self._close_spool(spool)
+            except Exception as e:
+                logger.error(f"读取执行 {row.id} 遗留的输出失败: {str(e)}")
+        if row.log_file and os.path.exists(row.log_file):
+            task_logger.write_log(
+                row.log_file,
+                f"\n\n后端重启或节点离线后未找到任务进程，执行已标记为失败\n结束时间: {end_time.strftime('%Y-%m-%d %H:%M:%S')}\n"
+            )
+    
+    def _adopt_execution(self, db, row):
+        """进程仍在运行：重新接管，从记录的位置继续读取输出暂存文件，等待其结束后更新执行记录
+        
+        进程不是本后端的子进程，结束后无法获取退出码
+        """
+        task = db.query(Task).filter(Task.id == row.task_id).first()
+        db.query(TaskExecution).filter(TaskExecution.id == row.id).update(
+            {"node_id": self.node_id}, synchronize_session=False
+        )
+        db.commit()
+        
+        timeout = ResourceLimits.for_task(task).timeout_seconds if task else settings.TASK_DEFAULT_TIMEOUT_SECONDS
+        task_logger.write_log(
+            row.log_file,
+            f"\n[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 后端重启，已重新接管进程 {row.pid}，继续采集输出\n"
+        )
+        spool = output_spool.SpoolReader(row.log_file, task_logger.open_stream(row.log_file))
+        with self._adopted_lock:
+            self._adopted[row.id] = {
+                'task_id': row.task_id,
+                'execution_id': row.id,
+                'log_file': row.log_file,
+                'output_dir': get_execution_output_dir(row.task_id, row.id),
+                'pid': row.pid,
+                'pgid': row.pgid,
+                'parent_execution_id': row.parent_execution_id,
+                'start_time': row.start_time,
+                'deadline': row.start_time + timedelta(seconds=timeout),
+                'spool': spool,
+            }
+            if not self._adopted_thread or not self._adopted_thread.is_alive():
+                self._adopted_thread = threading.Thread(target=self._adopted_loop, name="task-adopted", daemon=True)
+                self._adopted_thread.start()
+        
+        self._count("recovered_adopted")
+        logger.info(f"重新接管执行 {row.id}（任务 {row.task_id}，进程 {row.pid}）")
+    
+    def _adopted_loop(self):
+        """检查重新接管的进程，结束或超时后更新执行记录"""
+        while not self._stopping.is_set():
+            with self._adopted_lock:
+                adopted = list(self._adopted.values())
+            if not adopted:
                 return
             
-            # 创建执行记录
+            for ctx in adopted:
+                if datetime.now() > ctx['deadline']:
+                    execution_recovery.kill_group(ctx['pgid'] or ctx['pid'])
+                    complete = functools.partial(
+                        self._complete_execution, ctx, error="重新接管的任务执行超时，已终止整个进程组",
+                        reason=REASON_TIMEOUT
+                    )
+                elif not execution_recovery.process_matches(ctx['pid'], ctx['pgid'], ctx['start_time']):
+                    complete = functools.partial(
+                        self._complete_execution, ctx, error="重新接管的任务进程已结束，无法获取退出码",
+                        reason=execution_recovery.REASON_EXIT_UNKNOWN
+                    )
+                else:
+                    self._pump_spool(ctx)
+                    continue
+                # 读完进程结束前的输出，再写入执行结果
+                self._pump_spool(ctx)
+                self._close_spool(ctx['spool'])
+                complete()
+                with self._adopted_lock:
+                    self._adopted.pop(ctx['execution_id'], None)
+            
+            self._stopping.wait(ADOPTED_POLL_INTERVAL)
+    
+    def _pump_spool(self, ctx: dict):
+        """将重新接管的进程新写入暂存文件的输出写入日志"""
+        try:
+            ctx['spool'].pump()
+        except Exception as e:
+            logger.error(f"读取执行 {ctx['execution_id']} 的输出失败: {str(e)}")
+    
+    def _close_spool(self, spool: output_spool.SpoolReader):
+        """输出已全部写入日志：关闭日志流并删除暂存文件"""
+        spool.log_stream.close()
+        spool.close()
+    
+    def _abandon_execution(self, request: dict):
+        """任务已不可执行时，将已领取的排队执行记录标记为失败"""
+        if not request.get('execution_id'):
+            return
+        db = SessionLocal()
+        try:
+            execution = db.query(TaskExecution).filter(TaskExecution.id == request['execution_id']).first()
+            if execution:
+                execution.status = TaskStatus.FAILED
+                execution.end_time = datetime.now()
+                db.commit()
+        finally:
+            db.close()
+    
+    def _defer_execution(self, db, request: dict, execution, status: TaskStatus,
+                         reason: str = overlap_guard.REASON_OVERLAP):
+        """运行实例数已达上限（按重叠策略）或任务已暂停时，将本次执行记录为排队或跳过"""
+        if execution is not None and execution.status == status:
+            # 排队的执行重新分发时仍未轮到，保持排队
+            db.rollback()
+            return
+        if execution is None:
             execution = TaskExecution(
-                task_id=task_id,
-                executed_by=executed_by,
-                trigger_type=trigger_type,
-                status=TaskStatus.RUNNING,
-                start_time=datetime.now()  # 使用本地时间
+                task_id=request['task_id'],
+                executed_by=request['executed_by'],
+                trigger_type=request['trigger_type'],
+                scheduled_time=request['scheduled_time'],
+                retry_of_id=request.get('retry_of_id'),
+                attempt=request.get('attempt', 1),
+                upstream_execution_id=request.get('upstream_execution_id'),
+                trigger_event_at=request.get('trigger_event_at'),
+                trigger_files=request.get('trigger_files'),
+                start_time=datetime.now(),  # 排队/跳过时为触发时间
+                node_id=self.node_id
             )
             db.add(execution)
-            db.commit()
-            db.refresh(execution)
+        for field, value in overlap_guard.deferred_values(status, reason).items():
+            setattr(execution, field, value)
+        db.commit()
+        
+        if reason == overlap_guard.REASON_PAUSED:
+            self._count("paused_queued")
+            logger.info(f"任务 {request['task_id']} 已暂停，本次{request['trigger_type']}执行保持排队，恢复后启动")
+            return
+        self._count("overlap_queued" if status == TaskStatus.QUEUED else "overlap_skipped")
+        logger.info(f"任务 {request['task_id']} 运行实例已达上限，本次执行{'排队' if status == TaskStatus.QUEUED else '跳过'}")
+    
+    def _release_queued(self, task_id: int):
+        """有实例结束（或任务恢复）后启动该任务最早排队的执行，任务暂停时保持排队"""
+        if self.cluster_mode:
+            if scheduler_cluster.release_queued_execution(task_id):
+                self._worker_wakeup.set()
+            return
+        
+        db = SessionLocal()
+        try:
+            if db.query(Task.is_paused).filter(Task.id == task_id).scalar():
+                return
+            queued = db.query(TaskExecution).filter(
+                TaskExecution.task_id == task_id,
+                TaskExecution.status == TaskStatus.QUEUED,
+                TaskExecution.parent_execution_id.is_(None)
+            ).order_by(TaskExecution.id).first()
+            if not queued:
+                return
+            request = {
+                'task_id': task_id,
+                'executed_by': queued.executed_by,
+                'trigger_type': queued.trigger_type,
+                'scheduled_time': queued.scheduled_time,
+                'retry_of_id': queued.retry_of_id,
+                'attempt': queued.attempt,
+                'upstream_execution_id': queued.upstream_execution_id,
+                'execution_id': queued.id,
+                'from_queue': True,
+                'fired_at': queued.scheduled_time or queued.start_time,
+            }
+        finally:
+            db.close()
+        
+        self._enqueue(request)
+    
+    def _start_execution(self, request: dict):
+        """检查运行实例数，创建执行记录、日志文件和目录，构建命令与环境变量
+        
+        Args:
+            request: 执行请求（task_id/executed_by/trigger_type/scheduled_time，
+                     集群模式下领取的执行、排队后重新分发的执行和扇出子执行带有execution_id，
+                     排队的执行同时带有from_queue标记，扇出子执行带有parent_execution_id）
+            
+        Returns:
+            执行上下文字典，任务不可执行时返回None
+        """
+        task_id = request['task_id']
+        trigger_type = request['trigger_type']
+        # 执行链路：从触发开始，到这里为止的时间计为排队
+        trace = Trace(start=request.get('fired_at'), task_id=task_id, trigger_type=trigger_type, node_id=self.node_id)
+        trace.add("queue", trace.start_ns)
+        db = SessionLocal()
+        try:
+            # 输入指纹只依赖文件，在锁定任务行之前计算，哈希较大的输入目录时不占用行锁；
+            # 扇出子执行不单独缓存
+            fingerprint, fingerprint_source = None, None
+            if not request.get('parent_execution_id'):
+                snapshot = db.query(Task).filter(Task.id == task_id).first()
+                if snapshot and snapshot.is_active and snapshot.cache_enabled:
+                    with trace.span("fingerprint"):
+                        fingerprint = self._compute_fingerprint(snapshot)
+                    fingerprint_source = execution_cache.fingerprint_source(snapshot)
+                # 结束读取事务，锁定时重新读取任务
+                db.rollback()
+            
+            with trace.span("lock_task"):
+                # 锁定任务行，同一任务的并发触发在此串行判断运行实例数
+                task = overlap_guard.lock_task(db, task_id)
+                if not task or not task.is_active:
+                    db.rollback()
+                    logger.warning(f"任务 {task_id} 不存在或已禁用")
+                    self._abandon_execution(request)
+                    return None
+                
+                execution = None
+                if request.get('execution_id'):
+                    execution = db.query(TaskExecution).filter(TaskExecution.id == request['execution_id']).first()
+                    if request.get('from_queue') and (not execution or execution.status != TaskStatus.QUEUED):
+                        # 排队的执行已被其他线程取走
+                        db.rollback()
+                        return None
+                
+                # 暂停期间到期的重试、重新分发的排队执行保持排队，任务恢复后再启动
+                if not request.get('parent_execution_id') and \
+                        overlap_guard.held_by_pause(task, trigger_type, request.get('from_queue', False)):
+                    self._defer_execution(db, request, execution, TaskStatus.QUEUED, overlap_guard.REASON_PAUSED)
+                    return None
+                
+                # 集群模式领取时已完成实例数检查，扇出子执行计入父执行的实例，其余情况在这里检查
+                if not execution or request.get('from_queue'):
+                    deferred = overlap_guard.overflow_status(db, task, exclude_id=execution.id if execution else None)
+                    if deferred:
+                        self._defer_execution(db, request, execution, deferred)
+                        return None
+            
+            # 执行结果缓存：手动执行总是运行（仍记录指纹）；
+            # 计算指纹后缓存被关闭或脚本、参数被修改时本次不使用缓存
+            if not task.cache_enabled or execution_cache.fingerprint_source(task) != fingerprint_source:
+                fingerprint = None
+            if fingerprint:
+                with trace.span("cache_lookup"):
+                    cached = execution_cache.find_cache_hit(db, task_id, fingerprint) \
+                        if trigger_type != "manual" else None
+                if cached:
+                    self._record_cache_hit(db, task, request, execution, cached, fingerprint)
+                    return None
+            
+            record_started = time.time_ns()
+            if execution:
+                # 已领取或排队的执行：更新为实际开始时间
+                execution.status = TaskStatus.RUNNING
+                execution.status_reason = None
+                execution.start_time = datetime.now()  # 使用本地时间
+                execution.node_id = self.node_id
+                execution.fingerprint = fingerprint
+            else:
+                # 创建执行记录
+                execution = TaskExecution(
+                    task_id=task_id,
+                    executed_by=request['executed_by'],
+                    trigger_type=trigger_type,
+                    scheduled_time=request['scheduled_time'],
+                    retry_of_id=request.get('retry_of_id'),
+                    attempt=request.get('attempt', 1),
+                    upstream_execution_id=request.get('upstream_execution_id'),
+                    trigger_event_at=request.get('trigger_event_at'),
+                    trigger_files=request.get('trigger_files'),
+                    status=TaskStatus.RUNNING,
+                    start_time=datetime.now(),  # 使用本地时间
+                    node_id=self.node_id,
+                    fingerprint=fingerprint
+                )
+                db.add(execution)
+            
+            # 排队等待时间：从触发到启动
+            if request.get('fired_at'):
+                execution.queue_wait_ms = max(0, int((datetime.now() - request['fired_at']).total_seconds() * 1000))
+                self._queue_waits.append(execution.queue_wait_ms)
+            # 文件触发延迟：从第一个文件到达到启动
+            if execution.trigger_event_at:
+                execution.event_latency_ms = max(0, int((execution.start_time - execution.trigger_event_at).total_seconds() * 1000))
+                self._event_latencies.append(execution.event_latency_ms)
+            # 先flush获取执行ID，与日志路径、任务状态在同一次提交中写入，减少每次触发的数据库提交
+            db.flush()
             
             # 创建日志文件
             log_file = task_logger.get_log_file_path(task_id, execution.id)
@@ -94,16 +1119,28 @@ class TaskScheduler:
             task.status = TaskStatus.RUNNING
             task.last_run_at = datetime.now()  # 使用本地时间
             db.commit()
+            trace.add("create_record", record_started, execution_id=execution.id)
+            trace.attributes['execution_id'] = execution.id
             
             logger.info(f"开始执行任务 {task_id}: {task.name}")
             
             # 使用统一的路径工具创建任务数据目录
-            task_data_dir = ensure_dir(get_task_data_dir(task_id))
-            input_dir = ensure_dir(get_task_input_dir(task_id))
-            output_dir = ensure_dir(get_execution_output_dir(task_id, execution.id))
+            with trace.span("prepare_dirs"):
+                task_data_dir = ensure_dir(get_task_data_dir(task_id))
+                input_dir = ensure_dir(get_task_input_dir(task_id))
+                output_dir = ensure_dir(get_execution_output_dir(task_id, execution.id))
             
             logger.info(f"任务输出目录: {output_dir}")
             
+            limits = ResourceLimits.for_task(task)
+            attempt_info = f"{execution.attempt}/{task.retry_max_attempts or 1}"
+            if execution.retry_of_id:
+                attempt_info += f"（重试执行 {execution.retry_of_id}）"
+            
+            trigger_note = ""
+            if execution.event_latency_ms is not None:
+                trigger_note = f"（文件到达后 {execution.event_latency_ms}ms 启动）"
+            
             # 写入日志头部
             log_header = f"""
 {'='*80}
@@ -112,16 +1149,27 @@ class TaskScheduler:
 任务ID: {task_id}
 任务名称: {task.name}
 执行ID: {execution.id}
-触发方式: {trigger_type}
+尝试次数: {attempt_info}
+执行节点: {self.node_id}
+触发方式: {trigger_type}{trigger_note}
+计划时间: {execution.scheduled_time.strftime('%Y-%m-%d %H:%M:%S') if execution.scheduled_time else '-'}
 开始时间: {execution.start_time.strftime('%Y-%m-%d %H:%M:%S')}
 执行脚本: {task.script_path}
 输出目录: {output_dir}
+资源限制: {limits.summary()}
 {'='*80}
 
 """
-            task_logger.write_log(log_file, log_header, mode='w')
+            with trace.span("write_log_header"):
+                task_logger.write_log(log_file, log_header, mode='w')
+            
+            if fanout.is_fanout(task) and not execution.parent_execution_id:
+                # 扇出父执行不启动进程，展开为子执行
+                self._start_fanout(db, task, execution, input_dir, output_dir)
+                return None
             
             # 设置环境变量
+            env_started = time.time_ns()
             env = os.environ.copy()
             
             # 添加PYTHONPATH，让脚本可以导入backend的模块（如db_configs）
@@ -144,100 +1192,459 @@ class TaskScheduler:
                 'EXEC_TIME': execution.start_time.strftime('%H%M%S'),
                 'EXEC_DATETIME': execution.start_time.strftime('%Y%m%d_%H%M%S'),
             })
+            env.update(self._upstream_env(db, task_id, execution.upstream_execution_id))
+            if execution.trigger_files:
+                env['TRIGGER_FILES'] = execution.trigger_files
             
-            # 执行Python脚本
-            try:
-                # 确保脚本路径是绝对路径（因为我们改变了工作目录）
-                script_absolute_path = os.path.abspath(task.script_path)
-                
-                # 构建命令：python script.py [参数]
-                command = [sys.executable, script_absolute_path]
-                
-                # 添加命令行参数（如果有）
-                if task.script_params:
-                    # 使用shlex解析参数，支持引号和转义
-                    import shlex
-                    params = shlex.split(task.script_params)
-                    command.extend(params)
-                    logger.info(f"执行命令: {' '.join(command)}")
-                
-                result = subprocess.run(
-                    command,
-                    capture_output=True,
-                    text=True,
-                    timeout=3600,  # 1小时超时
-                    env=env,  # 传入环境变量
-                    cwd=output_dir  # ⭐ 设置工作目录为输出目录，脚本可以直接在当前目录创建文件
-                )
-                
-                execution.end_time = datetime.now()  # 使用本地时间
-                execution.exit_code = result.returncode
-                
-                # 写入执行输出
-                if result.stdout:
-                    task_logger.write_log(log_file, "\n标准输出:\n" + "="*80 + "\n")
-                    task_logger.write_log(log_file, result.stdout)
-                
-                # 写入错误输出
-                if result.stderr:
-                    task_logger.write_log(log_file, "\n\n错误输出:\n" + "="*80 + "\n")
-                    task_logger.write_log(log_file, result.stderr)
+            # 确保脚本路径是绝对路径（因为我们改变了工作目录）
+            script_absolute_path = os.path.abspath(task.script_path)
+            
+            # 构建命令：python script.py [参数] [扇出子执行参数]
+            command = [sys.executable, script_absolute_path]
+            
+            # 添加命令行参数（如果有）
+            if task.script_params:
+                # 使用shlex解析参数，支持引号和转义
+                params = shlex.split(task.script_params)
+                command.extend(params)
+            if execution.params:
+                command.extend(shlex.split(execution.params))
+                env['FANOUT_PARAMS'] = execution.params
+                env['PARENT_EXECUTION_ID'] = str(execution.parent_execution_id)
+            if len(command) > 2:
+                logger.info(f"执行命令: {' '.join(command)}")
+            trace.add("build_env", env_started)
+            
+            return {
+                'task_id': task_id,
+                'execution_id': execution.id,
+                'retry_of_id': execution.retry_of_id,
+                'attempt': execution.attempt,
+                'parent_execution_id': execution.parent_execution_id,
+                'start_time': execution.start_time,
+                'log_file': log_file,
+                'output_dir': output_dir,
+                'command': command,
+                'env': env,
+                'limits': limits,
+                'trace': trace,
+            }
+        except Exception as e:
+            logger.error(f"执行任务 {task_id} 时发生错误: {str(e)}")
+            db.rollback()
+            return None
+        finally:
+            db.close()
+    
+    def _complete_execution(self, ctx: dict, returncode: int = None, error: str = None, reason: str = None,
+                            usage: dict = None):
+        """写入日志尾部，扫描产出文件并更新执行状态
+        
+        Args:
+            ctx: _start_execution返回的执行上下文
+            returncode: 进程退出码
+            error: 执行异常信息（超出资源限制、启动失败等），此时按失败处理
+            reason: 失败原因（超时、内存、CPU等超限原因，或重新接管的进程无法获取退出码）
+            usage: 进程资源占用
+        """
+        task_id = ctx['task_id']
+        log_file = ctx['log_file']
+        trace = ctx.get('trace')
+        db = SessionLocal()
+        try:
+            execution = db.query(TaskExecution).filter(TaskExecution.id == ctx['execution_id']).first()
+            task = db.query(Task).filter(Task.id == task_id).first()
+            
+            execution.end_time = datetime.now()  # 使用本地时间
+            if usage:
+                for field, value in usage.items():
+                    setattr(execution, field, value)
+            
+            if error:
+                execution.status = TaskStatus.FAILED
+                execution.status_reason = reason
+                execution.exit_code = returncode if returncode is not None else -1
+                if task:
+                    task.status = TaskStatus.FAILED
                 
-                # 写入日志尾部
-                log_footer = f"""
+                error_msg = f"\n\n{error}\n结束时间: {execution.end_time.strftime('%Y-%m-%d %H:%M:%S')}\n"
+                task_logger.write_log(log_file, error_msg)
+                if reason:
+                    logger.error(f"任务 {task_id} 执行失败: {reason}")
+                else:
+                    logger.error(f"任务 {task_id} 执行异常: {error}")
+                self._save_trace(trace, execution, error=reason or "error")
+                commit_started = time.time_ns()
+                db.commit()
+                self._export_trace(trace, commit_started)
+                if not ctx.get('parent_execution_id'):
+                    self._schedule_retry(ctx, task, execution.exit_code, reason)
+                return
+            
+            execution.exit_code = returncode
+            
+            # 写入日志尾部
+            log_footer = f"""
 \n{'='*80}
 执行结束
 {'='*80}
 结束时间: {execution.end_time.strftime('%Y-%m-%d %H:%M:%S')}
 执行时长: {(execution.end_time - execution.start_time).total_seconds():.2f}秒
-退出码: {result.returncode}
-状态: {'成功' if result.returncode == 0 else '失败'}
-{'='*80}
+退出码: {returncode}
+状态: {'成功' if returncode == 0 else '失败'}
+{self._format_usage(usage)}{'='*80}
 """
-                task_logger.write_log(log_file, log_footer)
-                
-                # 扫描产出文件
-                output_files = self._scan_output_files(output_dir)
-                if output_files:
-                    execution.output_files = json.dumps(output_files, ensure_ascii=False)
-                    logger.info(f"任务 {task_id} 产出了 {len(output_files)} 个文件")
-                
-                if result.returncode == 0:
-                    execution.status = TaskStatus.SUCCESS
+            footer_started = time.time_ns()
+            task_logger.write_log(log_file, log_footer)
+            if trace:
+                trace.add("write_log_footer", footer_started)
+            
+            # 扫描产出文件
+            scan_started = time.time_ns()
+            output_files = self._scan_output_files(ctx['output_dir'])
+            if trace:
+                trace.add("scan_outputs", scan_started, files=len(output_files))
+            if output_files:
+                execution.output_files = json.dumps(output_files, ensure_ascii=False)
+                logger.info(f"任务 {task_id} 产出了 {len(output_files)} 个文件")
+            
+            if returncode == 0:
+                execution.status = TaskStatus.SUCCESS
+                if task:
                     task.status = TaskStatus.SUCCESS
-                    logger.info(f"任务 {task_id} 执行成功")
-                else:
-                    execution.status = TaskStatus.FAILED
-                    task.status = TaskStatus.FAILED
-                    logger.error(f"任务 {task_id} 执行失败，退出码: {result.returncode}")
-                
-            except subprocess.TimeoutExpired:
-                execution.end_time = datetime.now()  # 使用本地时间
+                logger.info(f"任务 {task_id} 执行成功")
+            else:
                 execution.status = TaskStatus.FAILED
-                execution.exit_code = -1
-                task.status = TaskStatus.FAILED
-                
-                error_msg = f"\n\n任务执行超时（超过3600秒）\n结束时间: {execution.end_time.strftime('%Y-%m-%d %H:%M:%S')}\n"
-                task_logger.write_log(log_file, error_msg)
-                logger.error(f"任务 {task_id} 执行超时")
+                if task:
+                    task.status = TaskStatus.FAILED
+                logger.error(f"任务 {task_id} 执行失败，退出码: {returncode}")
             
+            self._save_trace(trace, execution, error=None if returncode == 0 else f"exit code {returncode}")
+            commit_started = time.time_ns()
+            db.commit()
+            self._export_trace(trace, commit_started)
+            if ctx.get('parent_execution_id'):
+                # 扇出子执行的重试和下游触发由父执行统一处理
+                pass
+            elif returncode != 0:
+                self._schedule_retry(ctx, task, returncode)
+            else:
+                self._trigger_dependents(task_id, ctx['execution_id'])
+        except Exception as e:
+            logger.error(f"执行任务 {task_id} 时发生错误: {str(e)}")
+            db.rollback()
+        finally:
+            db.close()
+            try:
+                if ctx.get('parent_execution_id'):
+                    self._advance_fanout(ctx['parent_execution_id'])
+                else:
+                    self._release_queued(task_id)
             except Exception as e:
-                execution.end_time = datetime.now()  # 使用本地时间
-                execution.status = TaskStatus.FAILED
-                execution.exit_code = -1
-                task.status = TaskStatus.FAILED
-                
-                error_msg = f"\n\n执行异常:\n{str(e)}\n结束时间: {execution.end_time.strftime('%Y-%m-%d %H:%M:%S')}\n"
-                task_logger.write_log(log_file, error_msg)
-                logger.error(f"任务 {task_id} 执行异常: {str(e)}")
+                logger.error(f"启动任务 {task_id} 排队的执行失败: {str(e)}")
+    
+    @staticmethod
+    def _save_trace(trace: Trace, execution: TaskExecution, error: str = None):
+        """结束执行链路并写入执行记录，随执行结果一起提交（提交本身的耗时只计入指标和导出）"""
+        if not trace:
+            return
+        trace.finish(error=error, status=execution.status.value, exit_code=execution.exit_code)
+        execution.trace = json.dumps(trace.to_dict(), ensure_ascii=False)
+    
+    def _export_trace(self, trace: Trace, commit_started: int):
+        """补充结果提交阶段，计入各阶段耗时指标并导出"""
+        if not trace:
+            return
+        trace.add("commit", commit_started)
+        trace.end_ns = time.time_ns()
+        for name, ms in trace.phases_ms().items():
+            self._phase_durations[name].append(ms)
+        trace_exporter.export(trace.to_dict())
+    
+    @staticmethod
+    def _compute_fingerprint(task: Task):
+        """计算任务的输入指纹，脚本文件不可读等情况返回None（不使用缓存）"""
+        try:
+            return execution_cache.compute_fingerprint(
+                task,
+                get_task_input_dir(task.id),
+                os.path.join(get_task_data_dir(task.id), execution_cache.MANIFEST_FILENAME)
+            )
+        except OSError as e:
+            logger.warning(f"计算任务 {task.id} 的输入指纹失败: {str(e)}")
+            return None
+    
+    def _record_cache_hit(self, db, task: Task, request: dict, execution, cached: TaskExecution, fingerprint: str):
+        """输入与最近一次成功执行相同：记录一次命中缓存的跳过执行，不启动进程"""
+        now = datetime.now()
+        if execution is None:
+            execution = TaskExecution(
+                task_id=task.id,
+                executed_by=request['executed_by'],
+                trigger_type=request['trigger_type'],
+                scheduled_time=request['scheduled_time'],
+                retry_of_id=request.get('retry_of_id'),
+                attempt=request.get('attempt', 1),
+                upstream_execution_id=request.get('upstream_execution_id'),
+                trigger_event_at=request.get('trigger_event_at'),
+                trigger_files=request.get('trigger_files'),
+                start_time=now,
+                node_id=self.node_id
+            )
+            db.add(execution)
+        execution.status = TaskStatus.SKIPPED
+        execution.status_reason = execution_cache.REASON_CACHE_HIT
+        execution.end_time = now
+        execution.fingerprint = fingerprint
+        db.flush()
+        
+        execution.log_file = task_logger.get_log_file_path(task.id, execution.id)
+        linked = 0
+        if task.cache_link_outputs:
+            output_dir = ensure_dir(get_execution_output_dir(task.id, execution.id))
+            linked = execution_cache.link_outputs(get_execution_output_dir(task.id, cached.id), output_dir)
+            if linked:
+                execution.output_files = json.dumps(self._scan_output_files(output_dir), ensure_ascii=False)
+        db.commit()
+        
+        self._count("cache_hits")
+        link_note = f"已链接上次执行的 {linked} 个产出文件\n" if linked else ""
+        logger.info(f"任务 {task.id} 的脚本、参数和输入未变化，命中执行 {cached.id} 的缓存，跳过执行")
+        task_logger.write_log(execution.log_file, f"""
+{'='*80}
+任务执行日志
+{'='*80}
+任务ID: {task.id}
+任务名称: {task.name}
+执行ID: {execution.id}
+触发方式: {execution.trigger_type}
+时间: {now.strftime('%Y-%m-%d %H:%M:%S')}
+指纹: {fingerprint}
+{'='*80}
+
+脚本、参数和输入目录与执行 {cached.id} 相同，命中缓存，跳过执行
+{link_note}""", mode='w')
+    
+    def _start_fanout(self, db, task: Task, parent: TaskExecution, input_dir: str, output_dir: str):
+        """展开扇出参数，为每组参数创建排队的子执行，再按扇出并发数启动"""
+        ctx = {
+            'task_id': task.id,
+            'execution_id': parent.id,
+            'retry_of_id': parent.retry_of_id,
+            'attempt': parent.attempt,
+            'log_file': parent.log_file,
+            'output_dir': output_dir,
+        }
+        try:
+            param_sets = fanout.expand_param_sets(task, input_dir)
+        except ValueError as e:
+            db.commit()
+            self._complete_execution(ctx, error=f"扇出参数错误: {str(e)}")
+            return
+        
+        now = datetime.now()
+        db.add_all([
+            TaskExecution(
+                task_id=task.id,
+                executed_by=parent.executed_by,
+                trigger_type=parent.trigger_type,
+                scheduled_time=parent.scheduled_time,
+                parent_execution_id=parent.id,
+                params=params,
+                status=TaskStatus.QUEUED,
+                status_reason=fanout.REASON_FANOUT,
+                start_time=now,  # 子执行启动前为创建时间
+            )
+            for params in param_sets
+        ])
+        db.commit()
+        
+        self._count("fanout_children", len(param_sets))
+        logger.info(f"任务 {task.id} 扇出执行 {parent.id}：{len(param_sets)} 个子执行，并发 {task.fanout_concurrency}")
+        task_logger.write_log(
+            parent.log_file,
+            f"扇出执行：共 {len(param_sets)} 组参数，最大并发 {task.fanout_concurrency}\n"
+        )
+        self._advance_fanout(parent.id)
+    
+    def _advance_fanout(self, parent_id: int):
+        """在扇出并发数内启动排队的子执行，全部结束后汇总到父执行
+        
+        在锁定父执行行的事务中计算空闲名额并将选中的子执行改为pending，
+        多个子执行同时结束时不会超出并发数或重复启动
+        """
+        db = SessionLocal()
+        try:
+            parent = db.query(TaskExecution).filter(TaskExecution.id == parent_id).with_for_update().first()
+            if not parent or parent.status != TaskStatus.RUNNING:
+                db.rollback()
+                return
+            task = db.query(Task).filter(Task.id == parent.task_id).first()
+            
+            children = db.query(TaskExecution).filter(TaskExecution.parent_execution_id == parent_id).all()
+            active = sum(1 for child in children if child.status in (TaskStatus.RUNNING, TaskStatus.PENDING))
+            queued = [child for child in children if child.status == TaskStatus.QUEUED]
             
+            if not active and not queued:
+                self._finish_fanout(db, parent, task, children)
+                return
+            
+            concurrency = task.fanout_concurrency if task and task.fanout_concurrency else 1
+            released = sorted(queued, key=lambda child: child.id)[:max(concurrency - active, 0)]
+            for child in released:
+                child.status = TaskStatus.PENDING
             db.commit()
             
+            requests = [{
+                'task_id': child.task_id,
+                'executed_by': child.executed_by,
+                'trigger_type': child.trigger_type,
+                'scheduled_time': child.scheduled_time,
+                'execution_id': child.id,
+                'parent_execution_id': parent_id,
+                'fired_at': child.start_time,  # 子执行的创建时间
+            } for child in released]
+        finally:
+            db.close()
+        
+        if not requests:
+            return
+        if self.cluster_mode:
+            # pending的子执行由各节点领取
+            self._worker_wakeup.set()
+            return
+        for request in requests:
+            self._enqueue(request)
+    
+    def _finish_fanout(self, db, parent: TaskExecution, task: Task, children: list):
+        """所有子执行结束：汇总结果并更新父执行，再按普通执行的结束流程处理重试、下游和排队"""
+        summary = fanout.summarize(children)
+        parent.summary = json.dumps(summary, ensure_ascii=False)
+        parent.end_time = datetime.now()
+        succeeded = summary['failed'] == 0
+        parent.exit_code = 0 if succeeded else 1
+        parent.status = TaskStatus.SUCCESS if succeeded else TaskStatus.FAILED
+        if task:
+            task.status = parent.status
+        db.commit()
+        
+        try:
+            fanout.write_output_index(
+                get_execution_output_dir(parent.task_id, parent.id), children,
+                functools.partial(get_execution_output_dir, parent.task_id)
+            )
+        except OSError as e:
+            logger.error(f"写入扇出执行 {parent.id} 的产出清单失败: {str(e)}")
+        
+        logger.info(f"任务 {parent.task_id} 扇出执行 {parent.id} 结束：成功 {summary['success']}/{summary['total']}")
+        if parent.log_file:
+            task_logger.write_log(parent.log_file, f"""
+{'='*80}
+扇出执行结束
+{'='*80}
+结束时间: {parent.end_time.strftime('%Y-%m-%d %H:%M:%S')}
+执行时长: {(parent.end_time - parent.start_time).total_seconds():.2f}秒
+子执行: 共 {summary['total']}，成功 {summary['success']}，失败 {summary['failed']}
+失败的子执行ID: {', '.join(map(str, summary['failed_execution_ids'])) or '-'}
+状态: {'成功' if succeeded else '失败'}
+{'='*80}
+""")
+        
+        ctx = {
+            'task_id': parent.task_id,
+            'execution_id': parent.id,
+            'retry_of_id': parent.retry_of_id,
+            'attempt': parent.attempt,
+            'log_file': parent.log_file,
+        }
+        if succeeded:
+            self._trigger_dependents(parent.task_id, parent.id)
+        else:
+            self._schedule_retry(ctx, task, parent.exit_code)
+        self._release_queued(parent.task_id)
+    
+    @staticmethod
+    def _upstream_env(db, task_id: int, upstream_execution_id: int = None) -> dict:
+        """上游任务的输出目录环境变量
+        
+        UPSTREAM_OUTPUT_DIRS：各上游任务最近一次成功执行的输出目录（JSON，键为上游任务ID）
+        UPSTREAM_OUTPUT_DIR：触发本次执行的上游执行的输出目录；非依赖触发且只有一个上游时为该上游的目录
+        上游是扇出任务时为父执行的目录，其中链接到各子执行的输出目录（见fanout.write_output_index）
+        """
+        dirs = task_dependencies.upstream_output_dirs(db, task_id)
+        env = {}
+        if dirs:
+            env['UPSTREAM_OUTPUT_DIRS'] = json.dumps({str(k): v for k, v in dirs.items()}, ensure_ascii=False)
+        
+        upstream = None
+        if upstream_execution_id:
+            upstream = db.query(TaskExecution.task_id).filter(TaskExecution.id == upstream_execution_id).first()
+        if upstream:
+            env['UPSTREAM_EXECUTION_ID'] = str(upstream_execution_id)
+            env['UPSTREAM_OUTPUT_DIR'] = get_execution_output_dir(upstream.task_id, upstream_execution_id)
+        elif len(dirs) == 1:
+            env['UPSTREAM_OUTPUT_DIR'] = next(iter(dirs.values()))
+        return env
+    
+    def _trigger_dependents(self, task_id: int, execution_id: int):
+        """执行成功后触发所有上游都已成功的下游任务，各下游任务独立进入分发队列并行执行"""
+        db = SessionLocal()
+        try:
+            ready = task_dependencies.ready_dependents(db, task_id)
         except Exception as e:
-            logger.error(f"执行任务 {task_id} 时发生错误: {str(e)}")
+            logger.error(f"检查任务 {task_id} 的下游任务失败: {str(e)}")
             db.rollback()
+            return
         finally:
             db.close()
+        
+        for downstream_id in ready:
+            logger.info(f"任务 {task_id} 执行成功，触发下游任务 {downstream_id}")
+            self._count("dependency_triggered")
+            self.execute_task(downstream_id, trigger_type="dependency", upstream_execution_id=execution_id)
+    
+    def _schedule_retry(self, ctx: dict, task: Task, exit_code: int, reason: str = None):
+        """按任务的重试策略安排下一次尝试
+        
+        重试作为一次性作业加入调度器（持久化，重启后保留），到期后与普通触发一样进入分发队列，
+        不占用线程等待
+        """
+        attempt = ctx.get('attempt') or 1
+        if not task or not retry_policy.should_retry(task, attempt, exit_code, reason):
+            return
+        
+        delay = retry_policy.backoff_seconds(task, attempt)
+        try:
+            self.scheduler.add_job(
+                func=fire_retry,
+                trigger='date',
+                run_date=datetime.now() + timedelta(seconds=delay),
+                id=f"retry_{ctx['execution_id']}",
+                args=[task.id, ctx.get('retry_of_id') or ctx['execution_id'], attempt + 1],
+                replace_existing=True
+            )
+        except Exception as e:
+            logger.error(f"安排任务 {task.id} 的重试失败: {str(e)}")
+            return
+        
+        self._count("retries_scheduled")
+        logger.info(f"任务 {task.id} 将在 {delay:.0f} 秒后重试（第 {attempt + 1}/{task.retry_max_attempts} 次尝试）")
+        task_logger.write_log(
+            ctx['log_file'], f"将在 {delay:.0f} 秒后重试（第 {attempt + 1}/{task.retry_max_attempts} 次尝试）\n"
+        )
+    
+    @staticmethod
+    def _format_usage(usage: dict) -> str:
+        """格式化日志尾部的资源占用"""
+        if not usage:
+            return ""
+        # 运行时间短于首个采样间隔时未采样到内存
+        memory = f"{usage['max_rss_kb'] / 1024:.1f}MB" if usage.get('max_rss_kb') is not None else "未采样到"
+        return (
+            f"CPU时间: 用户态 {usage['cpu_user_seconds']:.2f}秒 / 内核态 {usage['cpu_system_seconds']:.2f}秒\n"
+            f"峰值内存: {memory}\n"
+            f"磁盘IO: 读 {usage['io_read_bytes'] / 1024:.0f}KB / 写 {usage['io_write_bytes'] / 1024:.0f}KB\n"
+        )
     
     def _scan_output_files(self, output_dir: str) -> list:
         """扫描输出目录中的文件
@@ -270,24 +1677,111 @@ class TaskScheduler:
             return files
     
     def load_tasks_from_db(self):
-        """从数据库加载所有活跃任务"""
+        """将持久化作业与数据库中的活跃任务对齐
+        
+        补充缺失的作业、移除已失效的作业、重建触发配置（cron或错峰窗口）已变化的作业，
+        其余作业保留原有的下次触发时间
+        """
         db = SessionLocal()
         try:
-            tasks = db.query(Task).filter(Task.is_active == True).all()
-            for task in tasks:
+            tasks = db.query(
+                Task.id, Task.cron_expression, Task.jitter_seconds, Task.interval_seconds, Task.is_paused
+            ).filter(
+                Task.is_active == True,
+                Task.script_path != ""
+            ).all()
+            active = {task.id: task for task in tasks}
+            
+            scheduled = set()
+            for job in self.scheduler.get_jobs():
+                if job.id.startswith("retry_"):
+                    # 待执行的失败重试，到期时再检查任务状态
+                    continue
+                task_id = int(job.id.split("_", 1)[1]) if job.id.startswith("task_") else None
+                if task_id not in active:
+                    self.scheduler.remove_job(job.id)
+                    logger.info(f"移除失效的调度作业 {job.id}")
+                    continue
+                task = active[task_id]
+                try:
+                    expected = self._build_trigger(
+                        task_id, task.cron_expression, task.jitter_seconds, task.interval_seconds
+                    )
+                except Exception:
+                    expected = None
+                if expected is not None and str(job.trigger) != str(expected):
+                    logger.info(f"调度作业 {job.id} 的触发配置已变化，重新添加")
+                    continue
+                if task.is_paused and job.next_run_time is not None:
+                    job.pause()
+                elif not task.is_paused and job.next_run_time is None:
+                    job.resume()
+                scheduled.add(task_id)
+            
+            for task_id, task in active.items():
+                if task_id in scheduled:
+                    continue
                 try:
-                    self.add_task(task.id, task.cron_expression)
+                    self.add_task(
+                        task_id, task.cron_expression, task.jitter_seconds, task.interval_seconds, paused=task.is_paused
+                    )
                 except Exception as e:
-                    logger.error(f"加载任务 {task.id} 失败: {str(e)}")
-            logger.info(f"已加载 {len(tasks)} 个活跃任务")
+                    logger.error(f"加载任务 {task_id} 失败: {str(e)}")
+            logger.info(f"已加载 {len(active)} 个活跃任务（新增 {len(active) - len(scheduled)} 个调度作业）")
+        finally:
+            db.close()
+        self._load_file_triggers()
+    
+    def _load_file_triggers(self):
+        """将文件到达监听与数据库中开启了文件触发的活跃任务对齐"""
+        if not self.file_watcher:
+            return
+        db = SessionLocal()
+        try:
+            tasks = db.query(Task).filter(
+                Task.is_active == True,
+                Task.is_paused == False,
+                Task.script_path != "",
+                Task.file_trigger_enabled == True
+            ).all()
+            for task in tasks:
+                self.file_watcher.watch(task.id, self._file_trigger_config(task))
+            enabled = {task.id for task in tasks}
+            for task_id in self.file_watcher.watched_tasks():
+                if task_id not in enabled:
+                    self.file_watcher.unwatch(task_id)
         finally:
             db.close()
     
     def shutdown(self):
         """关闭调度器"""
         self.scheduler.shutdown()
+        self._stopping.set()
+        self._worker_wakeup.set()
+        if self.cluster_mode:
+            scheduler_cluster.remove_node(self.node_id)
+        self._catchup_queue.put(None)
+        if self.file_watcher:
+            self.file_watcher.stop()
+        trace_exporter.stop()
+        log_compressor.stop()
+        self.dispatch_queue.wake()
+        self.dispatch_pool.shutdown(wait=False)
+        if self.execution_pool:
+            self.execution_pool.shutdown(wait=False)
+        if self.executor:
+            self.executor.shutdown()
+        if self.forkserver:
+            self.forkserver.shutdown()
         logger.info("任务调度器已关闭")
 
 
+def _to_local_naive(value: datetime):
+    """将调度器的带时区时间转换为本地时间（数据库统一存储本地时间）"""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone().replace(tzinfo=None)
+
+
 # 全局调度器实例
 task_scheduler = TaskScheduler()
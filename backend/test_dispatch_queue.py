@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+任务分发队列验证脚本
+用于验证：
+1. 同一优先级内各用户按权重分得启动份额（stride调度），同一用户按入队顺序启动
+2. 高优先级的执行总是先启动
+3. 空闲后重新入队的用户不能积攒份额
+4. 全局和单个用户的并发上限，task_done后释放名额
+不需要启动后端服务；可直接运行或用pytest执行
+"""
+from collections import Counter
+
+from utils.dispatch_queue import DispatchQueue
+
+
+def _drain(queue, count):
+    """连续取出count个执行（每个取出后立即结束），返回 (owner_id, item) 列表"""
+    selected = []
+    for _ in range(count):
+        owner_id, item = queue.get(timeout=0)
+        queue.task_done(owner_id)
+        selected.append((owner_id, item))
+    return selected
+
+
+def test_weighted_shares():
+    """按权重分配启动份额"""
+    queue = DispatchQueue(capacity=100, max_per_owner=100)
+    for i in range(60):
+        queue.put(("a", i), "a", weight=1)
+        queue.put(("b", i), "b", weight=2)
+        queue.put(("c", i), "c", weight=3)
+    selected = _drain(queue, 60)
+    assert Counter(owner_id for owner_id, _ in selected) == {"a": 10, "b": 20, "c": 30}
+    # 任意前缀中的份额也接近权重比例
+    first = Counter(owner_id for owner_id, _ in selected[:12])
+    assert abs(first["a"] - 2) <= 1 and abs(first["b"] - 4) <= 1 and abs(first["c"] - 6) <= 1
+    # 同一用户按入队顺序
+    for owner in "abc":
+        items = [item[1] for owner_id, item in selected if owner_id == owner]
+        assert items == sorted(items)
+
+
+def test_priority_first():
+    """高优先级先启动"""
+    queue = DispatchQueue(capacity=10, max_per_owner=10)
+    queue.put("low", "a", priority=0)
+    queue.put("high", "b", priority=5)
+    queue.put("mid", "a", priority=1)
+    assert [item for _, item in _drain(queue, 3)] == ["high", "mid", "low"]
+
+
+def test_idle_owner_no_credit():
+    """空闲的用户重新入队后不会连续占用"""
+    queue = DispatchQueue(capacity=100, max_per_owner=100)
+    for i in range(20):
+        queue.put(i, "busy")
+    _drain(queue, 10)
+    for i in range(10):
+        queue.put(i, "idle")
+    next_ten = Counter(owner_id for owner_id, _ in _drain(queue, 10))
+    assert next_ten == {"busy": 5, "idle": 5}
+
+
+def test_concurrency_limits():
+    """并发上限"""
+    queue = DispatchQueue(capacity=3, max_per_owner=2)
+    for i in range(3):
+        queue.put(i, "a")
+    queue.put("b0", "b")
+    queue.put("b1", "b")
+    started = [queue.get(timeout=0) for _ in range(3)]
+    assert Counter(owner_id for owner_id, _ in started) == {"a": 2, "b": 1}
+    assert queue.get(timeout=0.01) is None  # 全局已满
+    queue.task_done("b")
+    assert queue.get(timeout=0) == ("b", "b1")
+    queue.task_done("b")
+    assert queue.get(timeout=0.01) is None  # a已达单用户上限
+    queue.task_done("a")
+    assert queue.get(timeout=0) == ("a", 2)
+    assert queue.stats()["waiting"] == 0
+    assert queue.stats()["running_by_owner"] == {"a": 2}
+
+
+if __name__ == "__main__":
+    for test in (test_weighted_shares, test_priority_first, test_idle_owner_no_credit, test_concurrency_limits):
+        test()
+        print(f"✅ {test.__doc__}")
+    print("测试完成！")
@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+文件到达触发验证脚本
+用于验证：
+1. 批次键取批次中文件最早的修改时间，与文件到达顺序和批次开始时间无关（集群中各节点得到相同的键）
+2. 批次中的文件都已不存在时没有批次键
+不需要启动后端服务；可直接运行或用pytest执行
+"""
+import os
+import time
+import tempfile
+from datetime import datetime
+
+from utils.file_trigger import FileTriggerConfig, _Batch
+
+
+def _touch(path, mtime_ns):
+    with open(path, "w") as f:
+        f.write("data\n")
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_batch_key():
+    """不同节点形成的同一批次得到相同的键"""
+    with tempfile.TemporaryDirectory() as work_dir:
+        config = FileTriggerConfig(path=work_dir, pattern="*.csv", debounce_seconds=1, batch_seconds=10)
+        base = 1_700_000_000_123_456_789
+        _touch(os.path.join(work_dir, "a.csv"), base + 5_000_000_000)
+        _touch(os.path.join(work_dir, "b.csv"), base)
+
+        first = _Batch(config)
+        first.add("a.csv")
+        first.add("b.csv")
+        time.sleep(0.01)
+        second = _Batch(config)
+        second.add("b.csv")
+        second.add("a.csv")
+
+        assert first.key() == second.key() == datetime.fromtimestamp(1_700_000_000).replace(microsecond=123456)
+        assert first.first_event_at != second.first_event_at
+
+
+def test_batch_key_missing_files():
+    """文件已被取走时没有批次键"""
+    with tempfile.TemporaryDirectory() as work_dir:
+        config = FileTriggerConfig(path=work_dir, pattern="*", debounce_seconds=1, batch_seconds=10)
+        batch = _Batch(config)
+        batch.add("gone.csv")
+        assert batch.key() is None
+
+
+if __name__ == "__main__":
+    for test in (test_batch_key, test_batch_key_missing_files):
+        test()
+        print(f"✅ {test.__doc__}")
+    print("测试完成！")
@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+日志实时跟踪验证脚本
+用于验证：
+1. 读取已结束执行的日志时，按MAX_MESSAGE_BYTES分段的消息不拆开多字节字符
+2. 从共享缓冲区取超长内容时同样在字符边界处分段
+不需要启动后端服务；可直接运行或用pytest执行
+"""
+import os
+import asyncio
+import tempfile
+
+from utils.log_follower import LogFollower, _Watch, MAX_MESSAGE_BYTES
+
+# 没有换行的超长中文行，每条消息都要在字符中间截断
+TEXT = "a" + "中文日志" * (MAX_MESSAGE_BYTES // 4) + "\n结束\n"
+
+
+def _collect(messages):
+    assert all("�" not in message["data"] for message in messages if message["type"] == "log")
+    return "".join(message["data"] for message in messages if message["type"] == "log")
+
+
+def test_read_to_end():
+    """已结束执行的日志分段发送，中文完整"""
+    async def read(log_file):
+        return [message async for message in LogFollower()._read_to_end(log_file, 0)]
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        log_file = os.path.join(work_dir, "execution.log")
+        with open(log_file, "w", encoding="utf-8") as f:
+            f.write(TEXT)
+        messages = asyncio.run(read(log_file))
+    assert len(messages) > 3
+    assert _collect(messages) == TEXT
+    assert messages[-1] == {"type": "end", "offset": len(TEXT.encode("utf-8"))}
+
+
+def test_buffered_from():
+    """从缓冲区分段读取，中文完整且位置连续"""
+    data = TEXT.encode("utf-8")
+    watch = _Watch("execution.log", len(data))
+    watch.append(0, data)
+    messages, offset = [], 0
+    while offset < len(data):
+        chunk = watch.buffered_from(offset)
+        assert 0 < len(chunk) <= MAX_MESSAGE_BYTES
+        messages.append(LogFollower._message(offset, chunk))
+        offset = messages[-1]["next_offset"]
+    assert _collect(messages) == TEXT
+
+
+if __name__ == "__main__":
+    for test in (test_read_to_end, test_buffered_from):
+        test()
+        print(f"✅ {test.__doc__}")
+    print("测试完成！")
@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+日志按行读取验证脚本
+用于验证（未压缩和已压缩的日志结果一致）：
+1. read_tail读取末尾N行，并正确报告前面是否还有内容
+2. read_lines按行偏移索引跨检查点读取指定范围的行
+3. read_page向后、向前翻页的游标首尾相接，逐页翻完得到全部行；字节位置游标对齐到行首
+4. 带过滤条件时达到扫描上限返回继续扫描的游标
+5. 日志追加写入后行偏移索引增量更新
+不需要启动后端服务；可直接运行或用pytest执行
+"""
+import os
+import tempfile
+
+from utils import log_reader, log_storage
+
+LINE_COUNT = 20000
+
+
+def _lines():
+    # 行长不一、包含中文，最后一行没有换行；总大小超过多个压缩块和反向读取块
+    lines = [f"[{i:05d}] {'中文输出' if i % 7 == 0 else 'output'} {'x' * (i % 50)}\n".encode("utf-8")
+             for i in range(1, LINE_COUNT)]
+    lines.append(f"[{LINE_COUNT:05d}] 未换行的最后一行".encode("utf-8"))
+    return lines
+
+
+LINES = _lines()
+DATA = b"".join(LINES)
+
+
+def _each_log(test):
+    """分别在未压缩和已压缩的日志上运行test(log_file)"""
+    for compressed in (False, True):
+        with tempfile.TemporaryDirectory() as work_dir:
+            log_file = os.path.join(work_dir, "execution_1_20260101_000000.log")
+            with open(log_file, "wb") as f:
+                f.write(DATA)
+            if compressed:
+                assert log_storage.compress(log_file)
+                assert log_storage.is_compressed(log_file)
+            test(log_file)
+
+
+def _page_texts(page):
+    return [item["text"].encode("utf-8") for item in page["lines"]]
+
+
+def test_read_tail():
+    """末尾N行"""
+    def check(log_file):
+        data, more = log_reader.read_tail(log_file, 3)
+        assert data == b"".join(LINES[-3:])
+        assert more
+        data, more = log_reader.read_tail(log_file, LINE_COUNT + 10)
+        assert data == DATA
+        assert not more
+        assert log_reader.read_tail(log_file, 0) == (b"", True)
+    _each_log(check)
+
+
+def test_read_lines():
+    """跨检查点读取指定范围的行"""
+    def check(log_file):
+        assert log_reader.count_lines(log_file) == LINE_COUNT
+        start = log_reader.CHECKPOINT_LINES * 3 - 2
+        assert log_reader.read_lines(log_file, start, 10) == LINES[start - 1:start + 9]
+        assert log_reader.read_lines(log_file, 1, 2) == LINES[:2]
+        assert log_reader.read_lines(log_file, LINE_COUNT, 5) == LINES[-1:]
+        assert log_reader.read_lines(log_file, LINE_COUNT + 1, 5) == []
+        assert log_reader.read_lines(log_file, 0, 5) == []
+    _each_log(check)
+
+
+def test_read_page_forward():
+    """向后翻页直到末尾，游标首尾相接"""
+    def check(log_file):
+        texts, cursor, pages = [], None, 0
+        while True:
+            page = log_reader.read_page(log_file, offset=cursor, limit=997)
+            if cursor is not None:
+                assert page["prev_cursor"]["offset"] == cursor
+            texts.extend(_page_texts(page))
+            cursor = page["next_cursor"]["offset"]
+            pages += 1
+            if not page["has_more_after"]:
+                break
+        assert pages == -(-LINE_COUNT // 997)
+        assert texts == [line.rstrip(b"\n") for line in LINES]
+        assert page["next_cursor"] == {"line": LINE_COUNT + 1, "offset": len(DATA)}
+    _each_log(check)
+
+
+def test_read_page_backward():
+    """从末尾向前翻页直到开头，行号连续"""
+    def check(log_file):
+        texts, cursor = [], None
+        while True:
+            page = log_reader.read_page(log_file, offset=cursor, backward=True, limit=1500)
+            numbers = [item["line"] for item in page["lines"]]
+            assert numbers == list(range(numbers[0], numbers[0] + len(numbers)))
+            texts = _page_texts(page) + texts
+            cursor = page["prev_cursor"]["offset"]
+            if not page["has_more_before"]:
+                break
+        assert texts == [line.rstrip(b"\n") for line in LINES]
+        assert page["prev_cursor"] == {"line": 1, "offset": 0}
+    _each_log(check)
+
+
+def test_read_page_cursors():
+    """按行号和字节位置定位"""
+    def check(log_file):
+        page = log_reader.read_page(log_file, from_line=1000, to_line=1004)
+        assert [item["line"] for item in page["lines"]] == [1000, 1001, 1002, 1003, 1004]
+        assert page["lines"][0]["offset"] == len(b"".join(LINES[:999]))
+
+        # 行中间的字节位置对齐到该行开头
+        offset = page["lines"][2]["offset"] + 3
+        page = log_reader.read_page(log_file, offset=offset, limit=1)
+        assert page["lines"][0]["line"] == 1002
+
+        page = log_reader.read_page(log_file, to_line=10, backward=True, limit=3)
+        assert [item["line"] for item in page["lines"]] == [8, 9, 10]
+        assert page["next_cursor"]["line"] == 11
+        assert page["total_lines"] == LINE_COUNT
+    _each_log(check)
+
+
+def test_read_page_grep():
+    """过滤时按扫描上限分段，继续扫描不遗漏"""
+    def check(log_file):
+        expected = [line.rstrip(b"\n") for line in LINES if "中文输出".encode("utf-8") in line]
+        found, cursor = [], 0
+        while True:
+            page = log_reader.read_page(log_file, offset=cursor, grep="中文输出", limit=5000, max_scan_bytes=64 * 1024)
+            found.extend(_page_texts(page))
+            cursor = page["next_cursor"]["offset"]
+            if not page["has_more_after"]:
+                break
+            assert page["scan_limited"] or len(page["lines"]) == 5000
+        assert found == expected
+    _each_log(check)
+
+
+def test_incremental_index():
+    """追加写入后索引只处理新增部分"""
+    with tempfile.TemporaryDirectory() as work_dir:
+        log_file = os.path.join(work_dir, "execution.log")
+        with open(log_file, "wb") as f:
+            f.write(b"".join(LINES[:-1]))
+        assert log_reader.count_lines(log_file) == LINE_COUNT - 1
+        assert os.path.exists(log_reader.sidecar_path(log_file))
+        with open(log_file, "ab") as f:
+            f.write(b"appended\npartial")
+        assert log_reader.count_lines(log_file) == LINE_COUNT + 1
+        assert log_reader.read_lines(log_file, LINE_COUNT, 2) == [b"appended\n", b"partial"]
+
+
+if __name__ == "__main__":
+    for test in (test_read_tail, test_read_lines, test_read_page_forward, test_read_page_backward,
+                 test_read_page_cursors, test_read_page_grep, test_incremental_index):
+        test()
+        print(f"✅ {test.__doc__}")
+    print("测试完成！")
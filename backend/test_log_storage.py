@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+日志压缩存储验证脚本
+用于验证：
+1. compress生成分块压缩文件、删除原文件并保留修改时间，decompress还原出相同内容
+2. CompressedLogReader在任意位置seek后read/readline的结果与原文件一致，包括跨压缩块的行
+3. open_log、logical_size等接口对压缩前后的日志透明
+不需要启动后端服务；可直接运行或用pytest执行
+"""
+import io
+import os
+import random
+import tempfile
+
+from utils import log_storage
+
+# 超过三个压缩块，含跨块的长行和未换行的结尾
+DATA = b"".join(
+    f"[{i:06d}] {'中文' * (i % 13)}{'y' * (i % 97)}\n".encode("utf-8") for i in range(12000)
+) + b"x" * (log_storage.BLOCK_SIZE + 100) + b"\nend without newline"
+
+
+def _compressed(test):
+    with tempfile.TemporaryDirectory() as work_dir:
+        log_file = os.path.join(work_dir, "execution_1_20260101_000000.log")
+        with open(log_file, "wb") as f:
+            f.write(DATA)
+        os.utime(log_file, (1_700_000_000, 1_700_000_000))
+        test(log_file)
+
+
+def test_compress_roundtrip():
+    """压缩后删除原文件，解压还原相同内容"""
+    def check(log_file):
+        original_size, stored = log_storage.compress(log_file)
+        assert original_size == len(DATA)
+        assert stored < original_size
+        assert not os.path.exists(log_file)
+        assert log_storage.is_compressed(log_file)
+        assert log_storage.logical_size(log_file) == len(DATA)
+        assert log_storage.stored_size(log_file) == stored
+        assert os.path.getmtime(log_storage.compressed_path(log_file)) == 1_700_000_000
+        assert log_storage.read_footer(log_storage.compressed_path(log_file))[1] > 3
+
+        with log_storage.open_log(log_file) as f:
+            assert isinstance(f, log_storage.CompressedLogReader)
+            assert log_storage.size_of(f) == len(DATA)
+            assert f.read() == DATA
+
+        log_storage.decompress(log_file)
+        assert not log_storage.is_compressed(log_file)
+        with open(log_file, "rb") as f:
+            assert f.read() == DATA
+    _compressed(check)
+
+
+def test_seek_read():
+    """任意位置seek后读取"""
+    def check(log_file):
+        log_storage.compress(log_file)
+        rng = random.Random(1)
+        with log_storage.open_log(log_file) as f:
+            for _ in range(200):
+                position = rng.randrange(len(DATA))
+                size = rng.choice([1, 100, log_storage.BLOCK_SIZE + 7])
+                assert f.seek(position) == position
+                assert f.read(size) == DATA[position:position + size]
+                assert f.tell() == min(position + size, len(DATA))
+            f.seek(-20, os.SEEK_END)
+            assert f.read() == DATA[-20:]
+            f.seek(10)
+            f.seek(5, os.SEEK_CUR)
+            assert f.read(5) == DATA[15:20]
+            f.seek(len(DATA) + 10)
+            assert f.read(10) == b""
+    _compressed(check)
+
+
+def test_readline():
+    """逐行读取与原文件一致，跨块的行完整"""
+    def check(log_file):
+        log_storage.compress(log_file)
+        expected = io.BytesIO(DATA)
+        with log_storage.open_log(log_file) as f:
+            assert list(iter(f.readline, b"")) == list(iter(expected.readline, b""))
+
+            # 从块边界前开始读取跨块的行
+            position = log_storage.BLOCK_SIZE * 2 - 10
+            f.seek(position)
+            expected.seek(position)
+            assert f.readline() == expected.readline()
+            assert f.readline(5) == expected.readline(5)
+            assert f.readline() == expected.readline()
+    _compressed(check)
+
+
+if __name__ == "__main__":
+    for test in (test_compress_roundtrip, test_seek_read, test_readline):
+        test()
+        print(f"✅ {test.__doc__}")
+    print("测试完成！")
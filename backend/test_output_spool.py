@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+任务输出暂存文件验证脚本
+用于验证：
+1. 子进程输出经暂存文件写入执行日志，运行结束后删除暂存文件
+2. 后端在运行中途退出（管道读端消失）后子进程继续运行，新的读取者从记录的位置继续采集，输出不丢失也不重复
+不需要启动后端服务；可直接运行或用pytest执行
+"""
+import os
+import sys
+import time
+import asyncio
+import tempfile
+import subprocess
+
+from utils import output_spool
+from utils.process_runner import run_process
+from utils.task_logger import LogStream
+
+SCRIPT = "import sys, time\nfor i in range(20):\n    print(f'line {i}', flush=True)\n    time.sleep(0.05)\nprint('done', file=sys.stderr)\n"
+
+
+def _log_lines(log_file, stream_name):
+    with open(log_file, encoding="utf-8") as f:
+        return [line.split(f"[{stream_name}] ", 1)[1].rstrip("\n") for line in f if f"[{stream_name}] " in line]
+
+
+def test_run_process():
+    """输出写入日志，结束后删除暂存文件"""
+    with tempfile.TemporaryDirectory() as work_dir:
+        log_file = os.path.join(work_dir, "execution.log")
+        stream = LogStream(log_file)
+        result = asyncio.run(run_process([sys.executable, "-c", SCRIPT], env=dict(os.environ), cwd=work_dir,
+                                         log_stream=stream, timeout=30))
+        stream.close()
+        assert result.returncode == 0
+        assert _log_lines(log_file, "stdout") == [f"line {i}" for i in range(20)]
+        assert _log_lines(log_file, "stderr") == ["done"]
+        assert not output_spool.exists(log_file)
+        assert not os.path.exists(output_spool.state_path(log_file))
+
+
+def test_resume_after_restart():
+    """读取者中途退出后由新的读取者接续，子进程不受影响"""
+    with tempfile.TemporaryDirectory() as work_dir:
+        log_file = os.path.join(work_dir, "execution.log")
+        stdout_fd, stderr_fd = output_spool.open_for_child(log_file)
+        process = subprocess.Popen([sys.executable, "-c", SCRIPT], stdout=stdout_fd, stderr=stderr_fd)
+        os.close(stdout_fd)
+        os.close(stderr_fd)
+
+        # 第一个后端读取一部分输出后退出，未完成的行留在暂存文件中
+        stream = LogStream(log_file)
+        spool = output_spool.SpoolReader(log_file, stream)
+        time.sleep(0.3)
+        spool.pump()
+        spool.close(remove_files=False)  # 模拟后端退出：不关闭日志流，未完成的行没有写出
+
+        # 重新接管：从记录的位置继续读取到进程结束
+        stream = LogStream(log_file)
+        spool = output_spool.SpoolReader(log_file, stream)
+        while process.poll() is None:
+            spool.pump()
+            time.sleep(0.05)
+        spool.pump()
+        stream.close()
+        spool.close()
+
+        assert process.returncode == 0
+        assert _log_lines(log_file, "stdout") == [f"line {i}" for i in range(20)]
+        assert _log_lines(log_file, "stderr") == ["done"]
+        assert not output_spool.exists(log_file)
+
+
+def test_resume_partial_line():
+    """未写出的未完成行不计入读取位置，接管后完整写出"""
+    with tempfile.TemporaryDirectory() as work_dir:
+        log_file = os.path.join(work_dir, "execution.log")
+        stdout_fd, stderr_fd = output_spool.open_for_child(log_file)
+        os.write(stdout_fd, b"first\nsec")
+        os.close(stdout_fd)
+        os.close(stderr_fd)
+
+        stream = LogStream(log_file)
+        spool = output_spool.SpoolReader(log_file, stream)
+        spool.pump()
+        spool.close(remove_files=False)  # 模拟后端退出：未完成的行没有写出
+        with open(output_spool.spool_path(log_file, "stdout"), "ab") as f:
+            f.write(b"ond\n")
+
+        stream = LogStream(log_file)
+        spool = output_spool.SpoolReader(log_file, stream)
+        spool.pump()
+        stream.close()
+        spool.close()
+        assert _log_lines(log_file, "stdout") == ["first", "second"]
+
+
+if __name__ == "__main__":
+    for test in (test_run_process, test_resume_after_restart, test_resume_partial_line):
+        test()
+        print(f"✅ {test.__doc__}")
+    print("测试完成！")
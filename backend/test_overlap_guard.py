@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+任务重叠执行控制验证脚本
+用于验证：
+1. 扇出父执行及其运行中的子执行只算一个实例
+2. 独立运行的实例数达到max_instances时按重叠策略跳过或排队
+3. 任务暂停时重试和排队的执行保持排队，手动执行不受影响
+使用内存SQLite数据库，不需要启动后端服务；可直接运行或用pytest执行
+"""
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database import Base
+from models import User, Task, TaskExecution, TaskStatus, OverlapPolicy
+from utils import overlap_guard
+
+
+def make_session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    owner = User(username="owner", email="owner@example.com", hashed_password="x")
+    db.add(owner)
+    db.commit()
+    return db, owner
+
+
+def add_task(db, owner, max_instances, overlap_policy=OverlapPolicy.SKIP.value):
+    task = Task(
+        name="fanout", script_path="fanout.py", cron_expression="0 * * * *",
+        fanout_params="a\nb\nc\nd", fanout_concurrency=4,
+        max_instances=max_instances, overlap_policy=overlap_policy, owner_id=owner.id
+    )
+    db.add(task)
+    db.commit()
+    return task
+
+
+def start_fanout(db, task, children=4):
+    """一次扇出触发：父执行和并发运行的子执行"""
+    parent = TaskExecution(task_id=task.id, status=TaskStatus.RUNNING)
+    db.add(parent)
+    db.flush()
+    for i in range(children):
+        db.add(TaskExecution(task_id=task.id, status=TaskStatus.RUNNING,
+                             parent_execution_id=parent.id, params=str(i)))
+    db.commit()
+    return parent
+
+
+def test_fanout_counts_as_one_instance():
+    """扇出父执行及其子执行只占一个实例"""
+    db, owner = make_session()
+    for max_instances in (2, 3, 5):
+        task = add_task(db, owner, max_instances)
+        start_fanout(db, task)
+        assert overlap_guard.overflow_status(db, task) is None, \
+            f"max_instances={max_instances} 时第二次触发应可执行"
+
+
+def test_fanout_instances_reach_limit():
+    """独立的扇出实例数达到上限后按策略处理"""
+    db, owner = make_session()
+    task = add_task(db, owner, 2)
+    start_fanout(db, task)
+    start_fanout(db, task)
+    assert overlap_guard.overflow_status(db, task) == TaskStatus.SKIPPED
+
+    task = add_task(db, owner, 2, OverlapPolicy.QUEUE.value)
+    start_fanout(db, task)
+    start_fanout(db, task)
+    assert overlap_guard.overflow_status(db, task) == TaskStatus.QUEUED
+
+
+def test_exclude_self():
+    """排队的执行重新分发时不把自身计入运行数"""
+    db, owner = make_session()
+    task = add_task(db, owner, 1)
+    parent = start_fanout(db, task)
+    assert overlap_guard.overflow_status(db, task) == TaskStatus.SKIPPED
+    assert overlap_guard.overflow_status(db, task, exclude_id=parent.id) is None
+
+
+def test_held_by_pause():
+    """暂停的任务不启动重试和排队的执行"""
+    db, owner = make_session()
+    task = add_task(db, owner, 1)
+    assert not overlap_guard.held_by_pause(task, "retry")
+    task.is_paused = True
+    assert overlap_guard.held_by_pause(task, "retry")
+    assert overlap_guard.held_by_pause(task, "scheduled", from_queue=True)
+    assert not overlap_guard.held_by_pause(task, "manual")
+    values = overlap_guard.deferred_values(TaskStatus.QUEUED, overlap_guard.REASON_PAUSED)
+    assert values == {"status": TaskStatus.QUEUED, "status_reason": overlap_guard.REASON_PAUSED}
+
+
+if __name__ == "__main__":
+    for test in (test_fanout_counts_as_one_instance, test_fanout_instances_reach_limit, test_exclude_self,
+                 test_held_by_pause):
+        test()
+        print(f"✅ {test.__doc__}")
+    print("测试完成！")
@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+任务失败重试策略验证脚本
+用于验证：
+1. 达到最大尝试次数后不再重试
+2. 配置了可重试的退出码时只重试这些退出码；进程丢失、退出码未知的失败不重试
+3. 重试间隔按退避倍数增长，且不超过上限
+不需要启动后端服务；可直接运行或用pytest执行
+"""
+from types import SimpleNamespace
+
+from utils import retry_policy
+from utils.execution_recovery import REASON_LOST, REASON_EXIT_UNKNOWN
+
+
+def make_task(**fields):
+    values = dict(retry_max_attempts=3, retry_delay_seconds=10, retry_backoff_factor=2, retry_on_exit_codes=None)
+    values.update(fields)
+    return SimpleNamespace(**values)
+
+
+def test_should_retry():
+    """是否重试"""
+    task = make_task()
+    assert retry_policy.should_retry(task, 1, 1)
+    assert retry_policy.should_retry(task, 2, -9)
+    assert not retry_policy.should_retry(task, 3, 1)
+    assert not retry_policy.should_retry(make_task(retry_max_attempts=None), 1, 1)
+    assert not retry_policy.should_retry(task, 1, None, REASON_LOST)
+    assert not retry_policy.should_retry(task, 1, None, REASON_EXIT_UNKNOWN)
+
+    task = make_task(retry_on_exit_codes="2, -9,")
+    assert retry_policy.parse_exit_codes(task.retry_on_exit_codes) == {2, -9}
+    assert retry_policy.should_retry(task, 1, 2)
+    assert retry_policy.should_retry(task, 1, -9)
+    assert not retry_policy.should_retry(task, 1, 1)
+
+
+def test_backoff_seconds():
+    """重试间隔"""
+    task = make_task()
+    assert [retry_policy.backoff_seconds(task, attempt) for attempt in (1, 2, 3)] == [10, 20, 40]
+    assert retry_policy.backoff_seconds(make_task(retry_backoff_factor=None), 3) == 10
+    assert retry_policy.backoff_seconds(make_task(retry_delay_seconds=None), 2) == 0
+    assert retry_policy.backoff_seconds(make_task(retry_backoff_factor=10), 10) == retry_policy.RETRY_MAX_DELAY_SECONDS
+
+
+if __name__ == "__main__":
+    for test in (test_should_retry, test_backoff_seconds):
+        test()
+        print(f"✅ {test.__doc__}")
+    print("测试完成！")
@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+任务依赖验证脚本
+用于验证：
+1. 扇出上游以父执行的汇总结果判断依赖是否满足，子执行不影响
+2. 扇出上游的输出目录取父执行的目录，其中链接到各子执行的输出目录并附有清单
+3. 设置上游时检查依赖环，返回环上的任务
+使用内存SQLite数据库和临时目录，不需要启动后端服务；可直接运行或用pytest执行
+"""
+import os
+import json
+import tempfile
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database import Base
+from models import User, Task, TaskExecution, TaskStatus, TaskDependency
+from utils import task_dependencies, fanout
+
+
+def make_session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    owner = User(username="owner", email="owner@example.com", hashed_password="x")
+    db.add(owner)
+    db.commit()
+    return db, owner
+
+
+def add_task(db, owner, name, **fields):
+    task = Task(name=name, script_path=f"{name}.py", cron_expression="0 * * * *", owner_id=owner.id, **fields)
+    db.add(task)
+    db.commit()
+    return task
+
+
+def finish_fanout(db, task, parent_status, child_statuses, end_time):
+    """一次结束的扇出执行：子执行先结束，父执行汇总后结束"""
+    parent = TaskExecution(task_id=task.id, status=parent_status, end_time=end_time)
+    db.add(parent)
+    db.flush()
+    for i, status in enumerate(child_statuses):
+        db.add(TaskExecution(task_id=task.id, status=status, parent_execution_id=parent.id, params=str(i),
+                             end_time=end_time - timedelta(seconds=len(child_statuses) - i)))
+    db.commit()
+    return parent
+
+
+def make_dependency(db, owner):
+    upstream = add_task(db, owner, "upstream", fanout_params="a\nb", fanout_concurrency=2)
+    downstream = add_task(db, owner, "downstream")
+    db.add(TaskDependency(task_id=downstream.id, upstream_task_id=upstream.id))
+    db.commit()
+    return upstream, downstream
+
+
+def test_fanout_upstream_uses_parent():
+    """扇出上游以父执行结果为准"""
+    db, owner = make_session()
+    upstream, downstream = make_dependency(db, owner)
+    # 子执行在父执行之前结束；部分子执行失败时父执行失败，下游不触发
+    finish_fanout(db, upstream, TaskStatus.FAILED, [TaskStatus.SUCCESS, TaskStatus.FAILED], datetime.now())
+    # 下一次扇出运行中，已结束的子执行不代表上游成功
+    running = TaskExecution(task_id=upstream.id, status=TaskStatus.RUNNING)
+    db.add(running)
+    db.flush()
+    db.add(TaskExecution(task_id=upstream.id, status=TaskStatus.SUCCESS, parent_execution_id=running.id,
+                         params="0", end_time=datetime.now() + timedelta(seconds=5)))
+    db.commit()
+    assert task_dependencies.ready_dependents(db, upstream.id) == []
+    assert task_dependencies.upstream_output_dirs(db, downstream.id) == {}
+
+    parent = finish_fanout(db, upstream, TaskStatus.SUCCESS, [TaskStatus.SUCCESS, TaskStatus.SUCCESS],
+                           datetime.now() + timedelta(seconds=10))
+    assert task_dependencies.ready_dependents(db, upstream.id) == [downstream.id]
+    dirs = task_dependencies.upstream_output_dirs(db, downstream.id)
+    assert dirs[upstream.id].endswith(os.path.join("executions", str(parent.id)))
+
+
+def test_fanout_output_index():
+    """父执行的输出目录链接到子执行的产出"""
+    db, owner = make_session()
+    upstream, _ = make_dependency(db, owner)
+    parent = finish_fanout(db, upstream, TaskStatus.SUCCESS, [TaskStatus.SUCCESS, TaskStatus.SUCCESS], datetime.now())
+    children = db.query(TaskExecution).filter(TaskExecution.parent_execution_id == parent.id).all()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        child_dir = lambda execution_id: os.path.join(work_dir, str(execution_id))
+        os.makedirs(child_dir(children[0].id))
+        with open(os.path.join(child_dir(children[0].id), "result.csv"), "w") as f:
+            f.write("ok\n")
+        parent_dir = os.path.join(work_dir, str(parent.id))
+
+        index_file = fanout.write_output_index(parent_dir, children, child_dir)
+        with open(index_file, encoding="utf-8") as f:
+            entries = json.load(f)
+        assert [entry["execution_id"] for entry in entries] == [child.id for child in children]
+        assert [entry["params"] for entry in entries] == ["0", "1"]
+        assert os.path.isfile(os.path.join(parent_dir, str(children[0].id), "result.csv"))
+        # 没有产出目录的子执行只出现在清单中
+        assert not os.path.lexists(os.path.join(parent_dir, str(children[1].id)))
+
+
+def test_find_cycle():
+    """依赖环检查"""
+    # 1 <- 2 <- 3 <- 4（任务 -> 上游集合），5独立
+    graph = {2: {1}, 3: {2}, 4: {3}}
+    assert task_dependencies.find_cycle(graph, 5, [4, 1]) is None
+    assert task_dependencies.find_cycle(graph, 1, [5]) is None
+    # 让1依赖4：环按依赖方向列出，每个任务依赖前一个任务
+    assert task_dependencies.find_cycle(graph, 1, [4]) == [1, 2, 3, 4, 1]
+    # 依赖自身
+    assert task_dependencies.find_cycle(graph, 3, [3]) == [3, 3]
+    # 菱形依赖不是环
+    diamond = {2: {1}, 3: {1}, 4: {2, 3}}
+    assert task_dependencies.find_cycle(diamond, 5, [4, 2]) is None
+    cycle = task_dependencies.find_cycle(diamond, 1, [4])
+    assert cycle[0] == cycle[-1] == 1 and cycle[1] in (2, 3) and cycle[2] == 4
+    # 经过多个任务回到自身：5依赖4，3改为依赖5
+    assert task_dependencies.find_cycle({**graph, 5: {4}}, 3, [5]) == [3, 4, 5, 3]
+
+
+if __name__ == "__main__":
+    for test in (test_fanout_upstream_uses_parent, test_fanout_output_index, test_find_cycle):
+        test()
+        print(f"✅ {test.__doc__}")
+    print("测试完成！")
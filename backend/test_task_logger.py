@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+执行输出流式写入验证脚本
+用于验证：
+1. 非UTF-8输出（如二进制）的超长未完成行能按STREAM_CHUNK_SIZE截断写出，不会卡死
+2. 超长行在UTF-8字符边界处截断，中文不被拆开
+不需要启动后端服务；可直接运行或用pytest执行
+"""
+import os
+import tempfile
+
+from utils.task_logger import LogStream, STREAM_CHUNK_SIZE
+
+
+def _write(chunks):
+    """依次写入各块输出，返回日志中每行去掉时间戳前缀后的内容"""
+    with tempfile.TemporaryDirectory() as work_dir:
+        log_file = os.path.join(work_dir, "execution.log")
+        stream = LogStream(log_file)
+        for chunk in chunks:
+            stream.write_chunk("stdout", chunk)
+        stream.close()
+        with open(log_file, "rb") as f:
+            data = f.read()
+    text = data.decode("utf-8")  # 日志始终是合法UTF-8
+    return [line.split("[stdout] ", 1)[1] for line in text.split("\n")[:-1]]
+
+
+def test_binary_output():
+    """非UTF-8的超长行按STREAM_CHUNK_SIZE截断"""
+    lines = _write([b"\x80" * 70 * 1024])
+    assert len(lines) == 2
+    assert lines[0] == "�" * STREAM_CHUNK_SIZE
+    assert lines[1] == "�" * (70 * 1024 - STREAM_CHUNK_SIZE)
+
+
+def test_random_bytes():
+    """任意字节输出都能写完"""
+    data = bytes(range(256)) * 1024
+    lines = _write([data[i:i + 5000] for i in range(0, len(data), 5000)])
+    assert lines
+
+
+def test_utf8_boundary():
+    """超长行在字符边界处截断，中文字符完整"""
+    line = "a" + "中" * STREAM_CHUNK_SIZE
+    lines = _write([line.encode("utf-8")])
+    assert "".join(lines) == line
+    assert "�" not in "".join(lines)
+    assert all(len(text.encode("utf-8")) <= STREAM_CHUNK_SIZE for text in lines)
+
+
+def test_pending_across_chunks():
+    """跨块的未完成行合并为一行"""
+    assert _write([b"hello ", "世".encode("utf-8")[:2], "世".encode("utf-8")[2:] + b"\nnext"]) == ["hello 世", "next"]
+
+
+if __name__ == "__main__":
+    for test in (test_binary_output, test_random_bytes, test_utf8_boundary, test_pending_across_chunks):
+        test()
+        print(f"✅ {test.__doc__}")
+    print("测试完成！")
@@ -5,6 +5,7 @@
 """
 from sqlalchemy import text, inspect
 from database import engine
+from models import TaskStatus
 import logging
 
 logger = logging.getLogger(__name__)
@@ -40,6 +41,59 @@ def check_and_add_column(table_name: str, column_name: str, column_definition: s
         raise
 
 
+def check_and_extend_enum(table_name: str, column_name: str, enum_class):
+    """检查并补充MySQL ENUM列缺失的取值
+    
+    SQLAlchemy的Enum列在MySQL中按枚举成员名创建为ENUM类型，新增成员后需要修改列定义
+    
+    Args:
+        table_name: 表名
+        column_name: 列名
+        enum_class: Python枚举类
+    """
+    if engine.dialect.name != "mysql":
+        return False
+    
+    inspector = inspect(engine)
+    column = next((col for col in inspector.get_columns(table_name) if col['name'] == column_name), None)
+    if column is None:
+        return False
+    
+    existing = set(getattr(column['type'], 'enums', None) or [])
+    wanted = [member.name for member in enum_class]
+    if set(wanted) <= existing:
+        logger.debug(f"枚举取值已是最新: {table_name}.{column_name}")
+        return False
+    
+    values = ", ".join(f"'{value}'" for value in wanted + sorted(existing - set(wanted)))
+    nullable = "NULL" if column.get('nullable', True) else "NOT NULL"
+    with engine.connect() as conn:
+        conn.execute(text(f"ALTER TABLE {table_name} MODIFY COLUMN {column_name} ENUM({values}) {nullable}"))
+        conn.commit()
+    logger.info(f"✅ 已更新枚举取值: {table_name}.{column_name}")
+    return True
+
+
+def check_and_add_index(table_name: str, index_name: str, columns: list):
+    """检查并添加缺失的索引
+    
+    Args:
+        table_name: 表名
+        index_name: 索引名
+        columns: 索引列
+    """
+    inspector = inspect(engine)
+    if index_name in [index['name'] for index in inspector.get_indexes(table_name)]:
+        logger.debug(f"索引已存在: {table_name}.{index_name}")
+        return False
+    
+    with engine.connect() as conn:
+        conn.execute(text(f"CREATE INDEX {index_name} ON {table_name} ({', '.join(columns)})"))
+        conn.commit()
+    logger.info(f"✅ 已添加索引: {table_name}.{index_name}")
+    return True
+
+
 def upgrade_database():
     """执行所有数据库升级"""
     logger.info("🔄 开始检查数据库结构...")
@@ -47,6 +101,59 @@ def upgrade_database():
     migrations = [
         # 格式: (表名, 列名, 列定义, 插入位置AFTER)
         ("users", "can_manage_packages", "BOOLEAN NOT NULL DEFAULT FALSE", "is_active"),
+        ("users", "share_weight", "INT NOT NULL DEFAULT 1", "can_manage_packages"),
+        ("tasks", "misfire_policy", "VARCHAR(20) NOT NULL DEFAULT 'coalesce'", "cron_expression"),
+        ("tasks", "interval_seconds", "INT NULL", "cron_expression"),
+        ("tasks", "priority", "INT NOT NULL DEFAULT 5", "misfire_policy"),
+        ("tasks", "jitter_seconds", "INT NULL", "priority"),
+        ("tasks", "overlap_policy", "VARCHAR(20) NOT NULL DEFAULT 'skip'", "jitter_seconds"),
+        ("tasks", "max_instances", "INT NOT NULL DEFAULT 1", "overlap_policy"),
+        ("tasks", "timeout_seconds", "INT NULL", "max_instances"),
+        ("tasks", "memory_limit_mb", "INT NULL", "timeout_seconds"),
+        ("tasks", "cpu_limit_seconds", "INT NULL", "memory_limit_mb"),
+        ("tasks", "nice_level", "INT NULL", "cpu_limit_seconds"),
+        ("tasks", "ionice_class", "VARCHAR(20) NULL", "nice_level"),
+        ("tasks", "max_open_files", "INT NULL", "ionice_class"),
+        ("tasks", "retry_max_attempts", "INT NOT NULL DEFAULT 1", "max_open_files"),
+        ("tasks", "retry_delay_seconds", "INT NOT NULL DEFAULT 60", "retry_max_attempts"),
+        ("tasks", "retry_backoff_factor", "FLOAT NOT NULL DEFAULT 2", "retry_delay_seconds"),
+        ("tasks", "retry_on_exit_codes", "VARCHAR(100) NULL", "retry_backoff_factor"),
+        ("tasks", "dependency_fired_at", "DATETIME NULL", "retry_on_exit_codes"),
+        ("tasks", "fanout_params", "TEXT NULL", "dependency_fired_at"),
+        ("tasks", "fanout_params_file", "VARCHAR(255) NULL", "fanout_params"),
+        ("tasks", "fanout_concurrency", "INT NOT NULL DEFAULT 4", "fanout_params_file"),
+        ("tasks", "cache_enabled", "BOOLEAN NOT NULL DEFAULT FALSE", "fanout_concurrency"),
+        ("tasks", "cache_link_outputs", "BOOLEAN NOT NULL DEFAULT FALSE", "cache_enabled"),
+        ("tasks", "file_trigger_enabled", "BOOLEAN NOT NULL DEFAULT FALSE", "cache_link_outputs"),
+        ("tasks", "file_trigger_path", "VARCHAR(255) NULL", "file_trigger_enabled"),
+        ("tasks", "file_trigger_pattern", "VARCHAR(100) NULL", "file_trigger_path"),
+        ("tasks", "file_trigger_debounce_seconds", "INT NOT NULL DEFAULT 5", "file_trigger_pattern"),
+        ("tasks", "file_trigger_batch_seconds", "INT NOT NULL DEFAULT 60", "file_trigger_debounce_seconds"),
+        ("tasks", "is_paused", "BOOLEAN NOT NULL DEFAULT FALSE", "is_active"),
+        ("task_executions", "scheduled_time", "DATETIME NULL", "trigger_type"),
+        ("task_executions", "retry_of_id", "INT NULL", "scheduled_time"),
+        ("task_executions", "attempt", "INT NOT NULL DEFAULT 1", "retry_of_id"),
+        ("task_executions", "upstream_execution_id", "INT NULL", "attempt"),
+        ("task_executions", "parent_execution_id", "INT NULL", "upstream_execution_id"),
+        ("task_executions", "params", "TEXT NULL", "parent_execution_id"),
+        ("task_executions", "summary", "TEXT NULL", "output_files"),
+        ("task_executions", "fingerprint", "VARCHAR(64) NULL", "summary"),
+        ("task_executions", "trigger_event_at", "DATETIME NULL", "fingerprint"),
+        ("task_executions", "trigger_files", "TEXT NULL", "trigger_event_at"),
+        ("task_executions", "event_latency_ms", "INT NULL", "trigger_files"),
+        ("task_executions", "trace", "TEXT NULL", "event_latency_ms"),
+        ("task_executions", "node_id", "VARCHAR(100) NULL", "output_files"),
+        ("task_executions", "pid", "INT NULL", "node_id"),
+        ("task_executions", "pgid", "INT NULL", "pid"),
+        ("task_executions", "queue_wait_ms", "INT NULL", "pgid"),
+        ("task_executions", "cpu_user_seconds", "FLOAT NULL", "queue_wait_ms"),
+        ("task_executions", "cpu_system_seconds", "FLOAT NULL", "cpu_user_seconds"),
+        ("task_executions", "max_rss_kb", "INT NULL", "cpu_system_seconds"),
+        ("task_executions", "io_read_bytes", "BIGINT NULL", "max_rss_kb"),
+        ("task_executions", "io_write_bytes", "BIGINT NULL", "io_read_bytes"),
+        ("task_executions", "ctx_switches_voluntary", "INT NULL", "io_write_bytes"),
+        ("task_executions", "ctx_switches_involuntary", "INT NULL", "ctx_switches_voluntary"),
+        ("task_executions", "status_reason", "VARCHAR(50) NULL", "status"),
     ]
     
     upgraded_count = 0
@@ -62,6 +169,37 @@ def upgrade_database():
             # 继续执行其他迁移
             continue
     
+    # 枚举列新增取值
+    enum_migrations = [
+        # 格式: (表名, 列名, 枚举类)
+        ("tasks", "status", TaskStatus),
+        ("task_executions", "status", TaskStatus),
+    ]
+    
+    for table_name, column_name, enum_class in enum_migrations:
+        try:
+            if check_and_extend_enum(table_name, column_name, enum_class):
+                upgraded_count += 1
+        except Exception as e:
+            logger.error(f"迁移失败: {table_name}.{column_name} - {e}")
+            continue
+    
+    # 新增索引
+    index_migrations = [
+        # 格式: (表名, 索引名, 索引列)
+        ("task_executions", "ix_task_executions_status_task", ["status", "task_id"]),
+        ("task_executions", "ix_task_executions_retry_of_id", ["retry_of_id"]),
+        ("task_executions", "ix_task_executions_parent_execution_id", ["parent_execution_id"]),
+    ]
+    
+    for table_name, index_name, columns in index_migrations:
+        try:
+            if check_and_add_index(table_name, index_name, columns):
+                upgraded_count += 1
+        except Exception as e:
+            logger.error(f"迁移失败: {table_name}.{index_name} - {e}")
+            continue
+    
     if upgraded_count > 0:
         logger.info(f"✅ 数据库升级完成，共升级 {upgraded_count} 个字段")
     else:
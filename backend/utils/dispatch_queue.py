@@ -0,0 +1,144 @@
+"""
+任务分发队列
+位于调度触发与进程启动之间：按任务优先级和用户加权公平份额决定下一个启动的执行，
+同时限制全局与单个用户的并发执行数
+"""
+import heapq
+import itertools
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class DispatchQueue:
+    """带优先级和加权公平份额的分发队列
+
+    - 优先级高的执行总是先于优先级低的执行启动
+    - 同一优先级内，各用户按权重轮流启动：每启动一个执行，用户的虚拟时间增加 1/权重，
+      虚拟时间最小的用户先启动（stride调度），权重为2的用户获得两倍的启动份额
+    - 同一用户同一优先级的执行按入队顺序启动
+    """
+
+    def __init__(self, capacity: int, max_per_owner: int):
+        """
+        初始化分发队列
+
+        Args:
+            capacity: 全局最大并发执行数
+            max_per_owner: 单个用户最大并发执行数
+        """
+        self.capacity = capacity
+        self.max_per_owner = max_per_owner
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        # priority -> owner_id -> [(seq, item), ...] 堆
+        self._pending: Dict[int, Dict[Any, List[Tuple[int, Any]]]] = defaultdict(dict)
+        self._weights: Dict[Any, float] = {}
+        self._vtime: Dict[Any, float] = defaultdict(float)
+        self._clock = 0.0  # 全局虚拟时钟：最近一次启动的虚拟时间
+        self._running: Dict[Any, int] = defaultdict(int)
+        self._total_running = 0
+        self._size = 0
+
+    def put(self, item: Any, owner_id: Any, priority: int = 0, weight: float = 1):
+        """
+        加入队列
+
+        Args:
+            item: 执行请求
+            owner_id: 任务所有者ID
+            priority: 优先级，数值越大越先启动
+            weight: 用户权重
+        """
+        with self._cond:
+            owner_queues = self._pending[priority]
+            if not self._has_pending(owner_id):
+                # 空闲后重新入队的用户从当前虚拟时钟开始，不能积攒份额
+                self._vtime[owner_id] = max(self._vtime[owner_id], self._clock)
+            self._weights[owner_id] = max(weight or 1, 0.01)
+            heapq.heappush(owner_queues.setdefault(owner_id, []), (next(self._seq), item))
+            self._size += 1
+            self._cond.notify()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Tuple[Any, Any]]:
+        """
+        取出下一个可以启动的执行，并计入运行数
+
+        Args:
+            timeout: 最长等待时间（秒），为空时一直等待
+
+        Returns:
+            (owner_id, item)，超时返回None
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                selected = self._select()
+                if selected is not None:
+                    return selected
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+
+    def task_done(self, owner_id: Any):
+        """一个执行结束，释放并发名额"""
+        with self._cond:
+            self._running[owner_id] -= 1
+            if self._running[owner_id] <= 0:
+                del self._running[owner_id]
+            self._total_running -= 1
+            self._cond.notify_all()
+
+    def _has_pending(self, owner_id: Any) -> bool:
+        return any(owner_id in owner_queues for owner_queues in self._pending.values())
+
+    def _select(self) -> Optional[Tuple[Any, Any]]:
+        if self._total_running >= self.capacity:
+            return None
+
+        for priority in sorted(self._pending, reverse=True):
+            owner_queues = self._pending[priority]
+            eligible = [
+                owner_id for owner_id in owner_queues
+                if self._running.get(owner_id, 0) < self.max_per_owner
+            ]
+            if not eligible:
+                continue
+
+            owner_id = min(eligible, key=lambda o: (self._vtime[o], owner_queues[o][0][0]))
+            _, item = heapq.heappop(owner_queues[owner_id])
+            if not owner_queues[owner_id]:
+                del owner_queues[owner_id]
+            if not owner_queues:
+                del self._pending[priority]
+
+            self._clock = self._vtime[owner_id]
+            self._vtime[owner_id] += 1 / self._weights[owner_id]
+            self._running[owner_id] += 1
+            self._total_running += 1
+            self._size -= 1
+            return owner_id, item
+        return None
+
+    def wake(self):
+        """唤醒等待中的get（用于停止）"""
+        with self._cond:
+            self._cond.notify_all()
+
+    def stats(self) -> dict:
+        """获取队列状态"""
+        with self._cond:
+            waiting_by_owner = defaultdict(int)
+            for owner_queues in self._pending.values():
+                for owner_id, items in owner_queues.items():
+                    waiting_by_owner[owner_id] += len(items)
+            return {
+                "waiting": self._size,
+                "running": self._total_running,
+                "capacity": self.capacity,
+                "max_per_owner": self.max_per_owner,
+                "waiting_by_owner": dict(waiting_by_owner),
+                "running_by_owner": dict(self._running),
+            }
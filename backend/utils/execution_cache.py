@@ -0,0 +1,157 @@
+"""
+执行结果缓存（输入未变化时跳过执行）
+对脚本文件、脚本参数和输入目录计算指纹，与最近一次成功执行的指纹相同时不再启动进程；
+文件大小和修改时间未变时复用上次的内容哈希，变化时重新计算内容哈希
+"""
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+import logging
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from models import TaskExecution, TaskStatus
+
+logger = logging.getLogger(__name__)
+
+# 命中缓存跳过执行时的status_reason
+REASON_CACHE_HIT = "cache_hit"
+
+# 文件哈希清单（位于任务数据目录，不在输入目录中，避免影响指纹）
+MANIFEST_FILENAME = ".fingerprint_manifest.json"
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# 参与指纹计算的任务字段
+FINGERPRINT_FIELDS = ("script_path", "script_params", "fanout_params", "fanout_params_file")
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class _HashCache:
+    """按 (大小, 修改时间) 复用上次计算的文件内容哈希"""
+
+    def __init__(self, manifest_path: str):
+        self.manifest_path = manifest_path
+        self.previous = {}
+        self.current = {}
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                self.previous = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+    def sha256(self, path: str) -> str:
+        stat = os.stat(path)
+        entry = self.previous.get(path)
+        if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            sha = entry["sha256"]
+        else:
+            sha = _file_sha256(path)
+        self.current[path] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": sha}
+        return sha
+
+    def save(self):
+        if self.current == self.previous:
+            return
+        # 同一任务的多个实例可能同时保存，各自使用独立的临时文件
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(
+                dir=os.path.dirname(self.manifest_path) or ".",
+                prefix=os.path.basename(self.manifest_path) + ".", suffix=".tmp"
+            )
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(self.current, f)
+            os.replace(tmp_path, self.manifest_path)
+        except OSError as e:
+            logger.warning(f"保存文件哈希清单失败: {e}")
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+def compute_fingerprint(task, input_dir: str, manifest_path: str) -> str:
+    """
+    计算任务本次执行的输入指纹
+
+    Args:
+        task: 任务（使用script_path、script_params和扇出参数）
+        input_dir: 任务输入目录
+        manifest_path: 文件哈希清单路径
+
+    Returns:
+        sha256十六进制字符串
+    """
+    hashes = _HashCache(manifest_path)
+    script_path = os.path.abspath(task.script_path)
+    inputs = []
+    if os.path.isdir(input_dir):
+        for root, dirs, files in os.walk(input_dir):
+            dirs.sort()
+            for filename in sorted(files):
+                path = os.path.join(root, filename)
+                if os.path.isfile(path):
+                    inputs.append([os.path.relpath(path, input_dir), hashes.sha256(path)])
+
+    payload = {
+        "script": hashes.sha256(script_path),
+        "script_params": task.script_params or "",
+        "fanout_params": task.fanout_params or "",
+        "fanout_params_file": task.fanout_params_file or "",
+        "inputs": inputs,
+    }
+    hashes.save()
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def fingerprint_source(task) -> tuple:
+    """任务中参与指纹计算的字段值，用于判断计算指纹后任务配置是否已变化"""
+    return tuple(getattr(task, field) for field in FINGERPRINT_FIELDS)
+
+
+def find_cache_hit(db: Session, task_id: int, fingerprint: str) -> Optional[TaskExecution]:
+    """最近一次成功执行的指纹与本次相同时返回该执行"""
+    last_success = db.query(TaskExecution).filter(
+        TaskExecution.task_id == task_id,
+        TaskExecution.status == TaskStatus.SUCCESS,
+        TaskExecution.parent_execution_id.is_(None)
+    ).order_by(TaskExecution.id.desc()).first()
+    if last_success and last_success.fingerprint == fingerprint:
+        return last_success
+    return None
+
+
+def link_outputs(source_dir: str, target_dir: str) -> int:
+    """
+    将上次执行的产出文件硬链接到本次的输出目录，跨文件系统时复制
+
+    Returns:
+        链接的文件数
+    """
+    count = 0
+    if not os.path.isdir(source_dir):
+        return count
+    for root, _, files in os.walk(source_dir):
+        target_root = os.path.join(target_dir, os.path.relpath(root, source_dir))
+        os.makedirs(target_root, exist_ok=True)
+        for filename in files:
+            source = os.path.join(root, filename)
+            target = os.path.join(target_root, filename)
+            try:
+                os.link(source, target)
+            except OSError:
+                shutil.copy2(source, target)
+            count += 1
+    return count
@@ -9,6 +9,8 @@ import os
 from datetime import datetime
 from typing import Optional
 
+from utils import log_reader
+
 # 执行日志根目录
 # __file__ = /app/utils/execution_log.py
 # dirname 2次得到 /app，再拼接 logs/execution
@@ -58,6 +60,18 @@ def save_execution_log(audit_log_id: int, script_name: str, trigger_type: str, c
     return f"logs/execution/{filename}"
 
 
+def get_execution_log_path(relative_path: str) -> str:
+    """
+    执行日志的完整路径
+    
+    Args:
+        relative_path: 相对路径，如 logs/execution/xxx.log
+    """
+    # __file__ = /app/utils/execution_log.py, dirname 2次得到 /app
+    base_dir = os.path.dirname(os.path.dirname(__file__))
+    return os.path.join(base_dir, relative_path)
+
+
 def read_execution_log(relative_path: str) -> Optional[str]:
     """
     读取执行日志
@@ -68,10 +82,7 @@ def read_execution_log(relative_path: str) -> Optional[str]:
     Returns:
         日志内容，如果文件不存在返回None
     """
-    # 构建完整路径
-    # __file__ = /app/utils/execution_log.py, dirname 2次得到 /app
-    base_dir = os.path.dirname(os.path.dirname(__file__))
-    filepath = os.path.join(base_dir, relative_path)
+    filepath = get_execution_log_path(relative_path)
     
     if not os.path.exists(filepath):
         return None
@@ -93,13 +104,12 @@ def delete_execution_log(relative_path: str) -> bool:
     Returns:
         是否成功删除
     """
-    # __file__ = /app/utils/execution_log.py, dirname 2次得到 /app
-    base_dir = os.path.dirname(os.path.dirname(__file__))
-    filepath = os.path.join(base_dir, relative_path)
+    filepath = get_execution_log_path(relative_path)
     
     if os.path.exists(filepath):
         try:
             os.remove(filepath)
+            log_reader.remove_sidecar(filepath)
             return True
         except Exception:
             return False
@@ -0,0 +1,70 @@
+"""
+后端重启后的执行记录恢复
+检查遗留为RUNNING的执行记录对应的进程是否仍在运行，用于重新接管或标记为失败
+"""
+import os
+import signal
+import socket
+import logging
+from datetime import datetime
+from typing import Optional
+
+import psutil
+
+logger = logging.getLogger(__name__)
+
+# 进程创建时间与执行记录开始时间允许的最大差值（秒），用于排除PID复用
+PROCESS_START_TOLERANCE_SECONDS = 60
+
+# 恢复时写入TaskExecution.status_reason的原因
+REASON_LOST = "lost_on_restart"  # 重启后进程已不存在
+REASON_EXIT_UNKNOWN = "exit_unknown"  # 重新接管的进程已结束，无法获取退出码
+
+
+def is_local_node(node_id: Optional[str], local_node_id: str) -> bool:
+    """判断执行记录是否由本机上的节点启动（默认节点标识为 主机名-进程号）"""
+    if not node_id:
+        return True
+    return node_id == local_node_id or node_id.startswith(f"{socket.gethostname()}-")
+
+
+def process_matches(pid: Optional[int], pgid: Optional[int], start_time: datetime) -> bool:
+    """
+    判断PID对应的进程是否仍是当初启动的任务进程
+
+    Args:
+        pid: 记录的进程ID
+        pgid: 记录的进程组ID
+        start_time: 执行记录的开始时间（本地时间）
+    """
+    if not pid:
+        return False
+    try:
+        process = psutil.Process(pid)
+        if process.status() == psutil.STATUS_ZOMBIE:
+            return False
+        if pgid and os.getpgid(pid) != pgid:
+            return False
+        return abs(process.create_time() - start_time.timestamp()) <= PROCESS_START_TOLERANCE_SECONDS
+    except (psutil.Error, ProcessLookupError):
+        return False
+
+
+def group_alive(pgid: Optional[int]) -> bool:
+    """进程组中是否还有存活的进程"""
+    if not pgid:
+        return False
+    try:
+        os.killpg(pgid, 0)
+        return True
+    except (ProcessLookupError, PermissionError):
+        return False
+
+
+def kill_group(pgid: int):
+    """结束遗留的进程组"""
+    try:
+        os.killpg(pgid, signal.SIGKILL)
+        logger.warning(f"已结束遗留的进程组 {pgid}")
+    except ProcessLookupError:
+        pass
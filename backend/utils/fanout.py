@@ -0,0 +1,140 @@
+"""
+参数化扇出执行
+一次触发按参数列表展开为多个子执行，子执行在任务的扇出并发数内并行，结果汇总到父执行
+"""
+import os
+import json
+import shlex
+from typing import List
+
+from config import settings
+
+# 子执行排队等待启动时的status_reason
+REASON_FANOUT = "fanout"
+
+
+def is_fanout(task) -> bool:
+    """任务是否配置了扇出参数"""
+    return bool((task.fanout_params or "").strip() or task.fanout_params_file)
+
+
+def _parse_lines(text: str) -> List[str]:
+    """每行一组参数，忽略空行和#开头的注释行"""
+    return [
+        line.strip() for line in text.splitlines()
+        if line.strip() and not line.strip().startswith("#")
+    ]
+
+
+def _parse_json(text: str) -> List[str]:
+    """JSON数组，元素为参数字符串或参数列表"""
+    items = json.loads(text)
+    if not isinstance(items, list):
+        raise ValueError("扇出参数文件必须是JSON数组")
+    param_sets = []
+    for item in items:
+        if isinstance(item, list):
+            param_sets.append(shlex.join(str(arg) for arg in item))
+        else:
+            param_sets.append(str(item))
+    return param_sets
+
+
+def expand_param_sets(task, input_dir: str) -> List[str]:
+    """
+    展开任务的扇出参数
+
+    Args:
+        task: 任务（fanout_params为每行一组参数；fanout_params_file为INPUT_DIR下的文件，
+              .json文件为JSON数组，其他文件每行一组参数）
+        input_dir: 任务输入目录
+
+    Returns:
+        参数字符串列表，每个元素对应一个子执行
+
+    Raises:
+        ValueError: 参数文件不存在或格式错误、参数为空或超过上限
+    """
+    param_sets = _parse_lines(task.fanout_params or "")
+
+    if task.fanout_params_file:
+        base = os.path.realpath(input_dir)
+        path = os.path.realpath(os.path.join(base, task.fanout_params_file))
+        if not path.startswith(base + os.sep):
+            raise ValueError(f"扇出参数文件必须位于输入目录中: {task.fanout_params_file}")
+        if not os.path.isfile(path):
+            raise ValueError(f"扇出参数文件不存在: {task.fanout_params_file}")
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+        try:
+            param_sets += _parse_json(text) if path.endswith(".json") else _parse_lines(text)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"扇出参数文件格式错误: {e}")
+
+    if not param_sets:
+        raise ValueError("扇出参数为空")
+    if len(param_sets) > settings.FANOUT_MAX_CHILDREN:
+        raise ValueError(f"扇出参数共 {len(param_sets)} 组，超过上限 {settings.FANOUT_MAX_CHILDREN}")
+    return param_sets
+
+
+def summarize(children) -> dict:
+    """
+    汇总子执行结果
+
+    Args:
+        children: 子执行记录（需有id/status/exit_code属性）
+
+    Returns:
+        汇总字典（写入父执行的summary字段）
+    """
+    counts = {}
+    failed_ids = []
+    for child in children:
+        status = child.status.value if hasattr(child.status, "value") else child.status
+        counts[status] = counts.get(status, 0) + 1
+        if status == "failed":
+            failed_ids.append(child.id)
+    return {
+        "total": len(children),
+        "success": counts.get("success", 0),
+        "failed": counts.get("failed", 0),
+        "skipped": counts.get("skipped", 0),
+        "failed_execution_ids": failed_ids,
+    }
+
+
+def write_output_index(output_dir: str, children, child_output_dir) -> str:
+    """
+    在父执行的输出目录中汇总子执行的产出，供下游任务通过UPSTREAM_OUTPUT_DIR读取
+
+    父执行本身不运行脚本，输出目录中只有：
+        <子执行ID>: 指向该子执行输出目录的符号链接（子执行没有产出目录时不创建）
+        fanout.json: 子执行清单 [{"execution_id", "params", "status", "output_dir"}, ...]，按子执行ID排序
+
+    Args:
+        output_dir: 父执行的输出目录
+        children: 子执行记录（需有id/params/status属性）
+        child_output_dir: 以子执行ID返回其输出目录的函数
+
+    Returns:
+        清单文件路径
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    entries = []
+    for child in sorted(children, key=lambda child: child.id):
+        target = child_output_dir(child.id)
+        entries.append({
+            "execution_id": child.id,
+            "params": child.params,
+            "status": child.status.value if hasattr(child.status, "value") else child.status,
+            "output_dir": target,
+        })
+        link = os.path.join(output_dir, str(child.id))
+        if os.path.isdir(target) and not os.path.lexists(link):
+            os.symlink(target, link, target_is_directory=True)
+
+    index_file = os.path.join(output_dir, "fanout.json")
+    with open(index_file, "w", encoding="utf-8") as f:
+        json.dump(entries, f, ensure_ascii=False, indent=2)
+    return index_file
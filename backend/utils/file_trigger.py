@@ -0,0 +1,203 @@
+"""
+文件到达触发
+用inotify监听任务的输入目录或工作区目录，文件写入完成（close_write）或移入（moved_to）后，
+按防抖窗口（最后一个文件到达后安静一段时间）和批量窗口（第一个文件到达后最长等待时间）
+合并为一次触发；等待期间阻塞在inotify文件描述符上，不轮询文件系统
+"""
+import os
+import time
+import fnmatch
+import logging
+import selectors
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from utils import inotify
+
+logger = logging.getLogger(__name__)
+
+# 监听的事件：文件写入完成或移入目录
+WATCH_MASK = inotify.IN_CLOSE_WRITE | inotify.IN_MOVED_TO | inotify.IN_ONLYDIR
+
+# 单次触发最多记录的文件数
+MAX_BATCH_FILES = 1000
+
+
+class FileTriggerConfig(NamedTuple):
+    path: str  # 监听的目录
+    pattern: str  # 文件名通配符
+    debounce_seconds: float  # 最后一个文件到达后等待的安静时间
+    batch_seconds: float  # 第一个文件到达后最长等待时间
+
+
+class _Batch:
+    """一个任务尚未触发的文件批次"""
+
+    def __init__(self, config: FileTriggerConfig):
+        self.config = config
+        self.first = time.monotonic()
+        self.last = self.first
+        self.first_event_at = datetime.now()
+        self.files: List[str] = []
+
+    def add(self, filename: str):
+        self.last = time.monotonic()
+        if filename not in self.files and len(self.files) < MAX_BATCH_FILES:
+            self.files.append(filename)
+
+    @property
+    def deadline(self) -> float:
+        return min(self.last + self.config.debounce_seconds, self.first + self.config.batch_seconds)
+
+    def key(self) -> Optional[datetime]:
+        """
+        批次的去重键：批次中文件最早的修改时间（微秒精度）
+
+        集群中各节点监听同一目录、各自形成批次；修改时间是文件本身的属性，各节点得到相同的值，
+        用作触发租约的时间，同一批文件只触发一次。文件都已不存在（如已被其他节点的执行取走）时返回None
+        """
+        mtimes = []
+        for name in self.files:
+            try:
+                mtimes.append(os.stat(os.path.join(self.config.path, name)).st_mtime_ns)
+            except OSError:
+                pass
+        if not mtimes:
+            return None
+        earliest = min(mtimes)
+        return datetime.fromtimestamp(earliest // 10**9) + timedelta(microseconds=earliest // 1000 % 10**6)
+
+
+class FileTriggerWatcher:
+    """监听各任务的目录，批次结束时回调 on_batch(task_id, files, first_event_at, batch_key)"""
+
+    def __init__(self, on_batch: Callable[[int, List[str], datetime, Optional[datetime]], None]):
+        self.on_batch = on_batch
+        self._lock = threading.Lock()
+        self._inotify = inotify.Inotify()
+        self._wake_r, self._wake_w = os.pipe()
+        self._thread = None
+        self._stopping = False
+        self._configs: Dict[int, FileTriggerConfig] = {}  # task_id -> 配置
+        self._wds: Dict[str, int] = {}  # 目录 -> watch描述符
+        self._paths: Dict[int, str] = {}  # watch描述符 -> 目录
+        self._pending: Dict[int, _Batch] = {}  # task_id -> 等待触发的批次
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, name="task-file-trigger", daemon=True)
+        self._thread.start()
+
+    def watch(self, task_id: int, config: FileTriggerConfig):
+        """添加或更新任务的监听"""
+        with self._lock:
+            if self._configs.get(task_id) == config:
+                return
+            self._unwatch_locked(task_id)
+            if config.path not in self._wds:
+                try:
+                    wd = self._inotify.add_watch(config.path, WATCH_MASK)
+                except OSError as e:
+                    logger.error(f"监听任务 {task_id} 的目录 {config.path} 失败: {e}")
+                    return
+                self._wds[config.path] = wd
+                self._paths[wd] = config.path
+            self._configs[task_id] = config
+        logger.info(f"任务 {task_id} 开始监听目录 {config.path}（{config.pattern}）")
+
+    def unwatch(self, task_id: int):
+        """取消任务的监听"""
+        with self._lock:
+            self._unwatch_locked(task_id)
+
+    def watched_tasks(self) -> List[int]:
+        with self._lock:
+            return list(self._configs)
+
+    def _unwatch_locked(self, task_id: int):
+        config = self._configs.pop(task_id, None)
+        self._pending.pop(task_id, None)
+        if config is None:
+            return
+        if not any(other.path == config.path for other in self._configs.values()):
+            wd = self._wds.pop(config.path, None)
+            if wd is not None:
+                self._paths.pop(wd, None)
+                self._inotify.rm_watch(wd)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "watched_tasks": len(self._configs),
+                "watched_dirs": len(self._wds),
+                "pending_batches": len(self._pending),
+            }
+
+    def stop(self):
+        self._stopping = True
+        os.write(self._wake_w, b"\0")
+
+    def _loop(self):
+        selector = selectors.DefaultSelector()
+        selector.register(self._inotify.fileno(), selectors.EVENT_READ, "inotify")
+        selector.register(self._wake_r, selectors.EVENT_READ, "wake")
+        try:
+            while not self._stopping:
+                for key, _ in selector.select(self._next_timeout()):
+                    if key.data == "wake":
+                        os.read(self._wake_r, 1024)
+                    else:
+                        self._handle_events(self._inotify.read_events())
+                self._flush_due()
+        except Exception as e:
+            logger.error(f"文件触发监听线程异常退出: {e}")
+        finally:
+            selector.close()
+            self._inotify.close()
+
+    def _next_timeout(self) -> Optional[float]:
+        """距离最近一个批次结束的时间，没有等待中的批次时一直阻塞到有事件"""
+        with self._lock:
+            if not self._pending:
+                return None
+            deadline = min(batch.deadline for batch in self._pending.values())
+        return max(deadline - time.monotonic(), 0)
+
+    def _handle_events(self, events):
+        with self._lock:
+            for event in events:
+                if event.mask & inotify.IN_Q_OVERFLOW:
+                    logger.warning("inotify事件队列溢出，部分文件到达事件已丢失")
+                    continue
+                if event.mask & inotify.IN_IGNORED:
+                    # 目录被删除或移走，移除对应任务的监听，下次同步配置时重新添加
+                    path = self._paths.pop(event.wd, None)
+                    if path:
+                        self._wds.pop(path, None)
+                        for task_id in [t for t, config in self._configs.items() if config.path == path]:
+                            self._configs.pop(task_id)
+                        logger.warning(f"监听的目录已不存在: {path}")
+                    continue
+                if event.mask & inotify.IN_ISDIR or not event.name:
+                    continue
+
+                path = self._paths.get(event.wd)
+                for task_id, config in self._configs.items():
+                    if config.path != path or not fnmatch.fnmatch(event.name, config.pattern):
+                        continue
+                    batch = self._pending.get(task_id)
+                    if batch is None:
+                        batch = self._pending[task_id] = _Batch(config)
+                    batch.add(event.name)
+
+    def _flush_due(self):
+        now = time.monotonic()
+        with self._lock:
+            due = [task_id for task_id, batch in self._pending.items() if batch.deadline <= now]
+            batches = [(task_id, self._pending.pop(task_id)) for task_id in due]
+
+        for task_id, batch in batches:
+            try:
+                self.on_batch(task_id, batch.files, batch.first_event_at, batch.key())
+            except Exception as e:
+                logger.error(f"文件到达触发任务 {task_id} 失败: {e}")
@@ -0,0 +1,465 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+预热的Python进程池（fork-server）
+常驻父进程预先导入常用模块（pandas、pymongo、db_configs等），每次执行时fork出子进程直接运行脚本，
+省去新解释器启动和重复导入的开销
+
+协议（Unix socket，每个连接对应一次执行）：
+    客户端 -> 服务端: 4字节长度（大端）+ JSON请求 {"argv": [...], "env": {...}, "cwd": "...", "limits": {...}}，
+                     第一段数据附带子进程stdout/stderr的两个文件描述符（输出暂存文件）；流式socket不保留消息边界，
+                     服务端按长度非阻塞地累积读取，超时未收齐的连接直接关闭，不影响其他客户端
+    服务端 -> 客户端: {"pid": 子进程PID}
+    服务端 -> 客户端: {"returncode": 退出码, "rusage": {...}}（子进程结束后）
+
+运行方式: python -m utils.forkserver --socket /tmp/xxx.sock --preload pandas,pymongo
+"""
+import os
+import sys
+import json
+import time
+import signal
+import socket
+import struct
+import asyncio
+import logging
+import argparse
+import importlib
+import selectors
+import threading
+import subprocess
+import traceback
+from typing import List, Optional
+
+from utils.resource_limits import ResourceLimits
+
+logger = logging.getLogger(__name__)
+
+# 请求消息最大长度（环境变量可能较大）
+MAX_REQUEST_SIZE = 1024 * 1024
+
+# 请求长度前缀
+_REQUEST_HEADER = struct.Struct(">I")
+
+# 每次读取请求数据的字节数
+REQUEST_READ_SIZE = 64 * 1024
+
+# 连接建立后收齐请求的最长时间（秒）
+REQUEST_TIMEOUT = 10
+
+# 等待服务端socket就绪的最长时间（秒），预导入pandas等模块需要数秒
+STARTUP_TIMEOUT = 60
+
+
+def rusage_to_dict(rusage) -> dict:
+    """将resource.struct_rusage转换为字典"""
+    return {
+        "ru_utime": rusage.ru_utime,
+        "ru_stime": rusage.ru_stime,
+        "ru_maxrss": rusage.ru_maxrss,
+        "ru_inblock": rusage.ru_inblock,
+        "ru_oublock": rusage.ru_oublock,
+        "ru_nvcsw": rusage.ru_nvcsw,
+        "ru_nivcsw": rusage.ru_nivcsw,
+    }
+
+
+# ============== 服务端 ==============
+
+def _preload(modules: List[str]):
+    """预导入模块，单个模块失败不影响服务启动"""
+    for name in modules:
+        try:
+            importlib.import_module(name)
+            logger.info(f"已预加载模块: {name}")
+        except Exception as e:
+            logger.warning(f"预加载模块失败 {name}: {e}")
+
+
+def _reset_after_fork():
+    """子进程中重置继承自父进程的状态"""
+    signal.set_wakeup_fd(-1)
+    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+    # 预加载的db_configs会创建数据库引擎，连接池不能在进程间共享
+    db_configs = sys.modules.get('db_configs')
+    if db_configs is not None and hasattr(db_configs, 'engine'):
+        db_configs.engine.dispose(close=False)
+
+
+def _run_child(request: dict, stdout_fd: int, stderr_fd: int):
+    """在fork出的子进程中运行脚本，不会返回"""
+    code = 1
+    try:
+        os.setsid()
+        _reset_after_fork()
+        if request.get('limits'):
+            ResourceLimits.from_dict(request['limits']).apply()
+
+        devnull = os.open(os.devnull, os.O_RDONLY)
+        os.dup2(devnull, 0)
+        os.dup2(stdout_fd, 1)
+        os.dup2(stderr_fd, 2)
+        for fd in [int(name) for name in os.listdir('/proc/self/fd')]:
+            if fd > 2:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+
+        sys.stdin = open(0, 'r', closefd=False)
+        sys.stdout = open(1, 'w', encoding='utf-8', errors='backslashreplace', closefd=False)
+        sys.stderr = open(2, 'w', encoding='utf-8', errors='backslashreplace', closefd=False, buffering=1)
+
+        env = request['env']
+        os.chdir(request['cwd'])
+        os.environ.clear()
+        os.environ.update(env)
+
+        # 与 python script.py 一致：脚本所在目录在sys.path首位，PYTHONPATH紧随其后
+        script = request['argv'][0]
+        for path in reversed([p for p in env.get('PYTHONPATH', '').split(os.pathsep) if p]):
+            if path not in sys.path:
+                sys.path.insert(0, path)
+        sys.path.insert(0, os.path.dirname(os.path.abspath(script)))
+        sys.argv = list(request['argv'])
+
+        import random
+        import runpy
+        random.seed()
+        runpy.run_path(script, run_name='__main__')
+        code = 0
+    except SystemExit as e:
+        if e.code is None:
+            code = 0
+        elif isinstance(e.code, int):
+            code = e.code
+        else:
+            print(e.code, file=sys.stderr)
+            code = 1
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        except Exception:
+            pass
+        os._exit(code)
+
+
+def _send(conn: socket.socket, message: dict):
+    try:
+        conn.sendall((json.dumps(message) + "\n").encode('utf-8'))
+    except OSError:
+        pass
+
+
+class _PendingRequest:
+    """尚未收齐的执行请求（非阻塞累积读取，一个慢客户端不会阻塞服务端）"""
+
+    def __init__(self, conn: socket.socket):
+        self.conn = conn
+        self.deadline = time.monotonic() + REQUEST_TIMEOUT
+        self.buffer = bytearray()
+        self.fds: List[int] = []
+
+    def read(self) -> Optional[dict]:
+        """
+        读取已到达的数据
+
+        Returns:
+            请求已收齐时返回请求内容，否则返回None
+
+        Raises:
+            ValueError: 连接提前关闭或请求过大
+        """
+        try:
+            data, fds, _, _ = socket.recv_fds(self.conn, REQUEST_READ_SIZE, 2 - len(self.fds))
+        except BlockingIOError:
+            return None
+        self.fds.extend(fds)
+        if not data:
+            raise ValueError("连接在请求收齐前关闭")
+        self.buffer.extend(data)
+        if len(self.buffer) < _REQUEST_HEADER.size:
+            return None
+        (length,) = _REQUEST_HEADER.unpack_from(self.buffer)
+        if length > MAX_REQUEST_SIZE:
+            raise ValueError(f"请求过大: {length} 字节")
+        if len(self.buffer) < _REQUEST_HEADER.size + length:
+            return None
+        return json.loads(bytes(self.buffer[_REQUEST_HEADER.size:_REQUEST_HEADER.size + length]).decode('utf-8'))
+
+    def close(self):
+        for fd in self.fds:
+            os.close(fd)
+        self.fds = []
+        self.conn.close()
+
+
+def serve(socket_path: str, preload: List[str]):
+    """
+    运行fork-server主循环（单线程，fork安全）
+
+    Args:
+        socket_path: Unix socket路径
+        preload: 预导入的模块列表
+    """
+    _preload(preload)
+
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(socket_path)
+    listener.listen(128)
+
+    # SIGCHLD通过wakeup fd唤醒select，在主循环中回收子进程
+    wakeup_r, wakeup_w = os.pipe()
+    os.set_blocking(wakeup_r, False)
+    os.set_blocking(wakeup_w, False)
+    signal.set_wakeup_fd(wakeup_w)
+    signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    selector = selectors.DefaultSelector()
+    selector.register(listener, selectors.EVENT_READ, "accept")
+    selector.register(wakeup_r, selectors.EVENT_READ, "sigchld")
+
+    parent_pid = os.getppid()
+    children = {}  # pid -> 客户端连接
+    pending = {}  # 尚未收齐请求的连接 -> _PendingRequest
+
+    logger.info(f"fork-server已就绪: {socket_path}")
+    try:
+        while True:
+            # 启动它的后端进程退出后自动结束
+            if os.getppid() != parent_pid:
+                break
+
+            now = time.monotonic()
+            for conn in [conn for conn, request in pending.items() if request.deadline < now]:
+                logger.error("读取执行请求超时")
+                selector.unregister(conn)
+                pending.pop(conn).close()
+
+            for key, _ in selector.select(timeout=1):
+                if key.data == "accept":
+                    conn, _ = listener.accept()
+                    conn.setblocking(False)
+                    pending[conn] = _PendingRequest(conn)
+                    selector.register(conn, selectors.EVENT_READ, "request")
+
+                elif key.data == "sigchld":
+                    try:
+                        while os.read(wakeup_r, 4096):
+                            pass
+                    except BlockingIOError:
+                        pass
+                    while children:
+                        try:
+                            pid, status, rusage = os.wait4(-1, os.WNOHANG)
+                        except ChildProcessError:
+                            break
+                        if pid == 0:
+                            break
+                        conn = children.pop(pid, None)
+                        if conn:
+                            _send(conn, {
+                                "returncode": os.waitstatus_to_exitcode(status),
+                                "rusage": rusage_to_dict(rusage),
+                            })
+                            conn.close()
+
+                else:
+                    conn = key.fileobj
+                    state = pending[conn]
+                    try:
+                        request = state.read()
+                    except Exception as e:
+                        logger.error(f"读取执行请求失败: {e}")
+                        selector.unregister(conn)
+                        pending.pop(conn).close()
+                        continue
+                    if request is None:
+                        continue
+                    selector.unregister(conn)
+                    del pending[conn]
+                    conn.setblocking(True)
+                    fds = state.fds
+                    if len(fds) != 2:
+                        for fd in fds:
+                            os.close(fd)
+                        conn.close()
+                        continue
+
+                    sys.stdout.flush()
+                    sys.stderr.flush()
+                    pid = os.fork()
+                    if pid == 0:
+                        listener.close()
+                        _run_child(request, fds[0], fds[1])
+                    for fd in fds:
+                        os.close(fd)
+                    children[pid] = conn
+                    _send(conn, {"pid": pid})
+    finally:
+        listener.close()
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+
+
+# ============== 客户端 ==============
+
+class ForkServerProcess:
+    """fork-server中运行的子进程，接口与asyncio.subprocess.Process保持一致"""
+
+    def __init__(self, pid: int, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.pid = pid
+        self.returncode: Optional[int] = None
+        self.rusage: Optional[dict] = None
+        self._reader = reader
+        self._writer = writer
+
+    async def wait(self) -> int:
+        """等待子进程结束"""
+        if self.returncode is None:
+            line = await self._reader.readline()
+            if line:
+                result = json.loads(line.decode('utf-8'))
+                self.returncode = result["returncode"]
+                self.rusage = result.get("rusage")
+            else:
+                # fork-server异常退出，无法获知真实退出码
+                self.returncode = -1
+            self._writer.close()
+        return self.returncode
+
+    def kill(self):
+        """结束子进程所在的整个进程组"""
+        try:
+            os.killpg(self.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+
+class ForkServerClient:
+    """fork-server客户端：按需启动服务进程并提交执行请求"""
+
+    def __init__(self, socket_path: str, preload: List[str]):
+        self.socket_path = socket_path
+        self.preload = preload
+        self._server: Optional[subprocess.Popen] = None
+        self._lock = threading.Lock()
+
+    def ensure_started(self):
+        """确保fork-server正在运行"""
+        with self._lock:
+            if self._server and self._server.poll() is None:
+                return
+
+            backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            env = os.environ.copy()
+            env['PYTHONPATH'] = os.pathsep.join(p for p in [backend_dir, env.get('PYTHONPATH', '')] if p)
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+
+            self._server = subprocess.Popen(
+                [sys.executable, '-m', 'utils.forkserver',
+                 '--socket', self.socket_path, '--preload', ','.join(self.preload)],
+                cwd=backend_dir,
+                env=env
+            )
+
+            deadline = time.monotonic() + STARTUP_TIMEOUT
+            while not os.path.exists(self.socket_path):
+                if self._server.poll() is not None:
+                    raise RuntimeError(f"fork-server启动失败，退出码: {self._server.returncode}")
+                if time.monotonic() > deadline:
+                    raise RuntimeError("fork-server启动超时")
+                time.sleep(0.05)
+            logger.info(f"fork-server已启动: pid={self._server.pid}, 预加载={self.preload}")
+
+    async def spawn(self, command: List[str], env: dict, cwd: str, stdout_fd: int, stderr_fd: int,
+                    limits: Optional[ResourceLimits] = None) -> ForkServerProcess:
+        """
+        通过fork-server启动脚本
+
+        Args:
+            command: 命令 [python, script.py, 参数...]，解释器由fork-server提供
+            env: 环境变量
+            cwd: 工作目录
+            stdout_fd: 子进程的stdout（随请求发送，调用方仍需自行关闭）
+            stderr_fd: 子进程的stderr
+            limits: 资源限制，在子进程中应用
+
+        Returns:
+            ForkServerProcess
+        """
+        loop = asyncio.get_running_loop()
+        payload = json.dumps({
+            "argv": command[1:], "env": env, "cwd": cwd,
+            "limits": limits.to_dict() if limits else None,
+        }).encode('utf-8')
+
+        # 启动服务端、连接和发送请求都是阻塞操作，放在线程池中执行
+        sock = await loop.run_in_executor(None, self._submit, payload, [stdout_fd, stderr_fd])
+        writer = None
+        try:
+            sock.setblocking(False)
+            reader, writer = await asyncio.open_unix_connection(sock=sock)
+            line = await reader.readline()
+            if not line:
+                raise RuntimeError("fork-server未返回子进程信息")
+            pid = json.loads(line.decode('utf-8'))["pid"]
+        except BaseException:
+            # 失败或被取消时释放连接，避免泄漏文件描述符
+            if writer is not None:
+                writer.close()
+            else:
+                sock.close()
+            raise
+        return ForkServerProcess(pid, reader, writer)
+
+    def _submit(self, payload: bytes, fds: List[int]) -> socket.socket:
+        """确保服务端运行，连接并发送请求（附带文件描述符），返回连接"""
+        sock = None
+        try:
+            if len(payload) > MAX_REQUEST_SIZE:
+                raise ValueError(f"执行请求过大: {len(payload)} 字节")
+            self.ensure_started()
+            message = _REQUEST_HEADER.pack(len(payload)) + payload
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(REQUEST_TIMEOUT)
+            sock.connect(self.socket_path)
+            # 文件描述符随第一段数据发送，其余部分继续发送
+            sent = socket.send_fds(sock, [message], fds)
+            sock.sendall(message[sent:])
+            return sock
+        except BaseException:
+            if sock:
+                sock.close()
+            raise
+
+    def shutdown(self):
+        """停止fork-server"""
+        with self._lock:
+            if self._server and self._server.poll() is None:
+                self._server.terminate()
+                try:
+                    self._server.wait(timeout=5)
+                except subprocess.TimeoutExpired:
+                    self._server.kill()
+            self._server = None
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="任务脚本预热fork-server")
+    parser.add_argument('--socket', required=True, help="Unix socket路径")
+    parser.add_argument('--preload', default="", help="预导入的模块，逗号分隔")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - forkserver - %(levelname)s - %(message)s')
+    serve(args.socket, [name.strip() for name in args.preload.split(',') if name.strip()])
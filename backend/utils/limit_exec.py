@@ -0,0 +1,77 @@
+"""
+带资源限制启动命令的启动器
+调度进程中有多个线程在运行，fork之后、exec之前执行Python代码（preexec_fn）可能因继承了其他线程持有的锁而卡死，
+因此直接启动的任务进程先执行本脚本：在新的单线程解释器中设置rlimit、nice和ionice，再exec真正的命令，
+进程ID不变。本文件作为独立脚本运行，只依赖标准库和psutil，不导入项目模块
+
+用法: python -I limit_exec.py <限制JSON> <命令> [参数...]
+"""
+import os
+import sys
+import json
+import resource
+
+# CPU时间超过软限制后收到SIGXCPU，仍未退出时在该宽限后由硬限制强制结束
+CPU_HARD_LIMIT_GRACE_SECONDS = 5
+
+# 启动器自身失败时的退出码（与shell一致）
+EXIT_SETUP_FAILED = 126
+EXIT_NOT_FOUND = 127
+
+# 启动时需要应用的限制项（超时由调度进程控制）
+SPAWN_FIELDS = ("memory_limit_mb", "cpu_limit_seconds", "nice_level", "ionice_class", "max_open_files")
+
+
+def apply_limits(limits: dict):
+    """
+    在当前进程中应用限制，之后exec的命令继承这些限制
+
+    rlimit设置失败时抛出异常；nice/ionice属于尽力而为，失败时忽略
+    """
+    if limits.get("memory_limit_mb"):
+        limit = limits["memory_limit_mb"] * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    if limits.get("cpu_limit_seconds"):
+        seconds = limits["cpu_limit_seconds"]
+        resource.setrlimit(resource.RLIMIT_CPU, (seconds, seconds + CPU_HARD_LIMIT_GRACE_SECONDS))
+    if limits.get("max_open_files"):
+        _, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        limit = limits["max_open_files"] if hard == resource.RLIM_INFINITY else min(limits["max_open_files"], hard)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (limit, limit))
+    if limits.get("nice_level") is not None:
+        try:
+            os.setpriority(os.PRIO_PROCESS, 0, limits["nice_level"])
+        except OSError:
+            pass
+    if limits.get("ionice_class"):
+        import psutil
+        classes = {"best-effort": psutil.IOPRIO_CLASS_BE, "idle": psutil.IOPRIO_CLASS_IDLE}
+        if limits["ionice_class"] in classes:
+            try:
+                psutil.Process().ionice(classes[limits["ionice_class"]])
+            except (OSError, psutil.Error):
+                pass
+
+
+def main(argv):
+    if len(argv) < 3:
+        sys.stderr.write("用法: limit_exec.py <限制JSON> <命令> [参数...]\n")
+        return EXIT_SETUP_FAILED
+    command = argv[2:]
+    try:
+        apply_limits(json.loads(argv[1]))
+    except (OSError, ValueError) as e:
+        sys.stderr.write(f"设置资源限制失败: {e}\n")
+        return EXIT_SETUP_FAILED
+    try:
+        os.execvp(command[0], command)
+    except FileNotFoundError as e:
+        sys.stderr.write(f"启动命令失败: {e}\n")
+        return EXIT_NOT_FOUND
+    except OSError as e:
+        sys.stderr.write(f"启动命令失败: {e}\n")
+        return EXIT_SETUP_FAILED
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,178 @@
+"""
+执行日志后台压缩
+定期扫描任务日志目录，将执行已结束且超过一定时间未修改的日志转换为压缩格式（见log_storage），
+运行中、排队中的执行的日志不处理；统计压缩节省的存储空间
+"""
+import os
+import re
+import time
+import logging
+import threading
+from datetime import datetime
+from typing import Dict
+
+from config import settings
+from database import SessionLocal
+from models import TaskExecution, TaskStatus
+from utils import log_storage
+from utils.task_logger import task_logger
+
+logger = logging.getLogger(__name__)
+
+_LOG_NAME_PATTERN = re.compile(r"^execution_(\d+)_.*\.log$")
+
+# 日志仍可能被写入的执行状态
+_ACTIVE_STATUSES = (TaskStatus.RUNNING, TaskStatus.PENDING, TaskStatus.QUEUED)
+
+# 每次查询执行状态的ID数
+_QUERY_BATCH = 500
+
+
+class LogCompressor:
+    """后台压缩已结束执行的日志"""
+
+    def __init__(self, base_dir: str, after_minutes: int, interval_seconds: int):
+        """
+        Args:
+            base_dir: 任务日志根目录（logs/tasks）
+            after_minutes: 日志最后修改超过该时间才压缩
+            interval_seconds: 扫描间隔
+        """
+        self.base_dir = base_dir
+        self.after_minutes = after_minutes
+        self.interval_seconds = interval_seconds
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {
+            "runs": 0,
+            "compressed_files": 0,
+            "original_bytes": 0,
+            "stored_bytes": 0,
+            "saved_bytes": 0,
+            "failed": 0,
+            "last_run_at": None,
+            "last_run_ms": None,
+        }
+
+    def start(self):
+        if self._thread:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="log-compressor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread = None
+
+    def _loop(self):
+        while not self._stop.wait(self.interval_seconds):
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"压缩执行日志失败: {e}")
+
+    def _candidates(self) -> Dict[int, str]:
+        """超过after_minutes未修改的未压缩日志：执行ID -> 路径"""
+        cutoff = time.time() - self.after_minutes * 60
+        candidates = {}
+        if not os.path.isdir(self.base_dir):
+            return candidates
+        for task_dir in os.scandir(self.base_dir):
+            if not task_dir.is_dir() or not task_dir.name.isdigit():
+                continue
+            for entry in os.scandir(task_dir.path):
+                match = _LOG_NAME_PATTERN.match(entry.name)
+                if match and entry.is_file() and entry.stat().st_mtime < cutoff:
+                    candidates[int(match.group(1))] = entry.path
+        return candidates
+
+    def run_once(self) -> dict:
+        """
+        压缩一轮
+
+        Returns:
+            本轮压缩的文件数、原始字节数和压缩后字节数
+        """
+        started = time.perf_counter()
+        candidates = self._candidates()
+
+        # 执行仍在运行或排队的日志跳过
+        active = set()
+        ids = list(candidates)
+        db = SessionLocal()
+        try:
+            for i in range(0, len(ids), _QUERY_BATCH):
+                active.update(row[0] for row in db.query(TaskExecution.id).filter(
+                    TaskExecution.id.in_(ids[i:i + _QUERY_BATCH]),
+                    TaskExecution.status.in_(_ACTIVE_STATUSES)
+                ))
+        finally:
+            db.close()
+
+        result = {"compressed_files": 0, "original_bytes": 0, "stored_bytes": 0}
+        for execution_id, log_file in candidates.items():
+            if execution_id in active or self._stop.is_set():
+                continue
+            try:
+                sizes = log_storage.compress(log_file)
+            except FileNotFoundError:
+                continue
+            except Exception as e:
+                self.stats["failed"] += 1
+                logger.error(f"压缩日志 {log_file} 失败: {e}")
+                continue
+            if sizes:
+                result["compressed_files"] += 1
+                result["original_bytes"] += sizes[0]
+                result["stored_bytes"] += sizes[1]
+
+        for key, value in result.items():
+            self.stats[key] += value
+        self.stats["saved_bytes"] = self.stats["original_bytes"] - self.stats["stored_bytes"]
+        self.stats["runs"] += 1
+        self.stats["last_run_at"] = datetime.now()
+        self.stats["last_run_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        if result["compressed_files"]:
+            logger.info(
+                f"压缩执行日志 {result['compressed_files']} 个，"
+                f"{result['original_bytes']} -> {result['stored_bytes']} 字节"
+            )
+        return result
+
+    def storage_report(self) -> dict:
+        """统计任务日志目录当前的存储占用和压缩节省的空间"""
+        report = {
+            "plain_files": 0,
+            "plain_bytes": 0,
+            "compressed_files": 0,
+            "compressed_original_bytes": 0,
+            "compressed_stored_bytes": 0,
+        }
+        suffix = ".log" + log_storage.COMPRESSED_SUFFIX
+        if os.path.isdir(self.base_dir):
+            for task_dir in os.scandir(self.base_dir):
+                if not task_dir.is_dir():
+                    continue
+                for entry in os.scandir(task_dir.path):
+                    try:
+                        if entry.name.endswith(".log"):
+                            report["plain_files"] += 1
+                            report["plain_bytes"] += entry.stat().st_size
+                        elif entry.name.endswith(suffix):
+                            report["compressed_original_bytes"] += log_storage.read_footer(entry.path)[2]
+                            report["compressed_stored_bytes"] += entry.stat().st_size
+                            report["compressed_files"] += 1
+                    except (OSError, ValueError):
+                        continue
+        original = report["compressed_original_bytes"]
+        report["saved_bytes"] = original - report["compressed_stored_bytes"]
+        report["compression_ratio"] = round(original / report["compressed_stored_bytes"], 2) if original else None
+        report["total_stored_bytes"] = report["plain_bytes"] + report["compressed_stored_bytes"]
+        return report
+
+
+# 全局实例
+log_compressor = LogCompressor(
+    task_logger.base_dir, settings.LOG_COMPRESS_AFTER_MINUTES, settings.LOG_COMPRESS_INTERVAL_SECONDS
+)
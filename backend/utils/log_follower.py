@@ -0,0 +1,295 @@
+"""
+运行中执行的日志实时跟踪
+同一个日志文件只有一个监听者：inotify（不支持时定时检查文件大小）发现写入后读取新增的完整行，
+放入共享的最近内容缓冲区，所有订阅者从缓冲区取数据；订阅者落后超出缓冲区范围或带旧位置重连时，
+缺失的部分直接从文件读取。执行结束后发送剩余内容和结束事件
+"""
+import asyncio
+import logging
+from collections import deque
+from typing import AsyncIterator, Callable, Dict, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from database import SessionLocal
+from models import TaskExecution, TaskStatus
+from utils import inotify, log_storage
+
+logger = logging.getLogger(__name__)
+
+# 监听的inotify事件
+WATCH_MASK = inotify.IN_MODIFY | inotify.IN_CLOSE_WRITE | inotify.IN_DELETE_SELF | inotify.IN_MOVE_SELF
+
+# 不支持inotify时检查文件大小的间隔
+POLL_INTERVAL_SECONDS = 0.5
+
+# 检查执行是否已结束的间隔
+STATUS_CHECK_SECONDS = 2
+
+# 共享缓冲区保留的最近内容字节数
+BUFFER_BYTES = 4 * 1024 * 1024
+
+# 每条消息最多的字节数，追赶大段缺失内容时分多条发送
+MAX_MESSAGE_BYTES = 256 * 1024
+
+
+def _read_range(log_file: str, start: int, end: int) -> bytes:
+    with log_storage.open_log(log_file) as f:
+        f.seek(start)
+        return f.read(end - start)
+
+
+def _message_end(data: bytes) -> int:
+    """
+    一条消息在data中的结束位置：最后一个换行符之后；没有换行符时退回到最后一个完整的UTF-8字符之后，
+    多字节字符不会被拆到两条消息中分别解码。结果为0（只有一个不完整的字符，如二进制输出）时不截断
+    """
+    newline = data.rfind(b"\n")
+    if newline >= 0:
+        return newline + 1
+    # 从末尾向前最多找3个续字节，找到最后一个字符的首字节，按其声明的长度判断是否完整
+    for i in range(len(data) - 1, max(len(data) - 4, 0) - 1, -1):
+        lead = data[i]
+        if lead & 0xC0 == 0x80:
+            continue
+        length = 1 if lead < 0xC0 else 2 if lead < 0xE0 else 3 if lead < 0xF0 else 4
+        if len(data) - i < length:
+            return i or len(data)
+        break
+    return len(data)
+
+
+def _complete_lines_end(log_file: str, start: int) -> int:
+    """从start开始到文件中最后一个换行符之后的位置"""
+    with log_storage.open_log(log_file) as f:
+        size = log_storage.size_of(f)
+        position = size
+        while position > start:
+            block_start = max(position - MAX_MESSAGE_BYTES, start)
+            f.seek(block_start)
+            newline = f.read(position - block_start).rfind(b"\n")
+            if newline >= 0:
+                return block_start + newline + 1
+            position = block_start
+    return start
+
+
+def execution_running(execution_id: int) -> Callable[[], bool]:
+    """返回检查执行是否仍在运行的函数"""
+    def is_running() -> bool:
+        db = SessionLocal()
+        try:
+            status = db.query(TaskExecution.status).filter(TaskExecution.id == execution_id).scalar()
+            return status == TaskStatus.RUNNING
+        finally:
+            db.close()
+    return is_running
+
+
+class _Watch:
+    """一个日志文件的监听状态"""
+
+    def __init__(self, log_file: str, offset: int):
+        self.log_file = log_file
+        self.offset = offset  # 已读取到的位置（行首）
+        self.chunks = deque()  # 最近读取的内容 (起始位置, 数据)
+        self.buffered = 0
+        self.finished = False
+        self.subscribers = 0
+        self.changed = asyncio.Event()  # 文件有写入
+        self.updated = asyncio.Condition()  # 有新内容或执行结束
+        self.wd = None
+        self.task: Optional[asyncio.Task] = None
+
+    def append(self, start: int, data: bytes):
+        self.chunks.append((start, data))
+        self.buffered += len(data)
+        while self.buffered > BUFFER_BYTES and len(self.chunks) > 1:
+            self.buffered -= len(self.chunks.popleft()[1])
+
+    def buffered_from(self, offset: int) -> Optional[bytes]:
+        """缓冲区中从offset开始的内容，offset已不在缓冲区内时返回None"""
+        for start, data in self.chunks:
+            if start <= offset < start + len(data):
+                data = data[offset - start:]
+                if len(data) > MAX_MESSAGE_BYTES:
+                    data = data[:MAX_MESSAGE_BYTES]
+                    data = data[:_message_end(data)]
+                return data
+        return None
+
+
+class LogFollower:
+    """日志跟踪管理器（在事件循环中使用）"""
+
+    def __init__(self):
+        self._watches: Dict[str, _Watch] = {}
+        self._inotify = None
+        self._loop = None
+        self._wds: Dict[int, _Watch] = {}
+        self._supported = inotify.is_supported()
+
+    def stats(self) -> dict:
+        return {
+            "watched_files": len(self._watches),
+            "subscribers": sum(watch.subscribers for watch in self._watches.values()),
+            "inotify": self._supported,
+        }
+
+    async def follow(self, log_file: str, offset: int,
+                     is_running: Callable[[], bool]) -> AsyncIterator[dict]:
+        """
+        从offset开始跟踪日志，直到执行结束
+
+        Args:
+            log_file: 日志文件路径
+            offset: 开始位置（上次收到的next_offset，从头开始为0）
+            is_running: 执行是否仍在运行（在线程池中调用）
+
+        Yields:
+            {"type": "log", "offset", "next_offset", "data"} 和最后的 {"type": "end", "offset"}
+        """
+        watch = self._watches.get(log_file)
+        if watch is None:
+            if not await run_in_threadpool(is_running):
+                async for message in self._read_to_end(log_file, offset):
+                    yield message
+                return
+            # 检查期间其他订阅者可能已经开始监听
+            watch = self._watches.get(log_file) or self._start_watch(log_file, is_running)
+
+        watch.subscribers += 1
+        try:
+            while True:
+                if offset < watch.offset:
+                    data = watch.buffered_from(offset)
+                    if data is None:
+                        # 落后超出缓冲区范围，从文件补齐
+                        end = min(watch.offset, offset + MAX_MESSAGE_BYTES)
+                        data = await run_in_threadpool(_read_range, log_file, offset, end)
+                        data = data[:_message_end(data)]
+                    yield self._message(offset, data)
+                    offset += len(data)
+                    continue
+                if watch.finished:
+                    break
+                async with watch.updated:
+                    if offset >= watch.offset and not watch.finished:
+                        await watch.updated.wait()
+        finally:
+            watch.subscribers -= 1
+            if watch.subscribers == 0 and not watch.finished:
+                self._stop_watch(watch)
+        yield {"type": "end", "offset": offset}
+
+    async def _read_to_end(self, log_file: str, offset: int) -> AsyncIterator[dict]:
+        """执行已结束：发送offset之后的全部内容"""
+        size = log_storage.logical_size(log_file)
+        while offset < size:
+            end = min(size, offset + MAX_MESSAGE_BYTES)
+            data = await run_in_threadpool(_read_range, log_file, offset, end)
+            if not data:
+                break
+            if end < size:
+                data = data[:_message_end(data)]
+            yield self._message(offset, data)
+            offset += len(data)
+        yield {"type": "end", "offset": offset}
+
+    @staticmethod
+    def _message(offset: int, data: bytes) -> dict:
+        return {
+            "type": "log",
+            "offset": offset,
+            "next_offset": offset + len(data),
+            "data": data.decode("utf-8", errors="replace"),
+        }
+
+    def _start_watch(self, log_file: str, is_running: Callable[[], bool]) -> _Watch:
+        watch = _Watch(log_file, _complete_lines_end(log_file, 0))
+        if self._supported:
+            try:
+                loop = asyncio.get_running_loop()
+                if self._loop is not loop:
+                    # 首次使用（或事件循环已更换）时创建inotify实例并注册到事件循环
+                    if self._inotify:
+                        self._inotify.close()
+                    self._wds.clear()
+                    self._inotify = inotify.Inotify()
+                    self._loop = loop
+                    loop.add_reader(self._inotify.fileno(), self._on_inotify)
+                watch.wd = self._inotify.add_watch(log_file, WATCH_MASK)
+                self._wds[watch.wd] = watch
+            except OSError as e:
+                logger.warning(f"监听日志文件失败，改为定时检查: {log_file}: {e}")
+        self._watches[log_file] = watch
+        watch.task = asyncio.create_task(self._watch_loop(watch, is_running))
+        return watch
+
+    def _stop_watch(self, watch: _Watch):
+        if self._watches.get(watch.log_file) is watch:
+            del self._watches[watch.log_file]
+        if watch.wd is not None:
+            self._wds.pop(watch.wd, None)
+            self._inotify.rm_watch(watch.wd)
+            watch.wd = None
+        if watch.task and watch.task is not asyncio.current_task():
+            watch.task.cancel()
+
+    def _on_inotify(self):
+        for event in self._inotify.read_events():
+            if event.mask & inotify.IN_Q_OVERFLOW:
+                # 事件丢失：唤醒所有监听者重新检查
+                for watch in self._watches.values():
+                    watch.changed.set()
+                continue
+            watch = self._wds.get(event.wd)
+            if watch:
+                watch.changed.set()
+
+    async def _watch_loop(self, watch: _Watch, is_running: Callable[[], bool]):
+        """读取新增的完整行，执行结束后读取剩余全部内容并通知订阅者"""
+        loop = asyncio.get_running_loop()
+        next_status_check = loop.time() + STATUS_CHECK_SECONDS
+        try:
+            while True:
+                timeout = max(next_status_check - loop.time(), 0)
+                if watch.wd is None:
+                    timeout = min(timeout, POLL_INTERVAL_SECONDS)
+                try:
+                    await asyncio.wait_for(watch.changed.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                watch.changed.clear()
+
+                finished = False
+                if loop.time() >= next_status_check:
+                    finished = not await run_in_threadpool(is_running)
+                    next_status_check = loop.time() + STATUS_CHECK_SECONDS
+
+                if finished:
+                    end = log_storage.logical_size(watch.log_file)
+                else:
+                    end = await run_in_threadpool(_complete_lines_end, watch.log_file, watch.offset)
+                if end > watch.offset:
+                    data = await run_in_threadpool(_read_range, watch.log_file, watch.offset, end)
+                    watch.append(watch.offset, data)
+                    watch.offset += len(data)
+                if finished:
+                    watch.finished = True
+                async with watch.updated:
+                    watch.updated.notify_all()
+                if finished:
+                    break
+        except Exception as e:
+            logger.error(f"跟踪日志失败: {watch.log_file}: {e}")
+            watch.finished = True
+            async with watch.updated:
+                watch.updated.notify_all()
+        finally:
+            if watch.finished:
+                self._stop_watch(watch)
+
+
+# 全局实例
+log_follower = LogFollower()
@@ -0,0 +1,340 @@
+"""
+大日志文件的按需读取
+末尾N行：从文件末尾按块向前读取，只解码需要的部分；
+任意行范围：日志旁维护行偏移索引文件（{日志}.lines），每CHECKPOINT_LINES行记录一次起始字节位置，
+定位到最近的记录点后向后读取，读取量与请求的行数成正比；索引按上次处理到的位置增量更新；
+分页：按行号或字节位置游标向前/向后翻页，支持关键字过滤；
+已压缩的日志通过log_storage按块读取，行偏移索引记录的是原始内容的位置，压缩前后通用
+"""
+import os
+import bisect
+import threading
+from array import array
+from typing import List, NamedTuple, Tuple
+
+import numpy as np
+
+from utils import log_storage
+
+# 行偏移索引文件后缀
+SIDECAR_SUFFIX = ".lines"
+
+# 每隔多少行记录一次行起始位置
+CHECKPOINT_LINES = 256
+
+# 反向读取末尾时每次读取的块大小
+TAIL_BLOCK_SIZE = 64 * 1024
+
+# 更新行偏移索引时每次读取的块大小
+SCAN_BLOCK_SIZE = 4 * 1024 * 1024
+
+# 每页最多返回的行数
+MAX_PAGE_LINES = 5000
+
+# 带关键字过滤时每页最多扫描的字节数
+GREP_SCAN_BYTES = 16 * 1024 * 1024
+
+# 索引文件头：版本、每个记录点间隔的行数、已处理的字节数、完整行数
+_HEADER_FORMAT = "Q"
+_HEADER_FIELDS = 4
+_VERSION = 1
+
+_write_lock = threading.Lock()
+
+
+class LineIndex(NamedTuple):
+    indexed_bytes: int  # 已处理到的位置（最后一个换行符之后）
+    complete_lines: int  # indexed_bytes之前的完整行数
+    checkpoints: array  # 第 i*CHECKPOINT_LINES+1 行的起始字节位置
+
+
+def read_tail(log_file: str, max_lines: int) -> Tuple[bytes, bool]:
+    """
+    读取文件最后max_lines行
+
+    Returns:
+        (末尾内容, 前面是否还有内容)
+    """
+    with log_storage.open_log(log_file) as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        if position == 0 or max_lines <= 0:
+            return b"", position > 0
+        f.seek(position - 1)
+        # 文件以换行结尾时，最后一个换行不开始新的一行
+        wanted = max_lines + (1 if f.read(1) == b"\n" else 0)
+
+        blocks, newlines = [], 0
+        while position > 0 and newlines < wanted:
+            size = min(TAIL_BLOCK_SIZE, position)
+            position -= size
+            f.seek(position)
+            block = f.read(size)
+            blocks.append(block)
+            newlines += block.count(b"\n")
+
+    data = b"".join(reversed(blocks))
+    if newlines < wanted:
+        return data, False
+    start = len(data)
+    for _ in range(wanted):
+        start = data.rfind(b"\n", 0, start)
+    return data[start + 1:], True
+
+
+def sidecar_path(log_file: str) -> str:
+    return log_file + SIDECAR_SUFFIX
+
+
+def _load_sidecar(log_file: str) -> LineIndex:
+    try:
+        with open(sidecar_path(log_file), "rb") as f:
+            values = array(_HEADER_FORMAT)
+            values.frombytes(f.read())
+        version, every, indexed_bytes, complete_lines = values[:_HEADER_FIELDS]
+        if version == _VERSION and every == CHECKPOINT_LINES:
+            return LineIndex(indexed_bytes, complete_lines, values[_HEADER_FIELDS:])
+    except (OSError, ValueError):
+        pass
+    return LineIndex(0, 0, array(_HEADER_FORMAT, [0]))
+
+
+def _save_sidecar(log_file: str, index: LineIndex):
+    header = array(_HEADER_FORMAT, [_VERSION, CHECKPOINT_LINES, index.indexed_bytes, index.complete_lines])
+    temp = f"{sidecar_path(log_file)}.{os.getpid()}.{threading.get_ident()}"
+    try:
+        with open(temp, "wb") as f:
+            f.write(header.tobytes() + index.checkpoints.tobytes())
+        os.replace(temp, sidecar_path(log_file))
+    except OSError:
+        # 索引只是缓存，写入失败时下次重新计算
+        if os.path.exists(temp):
+            os.remove(temp)
+
+
+def line_index(log_file: str) -> LineIndex:
+    """读取行偏移索引，并处理上次之后新写入的完整行"""
+    index = _load_sidecar(log_file)
+    with log_storage.open_log(log_file) as f:
+        size = log_storage.size_of(f)
+        if index.indexed_bytes:
+            # 文件被截短或重写（原位置不再是行尾）时重新计算
+            f.seek(index.indexed_bytes - 1)
+            if size < index.indexed_bytes or f.read(1) != b"\n":
+                index = LineIndex(0, 0, array(_HEADER_FORMAT, [0]))
+        if size == index.indexed_bytes:
+            return index
+
+        indexed_bytes, complete_lines, checkpoints = index
+        position = indexed_bytes
+        f.seek(position)
+        while True:
+            block = f.read(SCAN_BLOCK_SIZE)
+            if not block:
+                break
+            newlines = np.flatnonzero(np.frombuffer(block, dtype=np.uint8) == 10)
+            if len(newlines):
+                starts = position + newlines + 1
+                numbers = complete_lines + np.arange(1, len(newlines) + 1)
+                checkpoints.extend(starts[numbers % CHECKPOINT_LINES == 0].tolist())
+                complete_lines += len(newlines)
+                indexed_bytes = int(starts[-1])
+            position += len(block)
+
+    if indexed_bytes != index.indexed_bytes:
+        index = LineIndex(indexed_bytes, complete_lines, checkpoints)
+        with _write_lock:
+            _save_sidecar(log_file, index)
+    return LineIndex(indexed_bytes, complete_lines, checkpoints)
+
+
+def count_lines(log_file: str) -> int:
+    """文件行数（末尾未换行的部分算一行）"""
+    index = line_index(log_file)
+    return index.complete_lines + (1 if log_storage.logical_size(log_file) > index.indexed_bytes else 0)
+
+
+def read_lines(log_file: str, start_line: int, max_lines: int) -> List[bytes]:
+    """
+    读取从第start_line行（从1开始）起的最多max_lines行
+
+    Returns:
+        各行原始字节（包含换行符）
+    """
+    if start_line < 1 or max_lines <= 0:
+        return []
+    index = line_index(log_file)
+    checkpoint = (start_line - 1) // CHECKPOINT_LINES
+    if checkpoint >= len(index.checkpoints):
+        return []
+
+    lines = []
+    with log_storage.open_log(log_file) as f:
+        f.seek(index.checkpoints[checkpoint])
+        for _ in range(start_line - 1 - checkpoint * CHECKPOINT_LINES):
+            if not f.readline():
+                return []
+        while len(lines) < max_lines:
+            line = f.readline()
+            if not line:
+                break
+            lines.append(line)
+    return lines
+
+
+def remove_sidecar(log_file: str):
+    if os.path.exists(sidecar_path(log_file)):
+        os.remove(sidecar_path(log_file))
+
+
+def _position_of_line(f, index: LineIndex, line: int, size: int) -> Tuple[int, int]:
+    """第line行（从1开始）的起始位置，超过末尾时返回 (文件大小, 末尾行号)"""
+    end = (size, index.complete_lines + (1 if size > index.indexed_bytes else 0) + 1)
+    checkpoint = (max(line, 1) - 1) // CHECKPOINT_LINES
+    if checkpoint >= len(index.checkpoints):
+        return end
+    position, current = index.checkpoints[checkpoint], checkpoint * CHECKPOINT_LINES + 1
+    f.seek(position)
+    while current < line:
+        data = f.readline()
+        if not data or not data.endswith(b"\n"):
+            return end
+        position += len(data)
+        current += 1
+    return position, current
+
+
+def _line_at_offset(f, index: LineIndex, offset: int, size: int) -> Tuple[int, int]:
+    """包含字节位置offset的行的 (起始位置, 行号)，不在行首时对齐到该行开头"""
+    if offset >= size:
+        return _position_of_line(f, index, size + 1, size)
+    checkpoint = bisect.bisect_right(index.checkpoints, max(offset, 0)) - 1
+    position, current = index.checkpoints[checkpoint], checkpoint * CHECKPOINT_LINES + 1
+    f.seek(position)
+    while True:
+        data = f.readline()
+        if not data or position + len(data) > offset:
+            return position, current
+        position += len(data)
+        current += 1
+
+
+def _iter_forward(f, position: int, line: int):
+    """从position（行首）向后逐行读取，返回 (行号, 起始位置, 行内容)"""
+    f.seek(position)
+    for data in iter(f.readline, b""):
+        yield line, position, data
+        position += len(data)
+        line += 1
+
+
+def _iter_backward(f, position: int, line: int):
+    """从position（行首或文件末尾）向前逐行读取，返回 (行号, 起始位置, 行内容)"""
+    remainder = b""
+    block_end = position
+    while block_end > 0:
+        block_start = max(block_end - TAIL_BLOCK_SIZE, 0)
+        f.seek(block_start)
+        data = f.read(block_end - block_start) + remainder
+        pieces = data.split(b"\n")
+        end = block_start + len(data)
+        if len(pieces) > 1 and pieces[-1]:
+            # 文件末尾未换行的部分
+            end -= len(pieces[-1])
+            line -= 1
+            yield line, end, pieces[-1]
+        for piece in reversed(pieces[1:-1]):
+            end -= len(piece) + 1
+            line -= 1
+            yield line, end, piece + b"\n"
+        # 第一段可能是被块边界截断的行，与前一块合并
+        remainder = data[:len(pieces[0]) + 1] if len(pieces) > 1 else data
+        block_end = block_start
+    if remainder:
+        yield line - 1, 0, remainder
+
+
+def read_page(log_file: str, from_line: int = None, to_line: int = None, offset: int = None,
+              backward: bool = False, limit: int = 500, grep: str = None,
+              max_scan_bytes: int = GREP_SCAN_BYTES) -> dict:
+    """
+    按游标分页读取日志，定位只依赖行偏移索引，翻到文件任何位置的开销与第一页相同
+
+    Args:
+        log_file: 日志文件路径
+        from_line: 起始行号（向后翻页的起点 / 向前翻页的下界）
+        to_line: 结束行号（向前翻页的起点 / 向后翻页的上界）
+        offset: 字节位置游标，优先于行号，不在行首时对齐到所在行开头
+        backward: 是否从游标位置向前翻页（不包含游标所在行）
+        limit: 每页最多返回的行数
+        grep: 只返回包含该关键字的行（不区分大小写）
+        max_scan_bytes: 有过滤条件时每页最多扫描的字节数，达到上限时返回已找到的行和继续扫描的游标
+
+    Returns:
+        lines（按行号升序）、total_lines、size_bytes、prev_cursor/next_cursor（{line, offset}）、
+        has_more_before/has_more_after、scanned_bytes、scan_limited
+
+    Raises:
+        ValueError: 游标参数无效
+    """
+    if (from_line is not None and from_line < 1) or (to_line is not None and to_line < 1):
+        raise ValueError("行号从1开始")
+    if from_line is not None and to_line is not None and from_line > to_line:
+        raise ValueError("起始行号不能大于结束行号")
+    if offset is not None and offset < 0:
+        raise ValueError("字节位置不能为负数")
+    if not 1 <= limit <= MAX_PAGE_LINES:
+        raise ValueError(f"每页行数应在1到{MAX_PAGE_LINES}之间")
+
+    index = line_index(log_file)
+    keyword = grep.lower().encode("utf-8") if grep else None
+    with log_storage.open_log(log_file) as f:
+        size = log_storage.size_of(f)
+        total_lines = index.complete_lines + (1 if size > index.indexed_bytes else 0)
+        if offset is not None:
+            position, line = _line_at_offset(f, index, offset, size)
+        elif backward:
+            position, line = _position_of_line(f, index, (to_line or total_lines) + 1, size)
+        else:
+            position, line = _position_of_line(f, index, from_line or 1, size)
+
+        items = (_iter_backward if backward else _iter_forward)(f, position, line)
+
+        lines, scanned, scan_limited = [], 0, False
+        edge = (line, position)  # 已扫描范围远离游标的一端
+        for number, start, data in items:
+            if len(lines) >= limit:
+                break
+            if (from_line if backward else to_line) is not None and (
+                number < from_line if backward else number > to_line
+            ):
+                break
+            if keyword and scanned >= max_scan_bytes:
+                scan_limited = True
+                break
+            scanned += len(data)
+            edge = (number, start) if backward else (number + 1, start + len(data))
+            if keyword and keyword not in data.lower():
+                continue
+            lines.append({
+                "line": number,
+                "offset": start,
+                "text": data.decode("utf-8", errors="replace").rstrip("\r\n"),
+            })
+
+    if backward:
+        lines.reverse()
+        prev_cursor, next_cursor = edge, (line, position)
+    else:
+        prev_cursor, next_cursor = (line, position), edge
+    return {
+        "lines": lines,
+        "total_lines": total_lines,
+        "size_bytes": size,
+        "prev_cursor": {"line": prev_cursor[0], "offset": prev_cursor[1]},
+        "next_cursor": {"line": next_cursor[0], "offset": next_cursor[1]},
+        "has_more_before": prev_cursor[1] > 0,
+        "has_more_after": next_cursor[1] < size,
+        "scanned_bytes": scanned,
+        "scan_limited": scan_limited,
+    }
@@ -0,0 +1,347 @@
+"""
+执行日志全文索引
+每个任务的日志目录下维护一个SQLite FTS5索引（trigram分词，detail=none），关键字按LIKE子串匹配，
+3个字符以上的关键字由trigram索引加速，不区分大小写；每行日志一条记录，rowid = 执行ID << 32 | 行号；
+日志写入后通知后台线程，从上次索引到的字节位置读取新增的完整行追加到索引；
+搜索按执行ID倒序逐个定位有匹配的执行，取够limit个执行后停止；搜索时只同步补齐有限的未索引内容，
+其余（如索引功能上线前的大量历史日志）交给后台线程，尚未索引完的执行直接扫描日志文件
+"""
+import os
+import re
+import time
+import bisect
+import sqlite3
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from utils import log_storage
+
+logger = logging.getLogger(__name__)
+
+# 索引文件名（位于 logs/tasks/{task_id}/ 下）
+INDEX_FILENAME = ".search.db"
+
+# 收到写入通知后等待的时间，合并同一段时间内的多次写入
+INDEX_DELAY_SECONDS = 0.5
+
+# 每次从日志文件读取的块大小
+READ_BLOCK_SIZE = 4 * 1024 * 1024
+
+# 搜索结果中每行保留的匹配位置前后的字符数
+SNIPPET_CONTEXT_CHARS = 100
+
+_LOG_PATH_PATTERN = re.compile(r"(\d+)[/\\]execution_(\d+)_[^/\\]*\.log$")
+
+LINE_BITS = 32
+
+# 搜索时同步补齐索引的最多字节数，超出部分由后台线程索引
+SEARCH_SYNC_INDEX_BYTES = 2 * 1024 * 1024
+
+# 关键字含%或_时LIKE匹配范围更大，每个执行最多取出的候选行数（再按子串过滤）
+WILDCARD_ROWS_PER_EXECUTION = 200
+
+# 关键字含%或_时一次搜索最多检查的候选行数
+WILDCARD_MAX_ROWS = 20000
+
+
+def is_supported() -> bool:
+    """当前SQLite是否支持FTS5 trigram分词"""
+    try:
+        conn = sqlite3.connect(":memory:")
+        conn.execute("CREATE VIRTUAL TABLE t USING fts5(text, tokenize='trigram', detail=none)")
+        conn.close()
+        return True
+    except sqlite3.Error:
+        return False
+
+
+def parse_log_path(log_file: str) -> Optional[Tuple[int, int]]:
+    """从日志路径解析 (任务ID, 执行ID)"""
+    match = _LOG_PATH_PATTERN.search(log_file or "")
+    if not match:
+        return None
+    return int(match.group(1)), int(match.group(2))
+
+
+def _snippet(text: str, keyword: str) -> str:
+    position = text.lower().find(keyword.lower())
+    if position < 0 or len(text) <= 2 * SNIPPET_CONTEXT_CHARS + len(keyword):
+        return text
+    start = max(position - SNIPPET_CONTEXT_CHARS, 0)
+    end = position + len(keyword) + SNIPPET_CONTEXT_CHARS
+    return ("…" if start else "") + text[start:end] + ("…" if end < len(text) else "")
+
+
+class LogSearchIndex:
+    """按任务分文件的日志全文索引"""
+
+    def __init__(self, base_dir: str):
+        """
+        Args:
+            base_dir: 任务日志根目录（logs/tasks）
+        """
+        self.base_dir = base_dir
+        self.enabled = is_supported()
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        # 同一任务的索引同一时间只由一个线程写入
+        self._task_locks: Dict[int, threading.Lock] = {}
+
+    def index_path(self, task_id: int) -> str:
+        return os.path.join(self.base_dir, str(task_id), INDEX_FILENAME)
+
+    def notify(self, log_file: str):
+        """日志文件有新内容写入，由后台线程增量索引"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._dirty.add(log_file)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="log-search-index", daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+
+    def remove(self, log_file: str):
+        """删除日志文件对应的索引记录"""
+        parsed = parse_log_path(log_file)
+        if not self.enabled or not parsed or not os.path.exists(self.index_path(parsed[0])):
+            return
+        task_id, execution_id = parsed
+        with self._task_lock(task_id):
+            conn = self._connect(task_id)
+            try:
+                with conn:
+                    conn.execute("DELETE FROM lines WHERE rowid BETWEEN ? AND ?", self._rowid_range(execution_id))
+                    conn.execute("DELETE FROM files WHERE execution_id = ?", (execution_id,))
+            finally:
+                conn.close()
+
+    def _loop(self):
+        while True:
+            self._wakeup.wait()
+            time.sleep(INDEX_DELAY_SECONDS)
+            self._wakeup.clear()
+            with self._lock:
+                dirty, self._dirty = self._dirty, set()
+            for log_file in dirty:
+                parsed = parse_log_path(log_file)
+                if not parsed:
+                    continue
+                try:
+                    self.update(parsed[0], {parsed[1]: log_file})
+                except Exception as e:
+                    logger.error(f"索引日志 {log_file} 失败: {e}")
+
+    def _task_lock(self, task_id: int) -> threading.Lock:
+        with self._lock:
+            return self._task_locks.setdefault(task_id, threading.Lock())
+
+    def _connect(self, task_id: int) -> sqlite3.Connection:
+        path = self.index_path(task_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        conn = sqlite3.connect(path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        # 不保存词位置（detail=none），索引约为全量位置索引的一半，LIKE查询仍可使用trigram索引
+        conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS lines USING fts5(text, tokenize='trigram', detail=none)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            "execution_id INTEGER PRIMARY KEY, log_file TEXT NOT NULL, "
+            "offset INTEGER NOT NULL, line_count INTEGER NOT NULL)"
+        )
+        return conn
+
+    @staticmethod
+    def _rowid_range(execution_id: int) -> Tuple[int, int]:
+        return execution_id << LINE_BITS, ((execution_id + 1) << LINE_BITS) - 1
+
+    def update(self, task_id: int, log_files: Dict[int, str], max_bytes: Optional[int] = None) -> int:
+        """
+        将日志文件新增的完整行追加到索引
+
+        Args:
+            task_id: 任务ID
+            log_files: 执行ID -> 日志文件路径
+            max_bytes: 最多处理的字节数（按块计），为空时全部处理
+
+        Returns:
+            本次索引的行数
+        """
+        if not self.enabled:
+            return 0
+        indexed = 0
+        budget = [max_bytes]
+        with self._task_lock(task_id):
+            conn = self._connect(task_id)
+            try:
+                states = {
+                    row[0]: row[1:] for row in conn.execute("SELECT execution_id, log_file, offset, line_count FROM files")
+                }
+                for execution_id, log_file in log_files.items():
+                    try:
+                        size = log_storage.logical_size(log_file)
+                    except OSError:
+                        continue
+                    path, offset, line_count = states.get(execution_id, (log_file, 0, 0))
+                    if path != log_file or size < offset:
+                        # 日志被重写：重新索引
+                        conn.execute("DELETE FROM lines WHERE rowid BETWEEN ? AND ?", self._rowid_range(execution_id))
+                        offset, line_count = 0, 0
+                    if size > offset:
+                        if budget[0] is not None and budget[0] <= 0:
+                            break
+                        indexed += self._index_file(conn, execution_id, log_file, offset, line_count, budget)
+            finally:
+                conn.close()
+        return indexed
+
+    def _index_file(self, conn: sqlite3.Connection, execution_id: int, log_file: str,
+                    offset: int, line_count: int, budget: list) -> int:
+        """从offset开始索引完整的行（末尾未写完的行留到下次），每块一个事务；budget[0]为剩余可处理的字节数"""
+        base = execution_id << LINE_BITS
+        total = 0
+        with log_storage.open_log(log_file) as f:
+            f.seek(offset)
+            pending = b""
+            while budget[0] is None or budget[0] > 0:
+                block = f.read(READ_BLOCK_SIZE)
+                if not block:
+                    break
+                if budget[0] is not None:
+                    budget[0] -= len(block)
+                data = pending + block
+                lines = data.split(b"\n")
+                pending = lines.pop()
+                if not lines:
+                    continue
+                rows = [
+                    (base + line_count + i + 1, line.decode("utf-8", errors="replace").rstrip("\r"))
+                    for i, line in enumerate(lines)
+                ]
+                line_count += len(rows)
+                offset += len(data) - len(pending)
+                with conn:
+                    conn.executemany("INSERT INTO lines(rowid, text) VALUES (?, ?)", rows)
+                    conn.execute(
+                        "INSERT OR REPLACE INTO files(execution_id, log_file, offset, line_count) VALUES (?, ?, ?, ?)",
+                        (execution_id, log_file, offset, line_count)
+                    )
+                total += len(rows)
+        return total
+
+    def search(self, task_id: int, keyword: str, log_files: Dict[int, str],
+               lines_per_execution: int = 3, limit: int = 100) -> Tuple[List[dict], bool, Dict[int, str]]:
+        """
+        搜索任务的执行日志
+
+        按执行ID倒序查找有匹配的执行，每个执行只取前lines_per_execution个匹配行，取够limit个执行后停止；
+        搜索前同步补齐最多SEARCH_SYNC_INDEX_BYTES的未索引内容，仍未索引完的执行不在索引中查询，返回给调用方扫描文件
+
+        Args:
+            task_id: 任务ID
+            keyword: 关键字（不区分大小写的子串匹配，%和_按普通字符处理）
+            log_files: 参与搜索的执行 执行ID -> 日志文件路径
+            lines_per_execution: 每个执行最多返回的匹配行数
+            limit: 最多返回的执行数
+
+        Returns:
+            ([{"execution_id", "matches": [{"line", "text"}]}], 是否还有更多匹配的执行, 尚未索引完的执行 执行ID -> 日志文件路径)
+        """
+        self.update(task_id, log_files, max_bytes=SEARCH_SYNC_INDEX_BYTES)
+        unindexed = self._unindexed(task_id, log_files)
+        if unindexed:
+            # 剩余部分由后台线程继续索引
+            for log_file in unindexed.values():
+                self.notify(log_file)
+        visible = sorted((execution_id for execution_id in log_files if execution_id not in unindexed), reverse=True)
+        if not visible:
+            return [], False, unindexed
+
+        # LIKE带ESCAPE时无法使用trigram索引：关键字含通配符时不转义，查询后再按子串过滤
+        wildcard = "%" in keyword or "_" in keyword
+        pattern = f"%{keyword}%"
+        keyword_lower = keyword.lower()
+        per_execution = WILDCARD_ROWS_PER_EXECUTION if wildcard else lines_per_execution
+        scanned = 0
+        results = []
+        has_more = False
+        conn = self._connect(task_id)
+        try:
+            position = 0  # visible中下一个要查询的执行
+            while position < len(visible):
+                execution_id = visible[position]
+                start, end = self._rowid_range(execution_id)
+                rows = conn.execute(
+                    "SELECT rowid, text FROM lines WHERE text LIKE ? AND rowid BETWEEN ? AND ? ORDER BY rowid LIMIT ?",
+                    (pattern, start, end, per_execution)
+                ).fetchall()
+                if not rows:
+                    # 该执行没有匹配：由索引直接定位下一个有匹配行的执行，跳过中间没有匹配的执行
+                    row = conn.execute(
+                        "SELECT rowid FROM lines WHERE text LIKE ? AND rowid >= ? AND rowid < ? "
+                        "ORDER BY rowid DESC LIMIT 1",
+                        (pattern, self._rowid_range(visible[-1])[0], start)
+                    ).fetchone()
+                    if row is None:
+                        break
+                    position = bisect.bisect_left(visible, -(row[0] >> LINE_BITS), key=lambda value: -value)
+                    continue
+                position += 1
+
+                scanned += len(rows)
+                matches = []
+                for rowid, text in rows:
+                    if wildcard and keyword_lower not in text.lower():
+                        continue
+                    matches.append({"line": rowid & ((1 << LINE_BITS) - 1), "text": _snippet(text, keyword)})
+                    if len(matches) >= lines_per_execution:
+                        break
+                if matches:
+                    if len(results) >= limit:
+                        has_more = True
+                        break
+                    results.append({"execution_id": execution_id, "matches": matches})
+                if wildcard and scanned >= WILDCARD_MAX_ROWS:
+                    has_more = position < len(visible)
+                    break
+        finally:
+            conn.close()
+        return results, has_more, unindexed
+
+    def _unindexed(self, task_id: int, log_files: Dict[int, str]) -> Dict[int, str]:
+        """索引尚未追上日志文件完整行的执行"""
+        conn = self._connect(task_id)
+        try:
+            states = {
+                row[0]: row[1:] for row in conn.execute("SELECT execution_id, log_file, offset FROM files")
+            }
+        finally:
+            conn.close()
+        unindexed = {}
+        for execution_id, log_file in log_files.items():
+            path, offset = states.get(execution_id, (log_file, 0))
+            try:
+                size = log_storage.logical_size(log_file)
+            except OSError:
+                continue
+            # 末尾未写完的行不计入（下次写入换行后才索引）
+            if path != log_file or (size > offset and self._has_complete_line(log_file, offset, size)):
+                unindexed[execution_id] = log_file
+        return unindexed
+
+    @staticmethod
+    def _has_complete_line(log_file: str, offset: int, size: int) -> bool:
+        """offset之后是否有完整的行（运行中的执行末尾通常只有未写完的一行）"""
+        with log_storage.open_log(log_file) as f:
+            f.seek(offset)
+            while offset < size:
+                block = f.read(READ_BLOCK_SIZE)
+                if not block:
+                    return False
+                if b"\n" in block:
+                    return True
+                offset += len(block)
+        return False
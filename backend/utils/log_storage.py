@@ -0,0 +1,245 @@
+"""
+执行日志的压缩存储
+执行结束的日志在后台转换为按块压缩的格式（{日志}.z）：内容按固定大小分块，每块单独用zlib压缩，
+文件末尾保存各块的位置；读取时只解压需要的块，末尾N行、任意行范围和分页读取与未压缩时一样只读取所需部分。
+日志路径（执行记录中的log_file）不变，读取方通过 open_log/exists/logical_size 访问，不需要区分是否已压缩
+
+文件格式：
+    MAGIC | 压缩块... | 各块起始位置（块数+1个uint64，最后一个为索引自身的位置）| 尾部
+    尾部 = 索引位置、块数、原始大小（uint64）、块大小（uint32）、MAGIC
+"""
+import io
+import os
+import zlib
+import struct
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+# 压缩日志文件后缀
+COMPRESSED_SUFFIX = ".z"
+
+# 每块的原始大小
+BLOCK_SIZE = 256 * 1024
+
+# zlib压缩级别
+COMPRESS_LEVEL = 6
+
+# 读取时缓存的已解压块数
+CACHED_BLOCKS = 4
+
+MAGIC = b"PSLOGZ1\n"
+_FOOTER = struct.Struct("<QQQI8s")
+
+
+def compressed_path(log_file: str) -> str:
+    return log_file + COMPRESSED_SUFFIX
+
+
+def is_compressed(log_file: str) -> bool:
+    """日志是否已压缩（未压缩的原文件存在时以原文件为准）"""
+    return not os.path.exists(log_file) and os.path.exists(compressed_path(log_file))
+
+
+def exists(log_file: str) -> bool:
+    return os.path.exists(log_file) or os.path.exists(compressed_path(log_file))
+
+
+def open_log(log_file: str):
+    """以二进制只读方式打开日志，已压缩时返回可随机访问的解压读取器"""
+    try:
+        return open(log_file, "rb")
+    except FileNotFoundError:
+        if os.path.exists(compressed_path(log_file)):
+            return CompressedLogReader(compressed_path(log_file))
+        raise
+
+
+def size_of(f) -> int:
+    """open_log返回的文件的原始大小"""
+    if isinstance(f, CompressedLogReader):
+        return f.size
+    return os.fstat(f.fileno()).st_size
+
+
+def logical_size(log_file: str) -> int:
+    """日志原始大小（未压缩时的字节数）"""
+    try:
+        return os.path.getsize(log_file)
+    except FileNotFoundError:
+        if os.path.exists(compressed_path(log_file)):
+            return read_footer(compressed_path(log_file))[2]
+        raise
+
+
+def stored_size(log_file: str) -> int:
+    """日志实际占用的字节数"""
+    try:
+        return os.path.getsize(log_file)
+    except FileNotFoundError:
+        return os.path.getsize(compressed_path(log_file))
+
+
+def read_footer(path: str) -> Tuple[int, int, int, int]:
+    """
+    读取压缩文件尾部
+
+    Returns:
+        (索引位置, 块数, 原始大小, 块大小)
+    """
+    with open(path, "rb") as f:
+        f.seek(-_FOOTER.size, os.SEEK_END)
+        index_offset, block_count, size, block_size, magic = _FOOTER.unpack(f.read(_FOOTER.size))
+    if magic != MAGIC:
+        raise ValueError(f"不是压缩日志文件: {path}")
+    return index_offset, block_count, size, block_size
+
+
+def remove(log_file: str):
+    """删除日志（未压缩和已压缩的文件）"""
+    for path in (log_file, compressed_path(log_file)):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def compress(log_file: str) -> Optional[Tuple[int, int]]:
+    """
+    将日志转换为压缩格式，完成后删除原文件
+
+    Returns:
+        (原始大小, 压缩后大小)，压缩期间日志有新的写入时放弃并返回None
+    """
+    stat = os.stat(log_file)
+    target = compressed_path(log_file)
+    temp = f"{target}.{os.getpid()}.tmp"
+    offsets = []
+    try:
+        with open(log_file, "rb") as src, open(temp, "wb") as dst:
+            dst.write(MAGIC)
+            size = 0
+            while True:
+                block = src.read(BLOCK_SIZE)
+                if not block:
+                    break
+                offsets.append(dst.tell())
+                dst.write(zlib.compress(block, COMPRESS_LEVEL))
+                size += len(block)
+            index_offset = dst.tell()
+            offsets.append(index_offset)
+            dst.write(struct.pack(f"<{len(offsets)}Q", *offsets))
+            dst.write(_FOOTER.pack(index_offset, len(offsets) - 1, size, BLOCK_SIZE, MAGIC))
+            dst.flush()
+            os.fsync(dst.fileno())
+        if os.path.getsize(log_file) != size:
+            os.remove(temp)
+            return None
+        # 保留修改时间（日志列表按修改时间排序）
+        os.utime(temp, (stat.st_atime, stat.st_mtime))
+        os.replace(temp, target)
+        os.remove(log_file)
+        return size, os.path.getsize(target)
+    except BaseException:
+        if os.path.exists(temp):
+            os.remove(temp)
+        raise
+
+
+def decompress(log_file: str):
+    """恢复为未压缩的日志（已压缩的日志需要追加写入时）"""
+    source = compressed_path(log_file)
+    temp = f"{log_file}.{os.getpid()}.tmp"
+    stat = os.stat(source)
+    with CompressedLogReader(source) as src, open(temp, "wb") as dst:
+        while True:
+            data = src.read(BLOCK_SIZE)
+            if not data:
+                break
+            dst.write(data)
+    os.utime(temp, (stat.st_atime, stat.st_mtime))
+    os.replace(temp, log_file)
+    os.remove(source)
+
+
+class CompressedLogReader(io.RawIOBase):
+    """压缩日志的随机访问读取器，接口与二进制文件一致（seek/tell/read/readline）"""
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.name = path
+        index_offset, block_count, self.size, self.block_size = read_footer(path)
+        self._file = open(path, "rb")
+        self._file.seek(index_offset)
+        self._offsets = struct.unpack(f"<{block_count + 1}Q", self._file.read(8 * (block_count + 1)))
+        self._position = 0
+        self._cache = OrderedDict()
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        if whence == os.SEEK_CUR:
+            offset += self._position
+        elif whence == os.SEEK_END:
+            offset += self.size
+        if offset < 0:
+            raise ValueError(f"negative seek position {offset}")
+        self._position = offset
+        return offset
+
+    def _block(self, number: int) -> bytes:
+        block = self._cache.get(number)
+        if block is None:
+            self._file.seek(self._offsets[number])
+            block = zlib.decompress(self._file.read(self._offsets[number + 1] - self._offsets[number]))
+            self._cache[number] = block
+            if len(self._cache) > CACHED_BLOCKS:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(number)
+        return block
+
+    def read(self, size: int = -1) -> bytes:
+        end = self.size if size is None or size < 0 else min(self.size, self._position + size)
+        parts = []
+        while self._position < end:
+            number, start = divmod(self._position, self.block_size)
+            part = self._block(number)[start:start + end - self._position]
+            parts.append(part)
+            self._position += len(part)
+        return b"".join(parts)
+
+    read1 = read
+
+    def readall(self) -> bytes:
+        return self.read()
+
+    def readinto(self, buffer) -> int:
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def readline(self, size: int = -1) -> bytes:
+        parts = []
+        while self._position < self.size and size != 0:
+            number, start = divmod(self._position, self.block_size)
+            block = self._block(number)
+            newline = block.find(b"\n", start)
+            end = len(block) if newline < 0 else newline + 1
+            if size > 0:
+                end = min(end, start + size)
+                size -= end - start
+            parts.append(block[start:end])
+            self._position += end - start
+            if newline >= 0 and end == newline + 1:
+                break
+        return b"".join(parts)
+
+    def close(self):
+        if not self.closed:
+            self._file.close()
+        super().close()
@@ -0,0 +1,123 @@
+"""
+任务输出暂存文件
+子进程的stdout/stderr不连接到后端进程的管道，而是写入日志旁的追加模式文件（{日志}.stdout / {日志}.stderr），
+由后端持续读取新增内容写入执行日志。后端重启后子进程仍可正常输出（不会因管道读端关闭收到SIGPIPE），
+重新接管的后端从记录的位置（{日志}.spool）继续读取；执行结束后删除暂存文件
+"""
+import os
+import struct
+import logging
+from typing import Dict, Optional, Tuple
+
+from utils.task_logger import LogStream, STREAM_CHUNK_SIZE
+
+logger = logging.getLogger(__name__)
+
+STREAMS = ("stdout", "stderr")
+
+# 读取位置记录：stdout、stderr已写入日志的字节数
+_STATE = struct.Struct("<QQ")
+
+
+def spool_path(log_file: str, stream_name: str) -> str:
+    """输出流暂存文件路径"""
+    return f"{log_file}.{stream_name}"
+
+
+def state_path(log_file: str) -> str:
+    """读取位置记录文件路径"""
+    return f"{log_file}.spool"
+
+
+def exists(log_file: str) -> bool:
+    """执行的输出是否写入暂存文件（旧版本启动的执行直接连接管道，没有暂存文件）"""
+    return bool(log_file) and all(os.path.exists(spool_path(log_file, name)) for name in STREAMS)
+
+
+def open_for_child(log_file: str) -> Tuple[int, int]:
+    """
+    创建暂存文件并以追加模式打开，返回 (stdout_fd, stderr_fd)
+
+    文件描述符交给子进程作为stdout/stderr，调用方在子进程启动后关闭
+    """
+    fds = []
+    try:
+        for name in STREAMS:
+            fds.append(os.open(spool_path(log_file, name), os.O_WRONLY | os.O_APPEND | os.O_CREAT | os.O_CLOEXEC, 0o644))
+    except BaseException:
+        for fd in fds:
+            os.close(fd)
+        raise
+    return fds[0], fds[1]
+
+
+def remove(log_file: str):
+    """删除暂存文件和读取位置记录"""
+    for path in [spool_path(log_file, name) for name in STREAMS] + [state_path(log_file)]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+class SpoolReader:
+    """
+    读取暂存文件的新增内容写入日志流
+
+    每次写入日志后记录读取位置（扣除日志流中尚未写出的未完成行），
+    后端重启后从该位置继续读取，不丢失已写入暂存文件的输出
+    """
+
+    def __init__(self, log_file: str, log_stream: LogStream, tail_size: int = 0):
+        self.log_file = log_file
+        self.log_stream = log_stream
+        self.tail_size = tail_size
+        self.stderr_tail = bytearray()  # 保留stderr末尾的tail_size字节，用于判断超限原因
+        self.offsets: Dict[str, int] = dict.fromkeys(STREAMS, 0)
+        self._files = {}
+        self._state_fd: Optional[int] = None
+        try:
+            self._state_fd = os.open(state_path(log_file), os.O_RDWR | os.O_CREAT | os.O_CLOEXEC, 0o644)
+            data = os.pread(self._state_fd, _STATE.size, 0)
+            if len(data) == _STATE.size:
+                self.offsets = dict(zip(STREAMS, _STATE.unpack(data)))
+            for name in STREAMS:
+                self._files[name] = open(spool_path(log_file, name), 'rb')
+        except BaseException:
+            self.close(remove_files=False)
+            raise
+
+    def pump(self) -> int:
+        """读取各输出流当前已写入的全部新内容，返回读取的字节数"""
+        total = 0
+        for name in STREAMS:
+            spool = self._files[name]
+            spool.seek(self.offsets[name])
+            while True:
+                data = spool.read(STREAM_CHUNK_SIZE)
+                if not data:
+                    break
+                self.log_stream.write_chunk(name, data)
+                if name == "stderr" and self.tail_size:
+                    self.stderr_tail.extend(data[-self.tail_size:])
+                    del self.stderr_tail[:-self.tail_size]
+                self.offsets[name] += len(data)
+                total += len(data)
+        if total:
+            self._save()
+        return total
+
+    def _save(self):
+        saved = [max(0, self.offsets[name] - self.log_stream.pending_bytes(name)) for name in STREAMS]
+        os.pwrite(self._state_fd, _STATE.pack(*saved), 0)
+
+    def close(self, remove_files: bool = True):
+        """关闭暂存文件，remove_files为True时删除（输出已全部写入日志）"""
+        for spool in self._files.values():
+            spool.close()
+        self._files = {}
+        if self._state_fd is not None:
+            os.close(self._state_fd)
+            self._state_fd = None
+        if remove_files:
+            remove(self.log_file)
@@ -0,0 +1,84 @@
+"""
+任务重叠执行控制
+同一任务同时运行的实例数超过max_instances时，按任务的重叠策略跳过或排队；
+判断在锁定任务行的事务中进行，多线程、多节点同时触发时结果一致
+"""
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from models import Task, TaskExecution, TaskStatus, OverlapPolicy
+from utils.schedule_triggers import is_sub_minute
+
+# 因重叠被跳过或排队的执行记录的status_reason
+REASON_OVERLAP = "overlap"
+
+# 任务暂停期间到期的重试、排队后重新分发的执行保持排队的status_reason，任务恢复后启动
+REASON_PAUSED = "paused"
+
+
+def lock_task(db: Session, task_id: int) -> Optional[Task]:
+    """锁定任务行（SELECT ... FOR UPDATE），直到当前事务提交"""
+    return db.query(Task).filter(Task.id == task_id).with_for_update().first()
+
+
+def overflow_status(db: Session, task: Task, exclude_id: int = None) -> Optional[TaskStatus]:
+    """
+    判断本次执行能否开始
+
+    Args:
+        db: 已锁定任务行的会话
+        task: 任务
+        exclude_id: 不计入运行数的执行记录ID（即本次执行自身）
+
+    Returns:
+        可以执行时返回None，否则返回应记录的状态（QUEUED或SKIPPED）；
+        秒级触发的任务最多保留一个排队的执行，其余跳过，避免执行慢于触发时排队无限增长；
+        扇出子执行属于父执行的同一个实例，不计入运行数
+    """
+    query = db.query(func.count(TaskExecution.id)).filter(
+        TaskExecution.task_id == task.id,
+        TaskExecution.status == TaskStatus.RUNNING,
+        TaskExecution.parent_execution_id.is_(None)
+    )
+    if exclude_id is not None:
+        query = query.filter(TaskExecution.id != exclude_id)
+
+    if query.scalar() < (task.max_instances or 1):
+        return None
+    if task.overlap_policy == OverlapPolicy.QUEUE.value:
+        if is_sub_minute(task) and _has_queued(db, task.id, exclude_id):
+            return TaskStatus.SKIPPED
+        return TaskStatus.QUEUED
+    return TaskStatus.SKIPPED
+
+
+def _has_queued(db: Session, task_id: int, exclude_id: int = None) -> bool:
+    """任务是否已有排队的执行（不含扇出子执行）"""
+    query = db.query(TaskExecution.id).filter(
+        TaskExecution.task_id == task_id,
+        TaskExecution.status == TaskStatus.QUEUED,
+        TaskExecution.parent_execution_id.is_(None)
+    )
+    if exclude_id is not None:
+        query = query.filter(TaskExecution.id != exclude_id)
+    return query.first() is not None
+
+
+def held_by_pause(task: Task, trigger_type: str, from_queue: bool = False) -> bool:
+    """
+    任务已暂停时，重试和排队后重新分发的执行不启动，保持排队到任务恢复
+
+    暂停只停止调度触发，手动执行照常运行；依赖和文件触发在触发时已检查暂停状态
+    """
+    return bool(task.is_paused) and (trigger_type == "retry" or from_queue)
+
+
+def deferred_values(status: TaskStatus, reason: str = REASON_OVERLAP) -> dict:
+    """跳过或排队时执行记录应写入的字段"""
+    values = {"status": status, "status_reason": reason}
+    if status == TaskStatus.SKIPPED:
+        values["end_time"] = datetime.now()
+    return values
@@ -21,6 +21,9 @@ LOGS_ROOT = os.getenv('LOGS_ROOT', os.path.join(PROJECT_ROOT, 'logs'))
 # 上传文件目录
 UPLOADS_DIR = os.path.join(PROJECT_ROOT, 'backend', 'uploads')
 
+# 工作区目录（与routers/workspace.py一致，位于backend/work）
+WORKSPACE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'work')
+
 
 def get_task_data_dir(task_id: int) -> str:
     """
@@ -108,6 +111,19 @@ def get_execution_log_file(task_id: int, execution_id: int, timestamp: str) -> s
     )
 
 
+def get_workspace_dir(relative_path: str = '') -> str:
+    """
+    获取工作区中的目录
+    
+    Args:
+        relative_path: 相对于工作区根目录的路径
+        
+    Returns:
+        目录路径
+    """
+    return os.path.normpath(os.path.join(WORKSPACE_DIR, relative_path.lstrip('/')))
+
+
 def ensure_dir(directory: str) -> str:
     """
     确保目录存在，不存在则创建
@@ -0,0 +1,211 @@
+"""
+任务子进程运行工具
+基于asyncio启动子进程，将stdout/stderr按块实时写入执行日志，不在内存中缓存完整输出；
+子进程的输出先写入暂存文件（见output_spool），后端重启后进程仍能继续输出并被重新接管
+子进程可以直接启动新解释器，也可以由预热的fork-server派生；两种方式都由wait4回收子进程，取得精确的资源占用
+"""
+import os
+import signal
+import asyncio
+import logging
+import threading
+import subprocess
+from typing import Callable, List, Optional
+
+from utils import output_spool
+from utils.task_logger import LogStream
+from utils.forkserver import ForkServerClient, rusage_to_dict
+from utils.resource_usage import ProcessSampler, from_rusage, merge_sampled
+from utils.resource_limits import ResourceLimits
+
+logger = logging.getLogger(__name__)
+
+# 读取输出暂存文件的间隔（秒）：有新输出时按最小间隔读取，空闲时逐步加倍到最大间隔
+SPOOL_POLL_MIN_SECONDS = 0.02
+SPOOL_POLL_MAX_SECONDS = 0.25
+
+# 保留stderr末尾的字节数，用于判断超限原因
+STDERR_TAIL_SIZE = 4096
+
+
+class ProcessResult:
+    """子进程运行结果"""
+
+    def __init__(self, returncode: Optional[int], timed_out: bool = False, usage: Optional[dict] = None,
+                 limit_reason: Optional[str] = None):
+        self.returncode = returncode
+        self.timed_out = timed_out
+        self.usage = usage  # 资源占用，字段见resource_usage.USAGE_FIELDS
+        self.limit_reason = limit_reason  # 超出资源限制的原因，见resource_limits.REASON_*
+
+
+class DirectProcess:
+    """直接启动的子进程，接口与asyncio.subprocess.Process保持一致
+
+    不交给asyncio的子进程监视器（其waitpid会丢弃rusage），进程退出后由wait4回收：
+    支持pidfd时在事件循环中等待pidfd可读，否则由单独的线程阻塞等待
+    """
+
+    def __init__(self, popen: subprocess.Popen):
+        self.pid = popen.pid
+        self.returncode: Optional[int] = None
+        self.rusage: Optional[dict] = None
+        self._popen = popen
+        self._loop = asyncio.get_running_loop()
+        self._exited = self._loop.create_future()
+        self._watch()
+
+    def _watch(self):
+        try:
+            pidfd = os.pidfd_open(self.pid)
+        except (AttributeError, OSError):
+            threading.Thread(target=self._reap_in_thread, name=f"reap-{self.pid}", daemon=True).start()
+            return
+
+        def on_exit():
+            self._loop.remove_reader(pidfd)
+            os.close(pidfd)
+            self._set_result(*self._reap())
+
+        self._loop.add_reader(pidfd, on_exit)
+
+    def _reap_in_thread(self):
+        self._loop.call_soon_threadsafe(self._set_result, *self._reap())
+
+    def _reap(self):
+        """回收子进程，返回 (退出码, rusage)；pidfd可读时立即返回，线程方式下阻塞到进程退出"""
+        try:
+            _, status, rusage = os.wait4(self.pid, 0)
+        except ChildProcessError:
+            # 已被其他地方回收，无法获知真实退出码
+            return -1, None
+        return os.waitstatus_to_exitcode(status), rusage_to_dict(rusage)
+
+    def _set_result(self, returncode: int, rusage: Optional[dict]):
+        self.returncode = returncode
+        self.rusage = rusage
+        self._popen.returncode = returncode
+        if not self._exited.done():
+            self._exited.set_result(returncode)
+
+    async def wait(self) -> int:
+        """等待子进程结束"""
+        return await asyncio.shield(self._exited)
+
+
+def _spawn_direct(command: List[str], env: dict, cwd: str, stdout_fd: int, stderr_fd: int) -> DirectProcess:
+    popen = subprocess.Popen(
+        command,
+        stdout=stdout_fd,
+        stderr=stderr_fd,
+        env=env,
+        cwd=cwd,
+        start_new_session=True  # 独立进程组，超限时连同脚本派生的进程一起结束
+    )
+    return DirectProcess(popen)
+
+
+async def _pump(spool: output_spool.SpoolReader, exited: asyncio.Future):
+    """持续读取输出暂存文件写入日志，进程结束后读完剩余输出返回（遗留的孙进程之后的输出不再采集）"""
+    delay = SPOOL_POLL_MIN_SECONDS
+    while True:
+        finished = exited.done()
+        if spool.pump():
+            delay = SPOOL_POLL_MIN_SECONDS
+        elif finished:
+            return
+        else:
+            await asyncio.wait([exited], timeout=delay)
+            delay = min(delay * 2, SPOOL_POLL_MAX_SECONDS)
+
+
+def _kill_group(process):
+    """结束子进程所在的整个进程组（子进程以新会话启动，进程组ID即其PID）"""
+    _kill_pid_group(process.pid)
+
+
+def _kill_pid_group(pid: int):
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+async def run_process(command: List[str], env: dict, cwd: str, log_stream: LogStream,
+                      timeout: float, forkserver: Optional[ForkServerClient] = None,
+                      limits: Optional[ResourceLimits] = None,
+                      on_spawn: Optional[Callable[[int], None]] = None) -> ProcessResult:
+    """
+    运行子进程并流式记录输出
+
+    Args:
+        command: 命令及参数
+        env: 环境变量
+        cwd: 工作目录
+        log_stream: 日志流写入器
+        timeout: 超时时间（秒）
+        forkserver: fork-server客户端，传入时由预热进程派生子进程
+        limits: 资源限制，在子进程启动时应用
+        on_spawn: 子进程启动后以其PID调用（子进程以新会话启动，PID同时是进程组ID）
+
+    Returns:
+        ProcessResult
+    """
+    stdout_fd, stderr_fd = output_spool.open_for_child(log_stream.log_file)
+    try:
+        if forkserver:
+            process = await forkserver.spawn(command, env=env, cwd=cwd, stdout_fd=stdout_fd, stderr_fd=stderr_fd,
+                                             limits=limits)
+        else:
+            # 资源限制由启动器在exec之前设置（调度进程是多线程的，不能使用preexec_fn）
+            process = _spawn_direct(limits.wrap_command(command) if limits else command, env, cwd,
+                                    stdout_fd, stderr_fd)
+    except BaseException:
+        output_spool.remove(log_stream.log_file)
+        raise
+    finally:
+        os.close(stdout_fd)
+        os.close(stderr_fd)
+
+    if on_spawn:
+        on_spawn(process.pid)
+
+    # CPU、IO和上下文切换取wait4的精确值；直接启动的进程运行期间还采样/proc，
+    # 补充脚本未回收的后代进程和整个进程树的内存峰值
+    sampler = None
+    if not forkserver:
+        sampler = ProcessSampler(process.pid)
+        sampler.start()
+
+    spool = output_spool.SpoolReader(log_stream.log_file, log_stream, tail_size=STDERR_TAIL_SIZE)
+    exited = asyncio.ensure_future(process.wait())
+    pump = asyncio.ensure_future(_pump(spool, exited))
+
+    timed_out = False
+    try:
+        await asyncio.wait_for(asyncio.shield(exited), timeout=timeout)
+    except asyncio.TimeoutError:
+        timed_out = True
+        _kill_group(process)
+        await exited
+
+    usage = from_rusage(process.rusage) if process.rusage else None
+    if sampler:
+        usage = merge_sampled(usage, await sampler.stop())
+
+    # 进程结束后读完暂存文件中剩余的输出
+    try:
+        await pump
+    except Exception as e:
+        logger.error(f"读取子进程输出失败: {e}")
+    spool.close()
+    stderr_tail = spool.stderr_tail
+
+    limit_reason = None
+    if limits:
+        limit_reason = limits.breach_reason(process.returncode, timed_out, bytes(stderr_tail), usage)
+        if limit_reason and not timed_out:
+            # 脚本已因超限退出，清理其遗留的子进程
+            _kill_group(process)
+
+    return ProcessResult(process.returncode, timed_out=timed_out, usage=usage, limit_reason=limit_reason)
@@ -0,0 +1,151 @@
+"""
+任务进程资源限制
+在子进程启动时设置rlimit、nice和ionice，运行结束后判断是否因超出限制而终止；
+直接启动的进程经limit_exec启动器在exec之前设置限制，不在多线程的调度进程中使用preexec_fn
+"""
+import os
+import sys
+import json
+import signal
+import logging
+from typing import List, Optional
+
+from config import settings
+from utils import limit_exec
+
+logger = logging.getLogger(__name__)
+
+# 启动器脚本路径
+LAUNCHER = os.path.abspath(limit_exec.__file__)
+
+# 超限原因（写入TaskExecution.status_reason）
+REASON_TIMEOUT = "timeout"
+REASON_MEMORY = "memory_limit"
+REASON_CPU = "cpu_limit"
+REASON_OPEN_FILES = "open_files_limit"
+
+REASON_MESSAGES = {
+    REASON_TIMEOUT: "执行超时（超过{timeout_seconds}秒）",
+    REASON_MEMORY: "内存超出限制（{memory_limit_mb}MB）",
+    REASON_CPU: "CPU时间超出限制（{cpu_limit_seconds}秒）",
+    REASON_OPEN_FILES: "打开文件数超出限制（{max_open_files}）",
+}
+
+# 进程因超限失败时stderr中的特征输出
+STDERR_MARKERS = (
+    (REASON_MEMORY, (b"MemoryError", b"Cannot allocate memory", b"std::bad_alloc")),
+    (REASON_OPEN_FILES, (b"Too many open files",)),
+)
+
+
+class ResourceLimits:
+    """单次执行的资源限制，未设置的项不限制"""
+
+    FIELDS = ("timeout_seconds", "memory_limit_mb", "cpu_limit_seconds", "nice_level",
+              "ionice_class", "max_open_files")
+
+    def __init__(self, timeout_seconds: int, memory_limit_mb: Optional[int] = None,
+                 cpu_limit_seconds: Optional[int] = None, nice_level: Optional[int] = None,
+                 ionice_class: Optional[str] = None, max_open_files: Optional[int] = None):
+        self.timeout_seconds = timeout_seconds
+        self.memory_limit_mb = memory_limit_mb
+        self.cpu_limit_seconds = cpu_limit_seconds
+        self.nice_level = nice_level
+        self.ionice_class = ionice_class
+        self.max_open_files = max_open_files
+
+    @classmethod
+    def for_task(cls, task) -> "ResourceLimits":
+        """根据任务配置生成资源限制，任务未配置的项使用全局默认值"""
+        return cls(
+            timeout_seconds=task.timeout_seconds or settings.TASK_DEFAULT_TIMEOUT_SECONDS,
+            memory_limit_mb=task.memory_limit_mb or settings.TASK_DEFAULT_MEMORY_LIMIT_MB or None,
+            cpu_limit_seconds=task.cpu_limit_seconds or None,
+            nice_level=task.nice_level,
+            ionice_class=task.ionice_class,
+            max_open_files=task.max_open_files or None,
+        )
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ResourceLimits":
+        return cls(**{field: data.get(field) for field in cls.FIELDS})
+
+    def to_dict(self) -> dict:
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    def spawn_limits(self) -> dict:
+        """启动时需要应用的限制项（未设置的项不包含）"""
+        return {field: getattr(self, field) for field in limit_exec.SPAWN_FIELDS
+                if getattr(self, field) is not None}
+
+    def apply(self):
+        """在当前进程中应用限制（用于单线程的进程，如fork-server派生的子进程）"""
+        limit_exec.apply_limits(self.spawn_limits())
+
+    def wrap_command(self, command: List[str]) -> List[str]:
+        """
+        直接启动子进程时使用的命令：有需要在启动时应用的限制时由limit_exec启动器设置后exec原命令
+
+        Args:
+            command: 原命令及参数
+
+        Returns:
+            实际启动的命令
+        """
+        spawn_limits = self.spawn_limits()
+        if not spawn_limits:
+            return list(command)
+        # 只有设置ionice时需要site-packages中的psutil，其余情况跳过site加快启动
+        flags = ["-I"] if self.ionice_class else ["-I", "-S"]
+        return [sys.executable, *flags, LAUNCHER, json.dumps(spawn_limits), *command]
+
+    def breach_reason(self, returncode: Optional[int], timed_out: bool, stderr_tail: bytes,
+                      usage: Optional[dict] = None) -> Optional[str]:
+        """
+        判断进程是否因超出限制而结束
+
+        Args:
+            returncode: 退出码（被信号终止时为负数）
+            timed_out: 是否超时
+            stderr_tail: stderr末尾输出
+            usage: 资源占用
+
+        Returns:
+            超限原因，未超限返回None
+        """
+        if timed_out:
+            return REASON_TIMEOUT
+        if returncode == 0:
+            return None
+
+        if self.cpu_limit_seconds:
+            if returncode == -signal.SIGXCPU:
+                return REASON_CPU
+            cpu_used = (usage or {}).get("cpu_user_seconds", 0) + (usage or {}).get("cpu_system_seconds", 0)
+            if returncode == -signal.SIGKILL and cpu_used >= self.cpu_limit_seconds:
+                return REASON_CPU
+
+        configured = {REASON_MEMORY: self.memory_limit_mb, REASON_OPEN_FILES: self.max_open_files}
+        for reason, markers in STDERR_MARKERS:
+            if configured[reason] and any(marker in stderr_tail for marker in markers):
+                return reason
+        return None
+
+    def describe(self, reason: str) -> str:
+        """超限原因的说明文字"""
+        return REASON_MESSAGES[reason].format(**self.to_dict())
+
+    def summary(self) -> str:
+        """日志头部展示的限制说明"""
+        parts = [f"超时 {self.timeout_seconds}秒"]
+        if self.memory_limit_mb:
+            parts.append(f"内存 {self.memory_limit_mb}MB")
+        if self.cpu_limit_seconds:
+            parts.append(f"CPU {self.cpu_limit_seconds}秒")
+        if self.max_open_files:
+            parts.append(f"文件数 {self.max_open_files}")
+        if self.nice_level is not None:
+            parts.append(f"nice {self.nice_level}")
+        if self.ionice_class:
+            parts.append(f"ionice {self.ionice_class}")
+        return ", ".join(parts)
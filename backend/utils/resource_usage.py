@@ -0,0 +1,158 @@
+"""
+任务进程资源占用统计
+以回收子进程时wait4返回的rusage为准（精确值，运行时间很短的进程也能统计到）；
+直接启动的子进程在运行期间还通过psutil采样/proc，补充脚本未回收的后代进程和整个进程树的内存峰值
+"""
+import asyncio
+import logging
+from typing import Optional
+
+import psutil
+
+logger = logging.getLogger(__name__)
+
+# 采样间隔（秒），从首个间隔开始逐次翻倍直到上限，短任务也能采到数据
+FIRST_SAMPLE_INTERVAL = 0.1
+SAMPLE_INTERVAL = 1.0
+
+# rusage中块IO的计数单位（字节）
+RUSAGE_BLOCK_SIZE = 512
+
+# 执行记录中的资源占用字段
+USAGE_FIELDS = (
+    "cpu_user_seconds",
+    "cpu_system_seconds",
+    "max_rss_kb",
+    "io_read_bytes",
+    "io_write_bytes",
+    "ctx_switches_voluntary",
+    "ctx_switches_involuntary",
+)
+
+
+def from_rusage(rusage: dict) -> dict:
+    """
+    将wait4返回的rusage转换为执行记录字段
+
+    Args:
+        rusage: forkserver.rusage_to_dict的结果
+
+    Returns:
+        资源占用字典
+    """
+    return {
+        "cpu_user_seconds": round(rusage["ru_utime"], 3),
+        "cpu_system_seconds": round(rusage["ru_stime"], 3),
+        "max_rss_kb": rusage["ru_maxrss"],  # Linux下单位为KB
+        "io_read_bytes": rusage["ru_inblock"] * RUSAGE_BLOCK_SIZE,
+        "io_write_bytes": rusage["ru_oublock"] * RUSAGE_BLOCK_SIZE,
+        "ctx_switches_voluntary": rusage["ru_nvcsw"],
+        "ctx_switches_involuntary": rusage["ru_nivcsw"],
+    }
+
+
+def merge_sampled(usage: Optional[dict], sampled: dict) -> dict:
+    """
+    合并wait4的rusage与运行期间的采样值
+
+    rusage只包含子进程及其已回收的后代，采样值包含采样时仍在运行的整个进程树（但缺少最后一个采样间隔）；
+    累计值取两者中较大的值。内存以采样峰值为准：Linux下exec之后的ru_maxrss包含fork出的子进程在exec之前
+    （即调度进程自身）的常驻内存，不能代表脚本的内存占用，未采样到时记为None
+
+    Args:
+        usage: from_rusage的结果，子进程未能由wait4回收时为None
+        sampled: ProcessSampler.stop的结果
+
+    Returns:
+        资源占用字典
+    """
+    if usage is None:
+        return sampled
+    merged = {field: max(usage[field], sampled[field]) for field in USAGE_FIELDS}
+    merged["max_rss_kb"] = sampled["max_rss_kb"] or None
+    return merged
+
+
+class ProcessSampler:
+    """运行期间周期采样子进程（含其派生的子进程）的资源占用
+
+    CPU时间、IO和上下文切换为累计值，取最后一次采样；内存取各次采样中进程树常驻内存之和的峰值。
+    进程退出前最后不足一个采样间隔的占用不会被统计，最终结果与wait4的rusage合并（见merge_sampled）
+    """
+
+    def __init__(self, pid: int, interval: float = SAMPLE_INTERVAL):
+        self.pid = pid
+        self.interval = interval
+        self.usage = {field: 0 for field in USAGE_FIELDS}
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """在当前事件循环中启动采样"""
+        self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> dict:
+        """停止采样并返回资源占用"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        return dict(self.usage)
+
+    async def _run(self):
+        try:
+            root = psutil.Process(self.pid)
+        except psutil.Error:
+            return
+        interval = min(FIRST_SAMPLE_INTERVAL, self.interval)
+        while True:
+            try:
+                self._sample(root)
+            except psutil.Error:
+                return
+            await asyncio.sleep(interval)
+            interval = min(interval * 2, self.interval)
+
+    def _sample(self, root: psutil.Process):
+        processes = [root]
+        try:
+            processes.extend(root.children(recursive=True))
+        except psutil.Error:
+            pass
+
+        totals = {field: 0 for field in USAGE_FIELDS}
+        rss = 0
+        for proc in processes:
+            try:
+                with proc.oneshot():
+                    cpu = proc.cpu_times()
+                    memory = proc.memory_info()
+                    ctx = proc.num_ctx_switches()
+                    try:
+                        io = proc.io_counters()
+                    except (psutil.AccessDenied, AttributeError):
+                        io = None
+            except psutil.Error:
+                # 进程在采样过程中退出
+                if proc is root:
+                    raise
+                continue
+
+            # children_*为已回收子进程的CPU时间
+            totals["cpu_user_seconds"] += cpu.user + cpu.children_user
+            totals["cpu_system_seconds"] += cpu.system + cpu.children_system
+            totals["ctx_switches_voluntary"] += ctx.voluntary
+            totals["ctx_switches_involuntary"] += ctx.involuntary
+            if io:
+                totals["io_read_bytes"] += io.read_bytes
+                totals["io_write_bytes"] += io.write_bytes
+            rss += memory.rss
+
+        # 累计值只增不减，避免子进程退出后采样值回落
+        for field in USAGE_FIELDS:
+            if field != "max_rss_kb":
+                self.usage[field] = max(self.usage[field], totals[field])
+        self.usage["cpu_user_seconds"] = round(self.usage["cpu_user_seconds"], 3)
+        self.usage["cpu_system_seconds"] = round(self.usage["cpu_system_seconds"], 3)
+        self.usage["max_rss_kb"] = max(self.usage["max_rss_kb"], rss // 1024)
@@ -0,0 +1,53 @@
+"""
+任务失败重试策略
+按任务配置的最大尝试次数、初始间隔、退避倍数和可重试的退出码，判断失败后是否重试及重试间隔
+"""
+from typing import Optional, Set
+
+from utils.execution_recovery import REASON_LOST, REASON_EXIT_UNKNOWN
+
+# 单次重试间隔上限（秒）
+RETRY_MAX_DELAY_SECONDS = 86400
+
+# 不重试的失败原因：执行是否真正失败未知
+NON_RETRYABLE_REASONS = (REASON_LOST, REASON_EXIT_UNKNOWN)
+
+
+def parse_exit_codes(value: Optional[str]) -> Set[int]:
+    """解析逗号分隔的退出码，如 "1, 2, -9" """
+    if not value:
+        return set()
+    return {int(code) for code in value.split(",") if code.strip()}
+
+
+def should_retry(task, attempt: int, exit_code: Optional[int], reason: Optional[str] = None) -> bool:
+    """
+    判断失败的执行是否需要重试
+
+    Args:
+        task: 任务
+        attempt: 失败的执行是第几次尝试（从1开始）
+        exit_code: 退出码
+        reason: 失败原因（status_reason）
+
+    Returns:
+        是否重试
+    """
+    if attempt >= (task.retry_max_attempts or 1):
+        return False
+    if reason in NON_RETRYABLE_REASONS:
+        return False
+    codes = parse_exit_codes(task.retry_on_exit_codes)
+    return not codes or exit_code in codes
+
+
+def backoff_seconds(task, attempt: int) -> float:
+    """
+    第attempt次尝试失败后，到下一次尝试的等待时间：初始间隔 × 退避倍数^(attempt-1)
+
+    Args:
+        task: 任务
+        attempt: 失败的执行是第几次尝试（从1开始）
+    """
+    delay = (task.retry_delay_seconds or 0) * (task.retry_backoff_factor or 1) ** (attempt - 1)
+    return min(delay, RETRY_MAX_DELAY_SECONDS)
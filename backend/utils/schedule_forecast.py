@@ -0,0 +1,243 @@
+"""
+调度负载预测
+批量计算所有活跃任务在时间窗口内的触发时间，结合各任务历史执行时长的中位数，
+按分钟给出并发执行数和CPU需求的预测
+
+触发时间不逐个调用CronTrigger计算：cron的每个字段按取值预先算出匹配掩码（按字段表达式缓存），
+窗口内的触发秒数由 日期掩码 x 小时掩码 x 分钟掩码 x 秒掩码 的外积一次得到；
+调度配置相同的任务共用触发时间，各自的错峰偏移和执行时长汇总为平移量直方图，
+并发数由开始/结束时刻做差分后累加得到，整个计算只按调度配置循环
+"""
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from apscheduler.triggers.cron import CronTrigger
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from models import TaskExecution, TaskStatus
+from utils.schedule_triggers import INTERVAL_ANCHOR
+
+# 时间窗口上限（分钟）
+MAX_WINDOW_MINUTES = 7 * 24 * 60
+
+# 窗口开始前已在运行的执行最多回溯的时长（秒）
+MAX_LOOKBACK_SECONDS = 24 * 3600
+
+# 计算执行时长中位数时每个任务取最近的执行数
+HISTORY_RUNS = 10
+
+# 没有历史执行记录的任务的估算值
+DEFAULT_DURATION_SECONDS = 60
+DEFAULT_CPU_CORES = 1.0
+
+# 日期相关的cron字段（匹配结果取决于具体日期）
+_DATE_FIELDS = ("year", "month", "day", "week", "day_of_week")
+
+# 固定取值范围的cron字段：字段 -> (取值个数, 构造该取值对应日期的函数)
+_VALUE_FIELDS = {
+    "hour": (24, lambda v: datetime(2001, 1, 1, v)),
+    "minute": (60, lambda v: datetime(2001, 1, 1, 0, v)),
+    "second": (60, lambda v: datetime(2001, 1, 1, 0, 0, v)),
+}
+
+
+class ForecastTask(NamedTuple):
+    task_id: int
+    cron_expression: Optional[str]
+    interval_seconds: Optional[int]
+    offset_seconds: int  # 错峰偏移
+    duration_seconds: float  # 预计执行时长
+    cpu_cores: float  # 执行期间平均占用的CPU核数
+    max_instances: int
+
+
+@lru_cache(maxsize=4096)
+def _field(name: str, expression: str):
+    return CronTrigger.FIELDS_MAP[name](name, expression, is_default=False)
+
+
+def _matches(field, dateval: datetime) -> bool:
+    return field.get_next_value(dateval) == field.get_value(dateval)
+
+
+@lru_cache(maxsize=4096)
+def _value_mask(name: str, expression: str) -> np.ndarray:
+    """小时/分钟/秒字段的匹配掩码"""
+    size, make_date = _VALUE_FIELDS[name]
+    field = _field(name, expression)
+    return np.array([_matches(field, make_date(v)) for v in range(size)], dtype=bool)
+
+
+@lru_cache(maxsize=256)
+def _day_mask(date_fields: tuple, first_day: datetime, days: int) -> np.ndarray:
+    """年/月/日/周/星期字段在窗口每一天的匹配掩码（APScheduler语义：各字段同时满足）"""
+    fields = [_field(name, expression) for name, expression in zip(_DATE_FIELDS, date_fields) if expression != "*"]
+    mask = np.ones(days, dtype=bool)
+    for i in range(days):
+        day = first_day + timedelta(days=i)
+        mask[i] = all(_matches(field, day) for field in fields)
+    return mask
+
+
+def _cron_fields(expression: str) -> dict:
+    """将5段或6段cron表达式拆为APScheduler字段（与schedule_triggers.build_trigger一致）"""
+    parts = expression.split()
+    if len(parts) == 5:
+        minute, hour, day, month, day_of_week = parts
+        second = "0"
+    elif len(parts) == 6:
+        second, minute, hour, day, month, day_of_week = parts
+    else:
+        raise ValueError(f"cron表达式应为5段或6段: {expression}")
+    return {
+        "year": "*", "month": month, "day": day, "week": "*", "day_of_week": day_of_week,
+        "hour": hour, "minute": minute, "second": second,
+    }
+
+
+def cron_start_seconds(expression: str, first_day: datetime, days: int) -> np.ndarray:
+    """
+    cron表达式在 [first_day, first_day + days) 内的全部触发时间
+
+    Returns:
+        相对first_day的秒数（升序）
+    """
+    fields = _cron_fields(expression)
+    day_mask = _day_mask(tuple(fields[name] for name in _DATE_FIELDS), first_day, days)
+    minute_mask = (
+        day_mask[:, None, None]
+        & _value_mask("hour", fields["hour"])[None, :, None]
+        & _value_mask("minute", fields["minute"])[None, None, :]
+    ).ravel()
+    seconds = np.flatnonzero(_value_mask("second", fields["second"]))
+    return (np.flatnonzero(minute_mask)[:, None] * 60 + seconds[None, :]).ravel()
+
+
+def interval_start_seconds(interval_seconds: int, first_day: datetime, total_seconds: int) -> np.ndarray:
+    """间隔触发在 [first_day, first_day + total_seconds) 内的全部触发时间（相对first_day的秒数）"""
+    since_anchor = int(first_day.timestamp() - INTERVAL_ANCHOR.timestamp())
+    first = -since_anchor % interval_seconds
+    return np.arange(first, total_seconds, interval_seconds, dtype=np.int64)
+
+
+def load_task_profiles(db: Session) -> Dict[int, Tuple[float, Optional[float]]]:
+    """
+    各任务最近HISTORY_RUNS次结束的执行的时长中位数和CPU核数中位数
+
+    Returns:
+        任务ID -> (时长秒数, CPU核数)，没有资源采样时CPU核数为None
+    """
+    ranked = db.query(
+        TaskExecution.task_id,
+        TaskExecution.start_time,
+        TaskExecution.end_time,
+        (func.coalesce(TaskExecution.cpu_user_seconds, 0) + func.coalesce(TaskExecution.cpu_system_seconds, 0)).label("cpu"),
+        TaskExecution.cpu_user_seconds.isnot(None).label("sampled"),
+        func.row_number().over(
+            partition_by=TaskExecution.task_id, order_by=TaskExecution.id.desc()
+        ).label("rank"),
+    ).filter(
+        TaskExecution.status.in_([TaskStatus.SUCCESS, TaskStatus.FAILED]),
+        TaskExecution.end_time.isnot(None),
+        TaskExecution.parent_execution_id.is_(None)
+    ).subquery()
+
+    runs = {}
+    for row in db.query(ranked).filter(ranked.c.rank <= HISTORY_RUNS):
+        duration = max((row.end_time - row.start_time).total_seconds(), 0.001)
+        runs.setdefault(row.task_id, []).append((duration, row.cpu / duration if row.sampled else None))
+
+    profiles = {}
+    for task_id, items in runs.items():
+        cores = [c for _, c in items if c is not None]
+        profiles[task_id] = (
+            float(np.median([d for d, _ in items])),
+            float(np.median(cores)) if cores else None,
+        )
+    return profiles
+
+
+def forecast(tasks: List[ForecastTask], start: datetime, minutes: int) -> Dict[str, np.ndarray]:
+    """
+    预测窗口内每分钟的触发数、平均并发数、峰值并发数和CPU需求
+
+    Args:
+        tasks: 参与预测的任务
+        start: 窗口开始时间（本地时间，按整分钟对齐）
+        minutes: 窗口长度（分钟）
+
+    Returns:
+        各指标按分钟的数组：fires/concurrency/peak_concurrency/cpu_cores，
+        以及调度配置无法解析的任务ID列表invalid_task_ids
+    """
+    # 回溯最长的执行时长，计入窗口开始前触发、窗口内仍在运行的执行（按整分钟对齐）
+    lookback = max((int(task.duration_seconds) + 1 for task in tasks), default=0)
+    lookback = -(-min(lookback, MAX_LOOKBACK_SECONDS) // 60) * 60
+
+    # 计算范围：窗口开始前lookback秒到窗口结束，按整天生成cron触发时间后截取
+    origin = start - timedelta(seconds=lookback)
+    first_day = origin.replace(hour=0, minute=0, second=0, microsecond=0)
+    skip = int((origin - first_day).total_seconds())
+    total = lookback + minutes * 60
+    days = -(-(skip + total) // 86400)
+
+    # 相同调度配置的任务共用一份触发时间，各任务的 错峰偏移/执行时长 汇总为开始、结束时刻的平移量直方图
+    groups: Dict[tuple, List[ForecastTask]] = {}
+    for task in tasks:
+        key = ("interval", task.interval_seconds) if task.interval_seconds else ("cron", task.cron_expression or "")
+        groups.setdefault(key, []).append(task)
+
+    invalid = []
+    size = total + 1
+    running = np.zeros(size)
+    cores = np.zeros(size)
+    fires_per_minute = np.zeros(minutes, dtype=np.int64)
+    for (kind, schedule), group in groups.items():
+        try:
+            if kind == "interval":
+                fires = interval_start_seconds(schedule, first_day, days * 86400)
+            else:
+                fires = cron_start_seconds(schedule, first_day, days)
+        except ValueError:
+            invalid.extend(task.task_id for task in group)
+            continue
+        if not len(fires):
+            continue
+        gap = int(np.diff(fires).min()) if len(fires) > 1 else None
+
+        offsets = np.array([task.offset_seconds for task in group], dtype=np.int64) - skip
+        durations = np.array([max(1, int(round(task.duration_seconds))) for task in group], dtype=np.int64)
+        if gap:
+            # 执行时长超过触发间隔 x 最大实例数时，多出的触发会因重叠被跳过，按连续占满实例估算
+            durations = np.minimum(durations, gap * np.array([max(task.max_instances, 1) for task in group]))
+        cpu = np.array([task.cpu_cores for task in group], dtype=float)
+
+        # 开始时刻+1、结束时刻-1，累加后得到每一秒正在运行的执行数（CPU需求按核数加权）；
+        # 超出计算范围的时刻截断到边界，窗口开始前已结束的执行开始和结束抵消
+        for shifts, sign in ((offsets, 1), (offsets + durations, -1)):
+            values, inverse = np.unique(shifts, return_inverse=True)
+            counts = np.bincount(inverse)
+            weights = np.bincount(inverse, weights=cpu)
+            at = (fires[:, None] + values[None, :]).ravel()
+            counts = np.tile(counts, len(fires))
+            clipped = np.clip(at, 0, total)
+            running += sign * np.bincount(clipped, weights=counts, minlength=size)
+            cores += sign * np.bincount(clipped, weights=np.tile(weights, len(fires)), minlength=size)
+            if sign > 0:
+                counted = (at >= lookback) & (at < total)
+                fires_per_minute += np.bincount(
+                    (at[counted] - lookback) // 60, weights=counts[counted], minlength=minutes
+                ).astype(np.int64)[:minutes]
+
+    running = np.rint(np.cumsum(running)[lookback:total]).astype(np.int64).reshape(minutes, 60)
+    cores = np.cumsum(cores)[lookback:total].reshape(minutes, 60)
+    return {
+        "fires": fires_per_minute,
+        "concurrency": running.mean(axis=1),
+        "peak_concurrency": running.max(axis=1),
+        "cpu_cores": cores.mean(axis=1),
+        "invalid_task_ids": invalid,
+    }
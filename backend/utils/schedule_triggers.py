@@ -0,0 +1,79 @@
+"""
+调度触发器构建
+支持5段crontab（分 时 日 月 周）、6段秒级cron（秒 分 时 日 月 周）和固定间隔触发；
+间隔触发以固定时间点为起点计算触发时间，不随执行耗时或重启漂移，多节点计算结果一致
+"""
+from datetime import datetime, timezone
+from typing import Optional
+
+from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+
+from config import settings
+from utils.trigger_offset import task_offset_seconds
+
+# 间隔触发的起点：触发时间为 起点 + k * 间隔
+INTERVAL_ANCHOR = datetime(2000, 1, 1, tzinfo=timezone.utc)
+
+
+def build_trigger(cron_expression: str = None, interval_seconds: int = None):
+    """
+    构建触发器，配置了执行间隔时优先使用间隔触发
+
+    Args:
+        cron_expression: 5段或6段（第一段为秒）cron表达式
+        interval_seconds: 执行间隔（秒）
+
+    Raises:
+        ValueError: 表达式格式错误或两者都未配置
+    """
+    if interval_seconds:
+        if interval_seconds < 1:
+            raise ValueError("执行间隔必须大于0秒")
+        return IntervalTrigger(seconds=interval_seconds, start_date=INTERVAL_ANCHOR)
+
+    fields = (cron_expression or "").split()
+    if len(fields) == 5:
+        return CronTrigger.from_crontab(cron_expression)
+    if len(fields) == 6:
+        second, minute, hour, day, month, day_of_week = fields
+        return CronTrigger(second=second, minute=minute, hour=hour, day=day, month=month, day_of_week=day_of_week)
+    if not fields:
+        raise ValueError("需要配置cron表达式或执行间隔")
+    raise ValueError(f"cron表达式应为5段（分 时 日 月 周）或6段（秒 分 时 日 月 周），实际为 {len(fields)} 段")
+
+
+def is_sub_minute(task) -> bool:
+    """任务是否按秒级频率触发（间隔小于60秒，或6段cron的秒字段不是固定值）"""
+    if task.interval_seconds:
+        return task.interval_seconds < 60
+    fields = (task.cron_expression or "").split()
+    return len(fields) == 6 and not fields[0].isdigit()
+
+
+def max_offset_seconds(cron_expression: str = None, interval_seconds: int = None) -> Optional[int]:
+    """错峰偏移的上限：间隔触发为间隔本身，6段cron为60秒，5段cron不限制"""
+    if interval_seconds:
+        return interval_seconds
+    if len((cron_expression or "").split()) == 6:
+        return 60
+    return None
+
+
+def offset_seconds(task_id: int, cron_expression: str = None, interval_seconds: int = None,
+                   jitter_seconds: int = None) -> int:
+    """
+    任务触发时间的错峰偏移
+
+    Args:
+        task_id: 任务ID
+        cron_expression: cron表达式
+        interval_seconds: 执行间隔（秒）
+        jitter_seconds: 任务的错峰窗口（秒），为空时使用全局窗口，0表示不错峰
+    """
+    window = jitter_seconds if jitter_seconds is not None else settings.SCHEDULER_SPREAD_WINDOW_SECONDS
+    # 秒级触发的偏移不超过一个周期，避免首次触发被推迟过久
+    limit = max_offset_seconds(cron_expression, interval_seconds)
+    if limit and window:
+        window = min(window, limit)
+    return task_offset_seconds(task_id, window)
@@ -0,0 +1,242 @@
+"""
+多副本调度集群工具
+基于共享数据库实现触发租约、执行队列领取和节点心跳
+"""
+import os
+import socket
+import logging
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy.exc import IntegrityError
+
+from database import SessionLocal
+from models import Task, TaskExecution, TaskStatus, TaskFireLease, SchedulerNode
+from utils import overlap_guard
+
+logger = logging.getLogger(__name__)
+
+
+def default_node_id() -> str:
+    """默认节点标识：主机名-进程号"""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def enqueue_execution(request: dict, node_id: str) -> Optional[int]:
+    """
+    将一次执行放入数据库队列（状态为pending），由各节点领取
+
+    计划触发的执行先获取 (task_id, fire_time) 租约，与执行记录在同一事务中提交；
+    文件触发以批次键（request['lease_time']）作为租约时间；租约已被其他节点获取时不入队
+
+    Args:
+        request: 执行请求
+        node_id: 当前节点标识
+
+    Returns:
+        执行记录ID，租约已被其他节点获取时返回None
+    """
+    db = SessionLocal()
+    try:
+        fire_time = request['scheduled_time'] if request['scheduled_time'] is not None else request.get('lease_time')
+        if fire_time is not None:
+            db.add(TaskFireLease(
+                task_id=request['task_id'],
+                fire_time=fire_time,
+                node_id=node_id
+            ))
+
+        execution = TaskExecution(
+            task_id=request['task_id'],
+            executed_by=request['executed_by'],
+            trigger_type=request['trigger_type'],
+            scheduled_time=request['scheduled_time'],
+            retry_of_id=request.get('retry_of_id'),
+            attempt=request.get('attempt', 1),
+            upstream_execution_id=request.get('upstream_execution_id'),
+            trigger_event_at=request.get('trigger_event_at'),
+            trigger_files=request.get('trigger_files'),
+            status=TaskStatus.PENDING,
+            start_time=datetime.now()  # 入队时间，领取后更新为实际开始时间
+        )
+        db.add(execution)
+        db.commit()
+        return execution.id
+    except IntegrityError:
+        db.rollback()
+        logger.info(f"任务 {request['task_id']} 的触发 {request['scheduled_time']} 已由其他节点处理")
+        return None
+    finally:
+        db.close()
+
+
+def claim_pending_executions(node_id: str, limit: int) -> List[dict]:
+    """
+    从队列中领取待执行的记录
+
+    通过带状态条件的UPDATE抢占，多个节点同时领取时只有一个会成功；
+    领取时锁定任务行检查运行实例数，超出上限的按重叠策略标记为排队或跳过
+
+    Args:
+        node_id: 当前节点标识
+        limit: 最多领取数量
+
+    Returns:
+        已领取的执行请求列表
+    """
+    if limit <= 0:
+        return []
+
+    db = SessionLocal()
+    try:
+        candidates = db.query(TaskExecution).filter(
+            TaskExecution.status == TaskStatus.PENDING
+        ).order_by(TaskExecution.id).limit(limit).all()
+
+        claimed = []
+        for execution in candidates:
+            task = overlap_guard.lock_task(db, execution.task_id)
+            # 扇出子执行计入父执行的实例，不单独检查
+            deferred, reason = None, overlap_guard.REASON_OVERLAP
+            if task and not execution.parent_execution_id:
+                if overlap_guard.held_by_pause(task, execution.trigger_type):
+                    deferred, reason = TaskStatus.QUEUED, overlap_guard.REASON_PAUSED
+                else:
+                    deferred = overlap_guard.overflow_status(db, task, exclude_id=execution.id)
+            if deferred:
+                values = overlap_guard.deferred_values(deferred, reason)
+            else:
+                values = {"status": TaskStatus.RUNNING, "node_id": node_id}
+
+            updated = db.query(TaskExecution).filter(
+                TaskExecution.id == execution.id,
+                TaskExecution.status == TaskStatus.PENDING
+            ).update({
+                getattr(TaskExecution, field): value for field, value in values.items()
+            }, synchronize_session=False)
+            db.commit()
+
+            if updated and reason == overlap_guard.REASON_PAUSED:
+                logger.info(f"任务 {execution.task_id} 已暂停，重试执行 {execution.id} 保持排队，恢复后启动")
+            elif updated and deferred:
+                logger.info(f"任务 {execution.task_id} 运行实例已达上限，执行 {execution.id} 标记为 {deferred.value}")
+            elif updated:
+                claimed.append({
+                    'task_id': execution.task_id,
+                    'executed_by': execution.executed_by,
+                    'trigger_type': execution.trigger_type,
+                    'scheduled_time': execution.scheduled_time,
+                    'retry_of_id': execution.retry_of_id,
+                    'attempt': execution.attempt,
+                    'upstream_execution_id': execution.upstream_execution_id,
+                    'parent_execution_id': execution.parent_execution_id,
+                    'execution_id': execution.id,
+                    'fired_at': execution.scheduled_time or execution.start_time,  # start_time为入队时间
+                })
+        return claimed
+    finally:
+        db.close()
+
+
+def release_queued_execution(task_id: int) -> bool:
+    """
+    将任务最早排队的执行放回队列（状态改为pending），由各节点重新领取；任务暂停时保持排队
+
+    Returns:
+        是否有排队的执行被放回
+    """
+    db = SessionLocal()
+    try:
+        if db.query(Task.is_paused).filter(Task.id == task_id).scalar():
+            return False
+        queued = db.query(TaskExecution.id).filter(
+            TaskExecution.task_id == task_id,
+            TaskExecution.status == TaskStatus.QUEUED,
+            TaskExecution.parent_execution_id.is_(None)
+        ).order_by(TaskExecution.id).first()
+        if not queued:
+            return False
+
+        updated = db.query(TaskExecution).filter(
+            TaskExecution.id == queued.id,
+            TaskExecution.status == TaskStatus.QUEUED
+        ).update({TaskExecution.status: TaskStatus.PENDING}, synchronize_session=False)
+        db.commit()
+        return bool(updated)
+    finally:
+        db.close()
+
+
+def heartbeat(node_id: str):
+    """更新节点心跳"""
+    db = SessionLocal()
+    try:
+        node = db.query(SchedulerNode).filter(SchedulerNode.node_id == node_id).first()
+        if node:
+            node.last_heartbeat = datetime.now()
+        else:
+            db.add(SchedulerNode(
+                node_id=node_id,
+                hostname=socket.gethostname(),
+                pid=os.getpid(),
+                started_at=datetime.now(),
+                last_heartbeat=datetime.now()
+            ))
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+    finally:
+        db.close()
+
+
+def remove_node(node_id: str):
+    """节点正常退出时删除心跳记录"""
+    db = SessionLocal()
+    try:
+        db.query(SchedulerNode).filter(SchedulerNode.node_id == node_id).delete()
+        db.commit()
+    finally:
+        db.close()
+
+
+def list_nodes(timeout_seconds: int) -> List[dict]:
+    """
+    获取所有调度节点
+
+    Args:
+        timeout_seconds: 心跳超时时间（秒）
+
+    Returns:
+        节点信息列表
+    """
+    db = SessionLocal()
+    try:
+        now = datetime.now()
+        nodes = db.query(SchedulerNode).order_by(SchedulerNode.started_at).all()
+        return [{
+            "node_id": node.node_id,
+            "hostname": node.hostname,
+            "pid": node.pid,
+            "started_at": node.started_at,
+            "last_heartbeat": node.last_heartbeat,
+            "alive": (now - node.last_heartbeat).total_seconds() <= timeout_seconds,
+        } for node in nodes]
+    finally:
+        db.close()
+
+
+def purge_expired_leases(retention_days: int) -> int:
+    """
+    清理过期的触发租约
+
+    Returns:
+        删除的记录数
+    """
+    db = SessionLocal()
+    try:
+        cutoff = datetime.now() - timedelta(days=retention_days)
+        deleted = db.query(TaskFireLease).filter(TaskFireLease.created_at < cutoff).delete()
+        db.commit()
+        return deleted
+    finally:
+        db.close()
@@ -0,0 +1,152 @@
+"""
+任务依赖（DAG）
+保存依赖时检查是否形成环；上游任务执行成功后找出所有上游都已成功的下游任务并触发
+"""
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy.orm import Session
+
+from models import TaskDependency, TaskExecution, TaskStatus
+from utils import overlap_guard
+from utils.paths import get_execution_output_dir
+
+
+def load_upstreams(db: Session) -> Dict[int, Set[int]]:
+    """读取全部依赖关系：任务ID -> 上游任务ID集合"""
+    graph = defaultdict(set)
+    for task_id, upstream_task_id in db.query(TaskDependency.task_id, TaskDependency.upstream_task_id):
+        graph[task_id].add(upstream_task_id)
+    return graph
+
+
+def find_cycle(graph: Dict[int, Set[int]], task_id: int, upstream_ids: Iterable[int]) -> Optional[List[int]]:
+    """
+    检查将任务的上游设置为upstream_ids后是否形成环
+
+    Args:
+        graph: 当前依赖关系（任务ID -> 上游任务ID集合）
+        task_id: 任务ID
+        upstream_ids: 新的上游任务ID
+
+    Returns:
+        形成环时返回环上的任务ID（首尾相同，按依赖方向），否则返回None
+    """
+    # 从每个新上游沿上游方向深度优先搜索，能回到task_id即形成环
+    parent = {}
+    stack = []
+    for upstream_id in upstream_ids:
+        if upstream_id not in parent:
+            parent[upstream_id] = task_id
+            stack.append(upstream_id)
+
+    while stack:
+        node = stack.pop()
+        if node == task_id:
+            path = [task_id]
+            current = parent[task_id]
+            while current != task_id:
+                path.append(current)
+                current = parent[current]
+            path.append(task_id)
+            return path
+        for upstream_id in graph.get(node, ()):
+            if upstream_id not in parent:
+                parent[upstream_id] = node
+                stack.append(upstream_id)
+    return None
+
+
+def set_upstreams(db: Session, task_id: int, upstream_ids: Iterable[int]):
+    """替换任务的上游依赖（不提交事务）"""
+    upstream_ids = set(upstream_ids)
+    existing = {
+        dependency.upstream_task_id: dependency
+        for dependency in db.query(TaskDependency).filter(TaskDependency.task_id == task_id)
+    }
+    for upstream_id, dependency in existing.items():
+        if upstream_id not in upstream_ids:
+            db.delete(dependency)
+    for upstream_id in upstream_ids - set(existing):
+        db.add(TaskDependency(task_id=task_id, upstream_task_id=upstream_id))
+
+
+def remove_task(db: Session, task_id: int):
+    """删除任务时清理其全部依赖关系（不提交事务）"""
+    db.query(TaskDependency).filter(
+        (TaskDependency.task_id == task_id) | (TaskDependency.upstream_task_id == task_id)
+    ).delete(synchronize_session=False)
+
+
+def _latest_finished(db: Session, task_id: int) -> Optional[TaskExecution]:
+    """任务最近一次结束（成功或失败）的执行（扇出任务以父执行的汇总结果为准，不看单个子执行）"""
+    return db.query(TaskExecution).filter(
+        TaskExecution.task_id == task_id,
+        TaskExecution.parent_execution_id.is_(None),
+        TaskExecution.status.in_([TaskStatus.SUCCESS, TaskStatus.FAILED]),
+        TaskExecution.end_time.isnot(None)
+    ).order_by(TaskExecution.end_time.desc()).first()
+
+
+def ready_dependents(db: Session, upstream_task_id: int) -> List[int]:
+    """
+    上游任务执行成功后，找出可以触发的下游任务
+
+    下游任务的每个上游最近一次执行都成功、且都在下游上次被依赖触发之后结束时才触发；
+    判断在锁定下游任务行的事务中进行并记录触发时间，多个上游同时成功时下游只触发一次
+
+    Returns:
+        需要触发的下游任务ID
+    """
+    downstream_ids = [
+        row.task_id for row in
+        db.query(TaskDependency.task_id).filter(TaskDependency.upstream_task_id == upstream_task_id)
+    ]
+
+    ready = []
+    for downstream_id in downstream_ids:
+        task = overlap_guard.lock_task(db, downstream_id)
+        if not task or not task.is_active or task.is_paused or not task.script_path:
+            db.rollback()
+            continue
+
+        upstream_ids = [
+            row.upstream_task_id for row in
+            db.query(TaskDependency.upstream_task_id).filter(TaskDependency.task_id == downstream_id)
+        ]
+        satisfied = True
+        for upstream_id in upstream_ids:
+            latest = _latest_finished(db, upstream_id)
+            if not latest or latest.status != TaskStatus.SUCCESS or (
+                task.dependency_fired_at and latest.end_time <= task.dependency_fired_at
+            ):
+                satisfied = False
+                break
+
+        if satisfied:
+            task.dependency_fired_at = datetime.now()
+            db.commit()
+            ready.append(downstream_id)
+        else:
+            db.rollback()
+    return ready
+
+
+def upstream_output_dirs(db: Session, task_id: int) -> Dict[int, str]:
+    """
+    各上游任务最近一次成功执行的输出目录：上游任务ID -> 目录
+
+    扇出任务取父执行的输出目录，其中按子执行ID链接到各子执行的输出目录，并附有清单fanout.json（见fanout.write_output_index）
+    """
+    dirs = {}
+    upstream_ids = db.query(TaskDependency.upstream_task_id).filter(TaskDependency.task_id == task_id)
+    for (upstream_id,) in upstream_ids:
+        latest = db.query(TaskExecution.id).filter(
+            TaskExecution.task_id == upstream_id,
+            TaskExecution.parent_execution_id.is_(None),
+            TaskExecution.status == TaskStatus.SUCCESS
+        ).order_by(TaskExecution.id.desc()).first()
+        if latest:
+            dirs[upstream_id] = get_execution_output_dir(upstream_id, latest.id)
+    return dirs
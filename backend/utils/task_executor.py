@@ -0,0 +1,83 @@
+"""
+异步任务执行器
+使用单个asyncio事件循环驱动所有任务子进程，调度线程提交后立即返回，
+长时间运行的脚本不再占用APScheduler的线程池
+"""
+import asyncio
+import threading
+import logging
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncTaskExecutor:
+    """基于asyncio的任务执行器
+
+    事件循环运行在独立的守护线程中，其他线程通过submit()提交协程；
+    并发数由上游的分发队列控制
+    """
+
+    def __init__(self):
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+        self._running = 0
+
+    def start(self):
+        """启动事件循环线程"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._ready.clear()
+        self._thread = threading.Thread(target=self._run_loop, name="task-executor", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        logger.info("异步任务执行器已启动")
+
+    def _run_loop(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self._ready.set()
+        try:
+            self.loop.run_forever()
+        finally:
+            self.loop.close()
+
+    def submit(self, coro):
+        """
+        从任意线程提交协程到执行器
+
+        Returns:
+            concurrent.futures.Future
+        """
+        if not self.loop or not self.loop.is_running():
+            coro.close()
+            raise RuntimeError("异步任务执行器未启动")
+
+        future = asyncio.run_coroutine_threadsafe(self._track(coro), self.loop)
+        future.add_done_callback(self._log_failure)
+        return future
+
+    async def _track(self, coro):
+        self._running += 1
+        try:
+            return await coro
+        finally:
+            self._running -= 1
+
+    @staticmethod
+    def _log_failure(future):
+        if not future.cancelled() and future.exception():
+            logger.error(f"异步任务执行异常: {future.exception()}")
+
+    def stats(self) -> dict:
+        """获取执行器运行状态"""
+        return {"running": self._running}
+
+    def shutdown(self, timeout: float = 5):
+        """停止事件循环（正在运行的子进程不会被等待）"""
+        if self.loop and self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        if self._thread:
+            self._thread.join(timeout=timeout)
+        logger.info("异步任务执行器已关闭")
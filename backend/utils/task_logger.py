@@ -1,10 +1,22 @@
 """
 任务执行日志管理工具
-将任务执行日志存储到文件系统而非数据库
+将任务执行日志存储到文件系统而非数据库，执行结束的日志由后台压缩（见log_storage），读取时自动解压
 """
 import os
+import threading
 from datetime import datetime
 from pathlib import Path
+from typing import Callable, Optional
+
+from utils import log_reader, log_storage
+from utils.paths import LOGS_ROOT
+from utils.log_search import LogSearchIndex
+
+# 流式写入时每个输出流最多缓存的未完成行字节数，超过则强制换行写出
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# 为日志尾部预留的空间，保证流式输出达到上限后仍能写入执行结果
+FOOTER_RESERVE_BYTES = 16 * 1024
 
 
 class TaskLogger:
@@ -17,12 +29,11 @@ class TaskLogger:
         Args:
             base_dir: 日志基础目录（相对于backend目录）
         """
-        # 获取项目根目录（backend的上一级）
-        current_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        # 日志目录在项目根目录的logs/tasks下
-        self.base_dir = os.path.join(current_dir, "..", "logs", "tasks")
-        self.base_dir = os.path.abspath(self.base_dir)
+        # 日志目录在日志根目录（paths.LOGS_ROOT，可通过环境变量配置）的tasks下，与get_task_log_dir一致
+        self.base_dir = os.path.abspath(os.path.join(LOGS_ROOT, "tasks"))
         os.makedirs(self.base_dir, exist_ok=True)
+        # 日志全文索引：写入后增量更新
+        self.search_index = LogSearchIndex(self.base_dir)
     
     def get_log_file_path(self, task_id: int, execution_id: int) -> str:
         """
@@ -58,6 +69,7 @@ class TaskLogger:
         try:
             # 确保目录存在
             os.makedirs(os.path.dirname(log_file), exist_ok=True)
+            self._prepare_write(log_file, mode)
             
             # 检查文件大小，如果超过限制，添加警告并截断
             if mode == 'a' and os.path.exists(log_file):
@@ -69,16 +81,41 @@ class TaskLogger:
                     warning = f"\n\n{'='*80}\n⚠️ 日志文件已达到{max_size_mb}MB限制，停止记录新日志\n{'='*80}\n"
                     with open(log_file, 'a', encoding='utf-8') as f:
                         f.write(warning)
+                    self.search_index.notify(log_file)
                     return  # 不再写入
             
             with open(log_file, mode, encoding='utf-8') as f:
                 f.write(content)
+            self.search_index.notify(log_file)
         except Exception as e:
             print(f"写入日志失败: {str(e)}")
     
+    def open_stream(self, log_file: str, max_size_mb: int = 50) -> "LogStream":
+        """
+        打开执行输出流式写入器
+        
+        Args:
+            log_file: 日志文件路径
+            max_size_mb: 最大文件大小（MB），运行过程中即生效
+            
+        Returns:
+            LogStream实例
+        """
+        os.makedirs(os.path.dirname(log_file), exist_ok=True)
+        self._prepare_write(log_file, 'a')
+        return LogStream(log_file, max_size_mb, on_write=self.search_index.notify)
+    
+    def _prepare_write(self, log_file: str, mode: str):
+        """写入已压缩的日志前：追加时先恢复为未压缩格式，覆盖时删除压缩文件"""
+        if log_storage.is_compressed(log_file):
+            if mode == 'a':
+                log_storage.decompress(log_file)
+            else:
+                os.remove(log_storage.compressed_path(log_file))
+    
     def read_log(self, log_file: str, max_lines: int = 1000) -> str:
         """
-        读取日志内容（优化版：只读取最后N行，避免大文件卡顿）
+        读取日志内容（大文件从末尾反向读取最后N行，不读取整个文件）
         
         Args:
             log_file: 日志文件路径
@@ -87,38 +124,47 @@ class TaskLogger:
         Returns:
             日志内容，如果文件不存在返回空字符串
         """
-        if not os.path.exists(log_file):
+        if not log_storage.exists(log_file):
             return ""
         
         try:
-            # 检查文件大小
-            file_size = os.path.getsize(log_file)
+            # 检查文件大小（已压缩时为原始大小）
+            file_size = log_storage.logical_size(log_file)
             
             # 如果文件很小（<1MB），直接读取全部
             if file_size < 1024 * 1024:  # 1MB
-                with open(log_file, 'r', encoding='utf-8') as f:
-                    return f.read()
+                with log_storage.open_log(log_file) as f:
+                    return f.read().decode('utf-8', errors='replace')
             
             # 大文件：只读取最后N行
-            lines = []
-            with open(log_file, 'r', encoding='utf-8') as f:
-                # 使用deque自动保持最后N行
-                from collections import deque
-                lines = deque(f, maxlen=max_lines)
-            
-            content = ''.join(lines)
-            
-            # 如果读取的是部分内容，添加提示
-            if file_size > 1024 * 1024:
-                size_mb = file_size / (1024 * 1024)
-                header = f"⚠️ 日志文件较大({size_mb:.1f}MB)，仅显示最后{max_lines}行\n" + "="*80 + "\n\n"
-                content = header + content
+            data, _ = log_reader.read_tail(log_file, max_lines)
+            content = data.decode('utf-8', errors='replace')
             
-            return content
+            # 读取的是部分内容，添加提示
+            size_mb = file_size / (1024 * 1024)
+            header = f"⚠️ 日志文件较大({size_mb:.1f}MB)，仅显示最后{max_lines}行\n" + "="*80 + "\n\n"
+            return header + content
             
         except Exception as e:
             return f"读取日志失败: {str(e)}"
     
+    def read_lines(self, log_file: str, start_line: int = 1, max_lines: int = 1000) -> str:
+        """
+        读取指定范围的日志行（按行偏移索引定位，读取量与行数成正比）
+        
+        Args:
+            log_file: 日志文件路径
+            start_line: 起始行号（从1开始）
+            max_lines: 最多读取的行数
+            
+        Returns:
+            日志内容，如果文件不存在返回空字符串
+        """
+        if not log_storage.exists(log_file):
+            return ""
+        lines = log_reader.read_lines(log_file, start_line, max_lines)
+        return b''.join(lines).decode('utf-8', errors='replace')
+    
     def get_log_info(self, log_file: str) -> dict:
         """
         获取日志文件信息
@@ -129,25 +175,26 @@ class TaskLogger:
         Returns:
             包含文件大小、行数等信息的字典
         """
-        if not os.path.exists(log_file):
+        if not log_storage.exists(log_file):
             return {"exists": False}
         
         try:
-            file_size = os.path.getsize(log_file)
+            file_size = log_storage.logical_size(log_file)
+            stored_size = log_storage.stored_size(log_file)
             size_mb = file_size / (1024 * 1024)
             
-            # 快速统计行数（只对小文件）
-            line_count = 0
-            if file_size < 10 * 1024 * 1024:  # 小于10MB
-                with open(log_file, 'r', encoding='utf-8') as f:
-                    line_count = sum(1 for _ in f)
+            # 行数来自行偏移索引，只统计上次之后新写入的部分
+            line_count = log_reader.count_lines(log_file)
             
             return {
                 "exists": True,
                 "size_bytes": file_size,
                 "size_mb": round(size_mb, 2),
                 "line_count": line_count,
-                "is_large": file_size > 1024 * 1024  # 超过1MB算大文件
+                "is_large": file_size > 1024 * 1024,  # 超过1MB算大文件
+                "compressed": log_storage.is_compressed(log_file),
+                "stored_bytes": stored_size,  # 实际占用空间
+                "saved_bytes": file_size - stored_size,  # 压缩节省的空间
             }
         except Exception as e:
             return {"exists": True, "error": str(e)}
@@ -159,9 +206,11 @@ class TaskLogger:
         Args:
             log_file: 日志文件路径
         """
-        if os.path.exists(log_file):
+        if log_storage.exists(log_file):
             try:
-                os.remove(log_file)
+                log_storage.remove(log_file)
+                log_reader.remove_sidecar(log_file)
+                self.search_index.remove(log_file)
             except Exception as e:
                 print(f"删除日志失败: {str(e)}")
     
@@ -181,13 +230,20 @@ class TaskLogger:
         
         log_files = []
         for filename in os.listdir(task_dir):
-            if filename.endswith('.log'):
-                filepath = os.path.join(task_dir, filename)
+            compressed = filename.endswith('.log' + log_storage.COMPRESSED_SUFFIX)
+            if filename.endswith('.log') or compressed:
+                stored_path = os.path.join(task_dir, filename)
+                # 已压缩的日志按原日志路径列出
+                filepath = stored_path[:-len(log_storage.COMPRESSED_SUFFIX)] if compressed else stored_path
+                if compressed and os.path.exists(filepath):
+                    continue  # 正在压缩，以原文件为准
                 log_files.append({
-                    'filename': filename,
+                    'filename': os.path.basename(filepath),
                     'path': filepath,
-                    'size': os.path.getsize(filepath),
-                    'modified_time': datetime.fromtimestamp(os.path.getmtime(filepath))
+                    'size': log_storage.logical_size(filepath),
+                    'stored_size': os.path.getsize(stored_path),
+                    'compressed': compressed,
+                    'modified_time': datetime.fromtimestamp(os.path.getmtime(stored_path))
                 })
         
         # 按修改时间倒序排列
@@ -195,5 +251,99 @@ class TaskLogger:
         return log_files
 
 
+class LogStream:
+    """
+    执行输出流式写入器
+    
+    子进程的stdout/stderr按块写入，按到达顺序交错并为每行加时间戳；
+    每个流只缓存一行未完成的数据（不超过STREAM_CHUNK_SIZE），内存占用有上限
+    """
+    
+    def __init__(self, log_file: str, max_size_mb: int = 50, on_write: Optional[Callable[[str], None]] = None):
+        self.log_file = log_file
+        self.max_size_mb = max_size_mb
+        self.on_write = on_write  # 每次写出后以日志路径调用（增量更新全文索引）
+        self._max_bytes = max_size_mb * 1024 * 1024 - FOOTER_RESERVE_BYTES
+        self._file = open(log_file, 'ab')
+        self._size = self._file.tell()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self.truncated = False
+        self.dropped_bytes = 0
+    
+    def write_chunk(self, stream_name: str, data: bytes):
+        """
+        写入一块子进程输出
+        
+        Args:
+            stream_name: 输出流名称 stdout/stderr
+            data: 原始字节
+        """
+        with self._lock:
+            buffer = self._pending.get(stream_name, b'') + data
+            lines = buffer.split(b'\n')
+            pending = lines.pop()
+            
+            # 超长的未完成行按UTF-8字符边界强制写出，避免无限缓存；
+            # 向前4个字节内找不到字符边界（不是合法UTF-8，如二进制输出）时直接在STREAM_CHUNK_SIZE处截断
+            while len(pending) > STREAM_CHUNK_SIZE:
+                cut = STREAM_CHUNK_SIZE
+                while cut > STREAM_CHUNK_SIZE - 4 and (pending[cut] & 0xC0) == 0x80:
+                    cut -= 1
+                if (pending[cut] & 0xC0) == 0x80:
+                    cut = STREAM_CHUNK_SIZE
+                lines.append(pending[:cut])
+                pending = pending[cut:]
+            
+            self._pending[stream_name] = pending
+            self._write_lines(stream_name, lines)
+    
+    def pending_bytes(self, stream_name: str) -> int:
+        """输出流中已接收但尚未写出的未完成行字节数"""
+        return len(self._pending.get(stream_name, b''))
+    
+    def _write_lines(self, stream_name: str, lines: list):
+        if not lines:
+            return
+        
+        if self.truncated:
+            self.dropped_bytes += sum(len(line) + 1 for line in lines)
+            return
+        
+        timestamp = datetime.now().strftime('%H:%M:%S.%f')[:-3]
+        prefix = f"[{timestamp}][{stream_name}] "
+        # 统一转成合法UTF-8，保证日志文件始终可以按UTF-8读取
+        content = ''.join(
+            prefix + line.decode('utf-8', errors='replace') + '\n' for line in lines
+        ).encode('utf-8')
+        
+        if self._size + len(content) > self._max_bytes:
+            self.truncated = True
+            self.dropped_bytes += len(content)
+            warning = f"\n{'='*80}\n⚠️ 日志文件已达到{self.max_size_mb}MB限制，停止记录新日志\n{'='*80}\n"
+            self._file.write(warning.encode('utf-8'))
+            self._file.flush()
+            self._notify()
+            return
+        
+        self._file.write(content)
+        self._file.flush()
+        self._size += len(content)
+        self._notify()
+    
+    def _notify(self):
+        if self.on_write:
+            self.on_write(self.log_file)
+    
+    def close(self):
+        """写出所有流中剩余的未完成行并关闭文件"""
+        with self._lock:
+            for stream_name, pending in self._pending.items():
+                if pending:
+                    self._write_lines(stream_name, [pending])
+            self._pending.clear()
+            self._file.close()
+
+
 # 全局实例
 task_logger = TaskLogger()
@@ -0,0 +1,243 @@
+"""
+任务执行链路追踪
+记录一次执行从触发到结束各阶段（排队、锁定任务、写执行记录、创建目录、启动进程、脚本运行、
+扫描产出文件、提交结果）的耗时，保存到执行记录，并按OpenTelemetry的OTLP/JSON格式批量导出到
+本地文件或collector，用于区分平台开销和脚本本身的运行时间
+"""
+import os
+import json
+import time
+import queue
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import httpx
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = "pyschedule"
+SCOPE_NAME = "pyschedule.task_scheduler"
+
+# 导出队列上限，导出跟不上时丢弃新的trace，不阻塞任务执行
+EXPORT_QUEUE_SIZE = 10000
+
+# 批量导出：每批最多的trace数和最长等待时间
+EXPORT_BATCH_SIZE = 200
+EXPORT_INTERVAL_SECONDS = 5
+
+# OTLP span类型和状态码
+SPAN_KIND_INTERNAL = 1
+STATUS_CODE_OK = 1
+STATUS_CODE_ERROR = 2
+
+
+def to_ns(value: datetime) -> int:
+    """本地时间转为Unix纳秒时间戳"""
+    return int(value.timestamp() * 1_000_000_000)
+
+
+class Trace:
+    """一次执行的链路：根span覆盖整个执行，各阶段为根span的子span"""
+
+    def __init__(self, name: str = "execution", start: Optional[datetime] = None, **attributes):
+        """
+        Args:
+            name: 根span名称
+            start: 开始时间（触发时间），为空时为当前时间
+            attributes: 根span属性
+        """
+        self.trace_id = os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.name = name
+        self.start_ns = to_ns(start) if start else time.time_ns()
+        self.end_ns = None
+        self.error = None
+        self.attributes = attributes
+        self.spans: List[dict] = []
+
+    def add(self, name: str, start_ns: int, end_ns: int = None, **attributes):
+        """添加一个已结束的阶段，end_ns为空时以当前时间结束"""
+        end_ns = end_ns or time.time_ns()
+        self.spans.append({
+            "name": name,
+            "span_id": os.urandom(8).hex(),
+            "start_ns": start_ns,
+            "end_ns": max(end_ns, start_ns),
+            "attributes": {key: value for key, value in attributes.items() if value is not None},
+        })
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """记录with块的耗时，块内可向返回的字典补充属性"""
+        start_ns = time.time_ns()
+        try:
+            yield attributes
+        finally:
+            self.add(name, start_ns, **attributes)
+
+    def finish(self, error: str = None, **attributes):
+        self.end_ns = time.time_ns()
+        self.error = error
+        self.attributes.update(attributes)
+
+    def phases_ms(self) -> Dict[str, float]:
+        """各阶段耗时（毫秒），同名阶段累加"""
+        phases = {}
+        for span in self.spans:
+            phases[span["name"]] = phases.get(span["name"], 0) + (span["end_ns"] - span["start_ns"]) / 1e6
+        return {name: round(ms, 3) for name, ms in phases.items()}
+
+    def to_dict(self) -> dict:
+        """保存到执行记录的格式"""
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns or time.time_ns(),
+            "error": self.error,
+            "attributes": {key: value for key, value in self.attributes.items() if value is not None},
+            "spans": self.spans,
+        }
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: dict) -> list:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items()]
+
+
+def to_otlp_spans(trace: dict) -> list:
+    """将保存的trace转为OTLP span列表（根span在前）"""
+    root = {
+        "traceId": trace["trace_id"],
+        "spanId": trace["span_id"],
+        "name": trace["name"],
+        "kind": SPAN_KIND_INTERNAL,
+        "startTimeUnixNano": str(trace["start_ns"]),
+        "endTimeUnixNano": str(trace["end_ns"]),
+        "attributes": _otlp_attributes(trace.get("attributes") or {}),
+        "status": {"code": STATUS_CODE_ERROR, "message": trace["error"]} if trace.get("error") else {"code": STATUS_CODE_OK},
+    }
+    return [root] + [{
+        "traceId": trace["trace_id"],
+        "spanId": span["span_id"],
+        "parentSpanId": trace["span_id"],
+        "name": span["name"],
+        "kind": SPAN_KIND_INTERNAL,
+        "startTimeUnixNano": str(span["start_ns"]),
+        "endTimeUnixNano": str(span["end_ns"]),
+        "attributes": _otlp_attributes(span.get("attributes") or {}),
+    } for span in trace.get("spans", [])]
+
+
+def to_otlp(traces: List[dict], node_id: str = None) -> dict:
+    """
+    多个trace合并为一个OTLP ExportTraceServiceRequest（JSON编码，trace/span ID为十六进制）
+    """
+    resource = {"service.name": SERVICE_NAME}
+    if node_id:
+        resource["service.instance.id"] = node_id
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": _otlp_attributes(resource)},
+            "scopeSpans": [{
+                "scope": {"name": SCOPE_NAME},
+                "spans": [span for trace in traces for span in to_otlp_spans(trace)],
+            }],
+        }]
+    }
+
+
+class TraceExporter:
+    """
+    后台批量导出trace：每批写入导出文件一行（OTLP/JSON）并POST到collector的/v1/traces，
+    两者都未配置时不导出
+    """
+
+    def __init__(self, file_path: str = "", endpoint: str = "", headers: str = ""):
+        self.file_path = file_path
+        self.endpoint = endpoint
+        self.headers = dict(
+            item.split("=", 1) for item in (headers or "").split(",") if "=" in item
+        )
+        self.node_id = None
+        self._queue = queue.Queue(maxsize=EXPORT_QUEUE_SIZE)
+        self._thread = None
+        self.stats = {"exported": 0, "dropped": 0, "failed": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.file_path or self.endpoint)
+
+    def start(self, node_id: str = None):
+        self.node_id = node_id
+        if not self.enabled or self._thread:
+            return
+        self._thread = threading.Thread(target=self._loop, name="trace-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, trace: dict):
+        if not self._thread:
+            return
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            self.stats["dropped"] += 1
+
+    def stop(self):
+        if self._thread:
+            self._queue.put(None)
+            self._thread.join(timeout=EXPORT_INTERVAL_SECONDS)
+            self._thread = None
+
+    def _loop(self):
+        stopping = False
+        while not stopping:
+            batch = []
+            deadline = time.monotonic() + EXPORT_INTERVAL_SECONDS
+            while len(batch) < EXPORT_BATCH_SIZE:
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            if batch:
+                self._write(batch)
+
+    def _write(self, batch: List[dict]):
+        payload = to_otlp(batch, self.node_id)
+        try:
+            if self.file_path:
+                os.makedirs(os.path.dirname(os.path.abspath(self.file_path)), exist_ok=True)
+                with open(self.file_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(payload, ensure_ascii=False) + "\n")
+            if self.endpoint:
+                response = httpx.post(self.endpoint, json=payload, headers=self.headers, timeout=10)
+                response.raise_for_status()
+            self.stats["exported"] += len(batch)
+        except Exception as e:
+            self.stats["failed"] += len(batch)
+            logger.error(f"导出执行链路失败: {e}")
+
+
+# 全局导出器实例
+trace_exporter = TraceExporter(
+    settings.TRACE_EXPORT_FILE, settings.TRACE_EXPORT_ENDPOINT, settings.TRACE_EXPORT_HEADERS
+)
@@ -0,0 +1,52 @@
+"""
+触发时间错峰
+按任务ID计算固定的偏移量，让使用相同cron表达式的任务在窗口内分散启动；
+偏移量只由任务ID和窗口大小决定，多节点、重启后计算结果一致
+"""
+import zlib
+from datetime import timedelta
+
+from apscheduler.triggers.base import BaseTrigger
+
+
+def task_offset_seconds(task_id: int, window_seconds: int) -> int:
+    """
+    计算任务在错峰窗口内的固定偏移
+
+    Args:
+        task_id: 任务ID
+        window_seconds: 窗口大小（秒），0表示不偏移
+
+    Returns:
+        偏移秒数，范围 [0, window_seconds)
+    """
+    if not window_seconds or window_seconds <= 0:
+        return 0
+    return zlib.crc32(f"task-{task_id}".encode("utf-8")) % window_seconds
+
+
+class OffsetTrigger(BaseTrigger):
+    """在原触发器的每个触发时间上加固定偏移的触发器"""
+
+    def __init__(self, trigger: BaseTrigger, offset_seconds: int):
+        self.trigger = trigger
+        self.offset_seconds = offset_seconds
+
+    def get_next_fire_time(self, previous_fire_time, now):
+        offset = timedelta(seconds=self.offset_seconds)
+        previous = previous_fire_time - offset if previous_fire_time else None
+        next_fire_time = self.trigger.get_next_fire_time(previous, now - offset)
+        return next_fire_time + offset if next_fire_time else None
+
+    def __getstate__(self):
+        return {"version": 1, "trigger": self.trigger, "offset_seconds": self.offset_seconds}
+
+    def __setstate__(self, state):
+        self.trigger = state["trigger"]
+        self.offset_seconds = state["offset_seconds"]
+
+    def __str__(self):
+        return f"{self.trigger} +{self.offset_seconds}s"
+
+    def __repr__(self):
+        return f"<OffsetTrigger ({self.trigger!r}, offset_seconds={self.offset_seconds})>"